@@ -3,7 +3,10 @@ from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
 from .models import (User, StaffProfile, StudentProfile, AcademicRecord, PaymentTransaction,
     Faculty, Department, Course, CourseOffering, CourseRegistration, Enrollment,
     Verification, AcademicSession, Level, FeeStructure,
-    ExamOfficerProfile, Result, SemesterGPA)
+    ExamOfficerProfile, Result, SemesterGPA, Job, PaystackEvent)
+from .background import enqueue
+from django.contrib import messages as django_messages
+from django.utils import timezone
 
 # Customizing the User Admin
 @admin.register(User)
@@ -198,3 +201,42 @@ class SemesterGPAAdmin(admin.ModelAdmin):
     list_filter = ('academic_session', 'semester', 'level')
     search_fields = ('student__user__username', 'student__user__id_number')
     ordering = ('-academic_session__start_year', 'student__user__username')
+
+
+# Background Job Admin
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'progress', 'total', 'run_after', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'locked_at', 'result', 'error')
+    ordering = ('-created_at',)
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        """Put failed/finished jobs back on the queue to run now"""
+        count = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_after=timezone.now(), error='', locked_by='', locked_at=None
+        )
+        django_messages.success(request, f'{count} job(s) queued again.')
+
+    retry_jobs.short_description = "Retry selected jobs"
+
+
+@admin.register(PaystackEvent)
+class PaystackEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event', 'reference', 'status', 'received_at', 'processed_at')
+    list_filter = ('status', 'event')
+    search_fields = ('reference',)
+    readonly_fields = ('event', 'reference', 'payload', 'error', 'received_at', 'processed_at')
+    ordering = ('-received_at',)
+    actions = ['reprocess_events']
+
+    def reprocess_events(self, request, queryset):
+        """Queue the selected events for reconciliation again (reconciling is idempotent)"""
+        for event in queryset:
+            enqueue('paystack.event', {'event_id': event.pk})
+        django_messages.success(request, f'{queryset.count()} event(s) queued for reconciliation.')
+
+    reprocess_events.short_description = "Reconcile selected events again"
+
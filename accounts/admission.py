@@ -0,0 +1,220 @@
+"""
+Admission control for the routes that get a thundering herd when a
+registration window opens (course registration, school fees, payments).
+
+Each limited route (by URL name, see ADMISSION_CONTROL_ROUTES) runs at most N
+requests at a time. Up to ADMISSION_MAX_QUEUE more wait up to
+ADMISSION_QUEUE_TIMEOUT seconds for a slot; anything beyond that gets a small
+503 "you are in the queue" page with Retry-After instead of tying up the
+process. On top of that every user (or IP, when anonymous) has a token bucket
+of ADMISSION_USER_BURST requests refilled at ADMISSION_USER_RATE per second
+across the limited routes, and an empty bucket gets a 429.
+
+Counters are per process, which matches the single Passenger process the site
+runs under. admission_metrics() exposes them (see the admission_metrics view).
+"""
+
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+
+# Buckets are dropped once this many clients are tracked and they have refilled
+MAX_TRACKED_CLIENTS = 10000
+
+
+class RouteGate:
+    """Concurrency limit with a bounded wait queue for one route"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.throttled = 0
+
+    def enter(self, timeout, max_queue):
+        """
+        Take a slot, waiting up to `timeout` seconds behind the other waiters.
+        Returns None once admitted, or the queue position when shed.
+        """
+        with self.condition:
+            if self.in_flight < self.limit and not self.waiting:
+                self._admit()
+                return None
+            position = self.waiting + 1
+            if position > max_queue or timeout <= 0:
+                self.shed += 1
+                return position
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            deadline = time.monotonic() + timeout
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        return position
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self._admit()
+            return None
+
+    def _admit(self):
+        self.in_flight += 1
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'peak_in_flight': self.peak_in_flight,
+                'peak_queue_depth': self.peak_waiting,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'throttled': self.throttled,
+            }
+
+
+class TokenBuckets:
+    """One token bucket per client key: `burst` tokens, refilled at `rate` per second"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}  # key -> [tokens, last refill]
+
+    def take(self, key, rate, burst):
+        """Spend one token; returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self.buckets[key] = [tokens - 1, now]
+                wait = 0
+            else:
+                self.buckets[key] = [tokens, now]
+                wait = (1 - tokens) / rate if rate > 0 else settings.ADMISSION_RETRY_AFTER
+            if len(self.buckets) > MAX_TRACKED_CLIENTS:
+                self._prune(now, rate, burst)
+        return wait
+
+    def _prune(self, now, rate, burst):
+        for key, (tokens, updated) in list(self.buckets.items()):
+            if tokens + (now - updated) * rate >= burst:
+                del self.buckets[key]
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+_buckets = TokenBuckets()
+
+
+def get_gate(route):
+    """The gate for a limited URL name, or None if the route is not limited"""
+    limit = settings.ADMISSION_CONTROL_ROUTES.get(route)
+    if not limit:
+        return None
+    gate = _gates.get(route)
+    if gate is None or gate.limit != limit:
+        with _gates_lock:
+            gate = _gates.get(route)
+            if gate is None or gate.limit != limit:
+                gate = _gates[route] = RouteGate(route, limit)
+    return gate
+
+
+def admission_metrics():
+    """Per-route concurrency/queue counters for this process"""
+    return {
+        'enabled': settings.ADMISSION_CONTROL_ENABLED,
+        'routes': {route: gate.snapshot() for route, gate in sorted(_gates.items())},
+        'tracked_clients': len(_buckets),
+    }
+
+
+def _client_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def busy_response(request, status, retry_after, position=None):
+    """Small response (no database, no context processors) telling the client when to retry"""
+    data = {
+        'detail': 'Too many requests, please slow down.' if status == 429
+        else 'The server is busy, you have been placed in a queue.',
+        'queue_position': position,
+        'retry_after': retry_after,
+    }
+    wants_json = (
+        'application/json' in request.headers.get('Accept', '')
+        or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    )
+    if wants_json:
+        response = JsonResponse(data, status=status)
+    else:
+        response = HttpResponse(render_to_string('accounts/busy.html', data), status=status)
+    response['Retry-After'] = str(retry_after)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class AdmissionControlMiddleware:
+    """Apply the per-user token bucket and per-route concurrency limits"""
+
+    def __init__(self, get_response):
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            route = resolve(request.path_info).view_name
+        except Resolver404:
+            return self.get_response(request)
+        gate = get_gate(route)
+        if gate is None:
+            return self.get_response(request)
+
+        wait = _buckets.take(
+            _client_key(request), settings.ADMISSION_USER_RATE, settings.ADMISSION_USER_BURST
+        )
+        if wait:
+            with gate.condition:
+                gate.throttled += 1
+            return busy_response(request, 429, max(1, math.ceil(wait)))
+
+        position = gate.enter(settings.ADMISSION_QUEUE_TIMEOUT, settings.ADMISSION_MAX_QUEUE)
+        if position is not None:
+            # Spread retries out: one more base interval per batch of `limit` ahead
+            retry_after = settings.ADMISSION_RETRY_AFTER * (1 + position // gate.limit)
+            return busy_response(request, 503, retry_after, position)
+
+        try:
+            return self.get_response(request)
+        finally:
+            gate.leave()
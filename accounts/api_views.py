@@ -15,6 +15,9 @@ from .serializers import (
     CourseRegistrationSerializer, AcademicRecordSerializer, PaymentTransactionSerializer
 )
 
+# Relations rendered by the nested StudentProfileSerializer
+STUDENT_RELATED = ('student__user', 'student__faculty', 'student__department__faculty')
+
 
 # Authentication Views
 @api_view(['POST'])
@@ -60,6 +63,7 @@ class FacultyListView(generics.ListAPIView):
     queryset = Faculty.objects.all()
     serializer_class = FacultySerializer
     permission_classes = [IsAuthenticated]
+    ordering = ('name', 'id')  # page order for accounts.pagination.KeysetPagination
 
 
 class FacultyDetailView(generics.RetrieveAPIView):
@@ -70,9 +74,10 @@ class FacultyDetailView(generics.RetrieveAPIView):
 
 # Department Views
 class DepartmentListView(generics.ListAPIView):
-    queryset = Department.objects.all()
+    queryset = Department.objects.select_related('faculty')
     serializer_class = DepartmentSerializer
     permission_classes = [IsAuthenticated]
+    ordering = ('name', 'id')
 
 
 class DepartmentDetailView(generics.RetrieveAPIView):
@@ -104,6 +109,7 @@ class CourseListView(generics.ListAPIView):
     queryset = Course.objects.filter(is_active=True)
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    ordering = ('code', 'id')
 
     def get_queryset(self):
         queryset = Course.objects.filter(is_active=True)
@@ -131,12 +137,13 @@ class CourseDetailView(generics.RetrieveAPIView):
 class CourseRegistrationListView(generics.ListCreateAPIView):
     serializer_class = CourseRegistrationSerializer
     permission_classes = [IsAuthenticated]
+    ordering = ('-registration_date', '-id')
 
     def get_queryset(self):
         if self.request.user.user_type == 'student':
-            return CourseRegistration.objects.filter(student__user=self.request.user)
+            return CourseRegistration.objects.filter(student__user=self.request.user).select_related(*STUDENT_RELATED, 'course')
         elif self.request.user.user_type == 'staff':
-            return CourseRegistration.objects.filter(course__department__staff_department=self.request.user.staffprofile)
+            return CourseRegistration.objects.filter(course__department__staff_department=self.request.user.staffprofile).select_related(*STUDENT_RELATED, 'course')
         return CourseRegistration.objects.none()
 
     def perform_create(self, serializer):
@@ -158,10 +165,11 @@ class CourseRegistrationDetailView(generics.RetrieveUpdateDestroyAPIView):
 class AcademicRecordListView(generics.ListAPIView):
     serializer_class = AcademicRecordSerializer
     permission_classes = [IsAuthenticated]
+    ordering = ('-id',)
 
     def get_queryset(self):
         if self.request.user.user_type == 'student':
-            return AcademicRecord.objects.filter(student__user=self.request.user)
+            return AcademicRecord.objects.filter(student__user=self.request.user).select_related(*STUDENT_RELATED).prefetch_related('courses')
         return AcademicRecord.objects.none()
 
 
@@ -169,10 +177,11 @@ class AcademicRecordListView(generics.ListAPIView):
 class PaymentTransactionListView(generics.ListAPIView):
     serializer_class = PaymentTransactionSerializer
     permission_classes = [IsAuthenticated]
+    ordering = ('-payment_date', '-id')
 
     def get_queryset(self):
         if self.request.user.user_type == 'student':
-            return PaymentTransaction.objects.filter(student__user=self.request.user)
+            return PaymentTransaction.objects.filter(student__user=self.request.user).select_related(*STUDENT_RELATED)
         return PaymentTransaction.objects.none()
 
 
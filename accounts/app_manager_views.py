@@ -8,10 +8,17 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.db.models import Q, Count, Avg, Sum
-from django.core.paginator import Paginator
+from core.jobs import APPLICANT_TARGETS
+from core.admissions import admit_applicants
+from core.merit import DEFAULT_TIE_BREAK, TIE_BREAKS, rank_applicants
 from core.models import Applicant, ScreeningForm, ScreeningPayment
+from core.search import search_applicants
+from core.stats import get_admission_stats
+from . import reference_data
 from dashboard.models import Notification
-from .models import ApplicationActivity, ApplicationNote, User
+from .background import enqueue
+from .pagination import KeysetPaginator
+from .models import ApplicationActivity, ApplicationNote, Job, User
 from datetime import datetime, timedelta
 import json
 
@@ -26,57 +33,23 @@ def is_application_manager(user):
 def app_manager_dashboard(request):
     """Application Manager Dashboard with statistics"""
 
-    # Get statistics
-    total_applicants = Applicant.objects.count()
-    pending_applicants = Applicant.objects.filter(status='pending_review').count()
-    admitted_applicants = Applicant.objects.filter(status='approved').count()
-    rejected_applicants = Applicant.objects.filter(status='rejected').count()
-
-    # Payment statistics
-    total_payments = ScreeningPayment.objects.filter(status='success').count()
-    payment_amount = ScreeningPayment.objects.filter(status='success').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-
-    # Document verification stats
-    total_forms = ScreeningForm.objects.count()
-    pending_documents = ScreeningForm.objects.filter(
-        Q(waec_result_status='pending') |
-        Q(jamb_result_slip_status='pending') |
-        Q(passport_photo_status='pending') |
-        Q(birth_certificate_status='pending')
-    ).count()
+    if request.method == 'POST' and request.POST.get('action') == 'refresh_stats':
+        get_admission_stats(refresh=True)
+        messages.success(request, 'Statistics refreshed.')
+        return redirect('accounts:app_manager_dashboard')
+
+    # Counts come from the cached rollup (see core.stats)
+    stats = get_admission_stats()
 
     # Recent activity
     recent_activities = ApplicationActivity.objects.select_related(
         'applicant__user', 'manager'
     )[:10]
 
-    # Applications by program (for chart)
-    applications_by_program = Applicant.objects.values(
-        'programs__name'
-    ).annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-
-    # Recent applications (last 7 days)
-    week_ago = datetime.now() - timedelta(days=7)
-    new_applicants = Applicant.objects.filter(
-        user__date_joined__gte=week_ago
-    ).count()
-
     context = {
-        'total_applicants': total_applicants,
-        'pending_applicants': pending_applicants,
-        'admitted_applicants': admitted_applicants,
-        'rejected_applicants': rejected_applicants,
-        'total_payments': total_payments,
-        'payment_amount': payment_amount,
-        'total_forms': total_forms,
-        'pending_documents': pending_documents,
+        **stats,
+        'stats_computed_at': stats['computed_at'],
         'recent_activities': recent_activities,
-        'applications_by_program': list(applications_by_program),
-        'new_applicants': new_applicants,
     }
 
     return render(request, 'app_manager/dashboard.html', context)
@@ -92,15 +65,10 @@ def applicants_list(request):
         'user', 'programs'
     ).all()
 
-    # Search functionality
+    # Search functionality (prefix match on name/email words and phone digits, see core.search)
     search_query = request.GET.get('search', '')
     if search_query:
-        applicants = applicants.filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(phone_number__icontains=search_query)
-        )
+        applicants = search_applicants(applicants, search_query)
 
     # Filters
     status_filter = request.GET.get('status', '')
@@ -121,16 +89,15 @@ def applicants_list(request):
     elif payment_filter == 'unpaid':
         applicants = applicants.exclude(screening_payments__status='success')
 
-    # Pagination
-    paginator = Paginator(applicants, 25)  # 25 applicants per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Pagination: best matches first when searching, newest first otherwise
+    ordering = ('-search_rank', '-id') if search_query else ('-id',)
+    paginator = KeysetPaginator(applicants, ordering, 25)  # 25 applicants per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     # Get unique courses and states for filters
-    from core.models import Program
     from accounts.state import NIGERIA_STATES_AND_LGAS
 
-    courses = Program.objects.all()
+    courses = reference_data.programs()
     states = list(NIGERIA_STATES_AND_LGAS.keys())
 
     context = {
@@ -362,8 +329,8 @@ def app_manager_documents(request):
 
         return redirect(request.path + f'?doc_status={doc_status}')
 
-    paginator = Paginator(forms, 20)
-    page_obj = paginator.get_page(request.GET.get('page', 1))
+    paginator = KeysetPaginator(forms, ('-id',), 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     context = {
         'page_obj': page_obj,
@@ -378,9 +345,10 @@ def app_manager_merit_list(request):
     """Merit List Generator"""
     from core.models import Program
 
-    programs = Program.objects.all()
+    programs = reference_data.programs()
     merit_list = []
     selected_program = None
+    tie_break = request.GET.get('tie_break', DEFAULT_TIE_BREAK)
 
     if request.GET.get('program'):
         program_id = request.GET.get('program')
@@ -388,63 +356,19 @@ def app_manager_merit_list(request):
         slots = int(request.GET.get('slots', 100))
 
         try:
-            selected_program = Program.objects.get(id=program_id)
-
-            # Get applicants for this program who have paid and submitted
-            applicants = Applicant.objects.filter(
-                programs=selected_program,
-                screening_payments__status='success'
-            ).select_related('user').prefetch_related('screening_forms').distinct()
-
-            # Build merit list with scores
-            for applicant in applicants:
-                form = applicant.screening_forms.first()
-                if form:
-                    try:
-                        score = int(form.jamb_score) if form.jamb_score else 0
-                    except (ValueError, TypeError):
-                        score = 0
-
-                    if score >= min_score:
-                        merit_list.append({
-                            'applicant': applicant,
-                            'jamb_score': score,
-                            'form': form,
-                        })
-
-            # Sort by JAMB score descending
-            merit_list.sort(key=lambda x: x['jamb_score'], reverse=True)
-            merit_list = merit_list[:slots]
-
+            selected_program = reference_data.get('core.Program', program_id)
+            # Ranked, filtered and limited in the database
+            merit_list = rank_applicants(selected_program, min_score, slots, tie_break)
         except Program.DoesNotExist:
             messages.error(request, 'Program not found.')
 
     # Handle bulk admit action
     if request.method == 'POST' and request.POST.get('action') == 'bulk_admit':
-        applicant_ids = request.POST.getlist('applicant_ids')
-        admitted_count = 0
-        for aid in applicant_ids:
-            try:
-                app = Applicant.objects.get(id=aid)
-                app.status = 'approved'
-                app.save()
-
-                Notification.objects.create(
-                    user=app.user,
-                    message=f"Congratulations! You have been offered provisional admission to {app.programs.name}."
-                )
-
-                ApplicationActivity.objects.create(
-                    applicant=app,
-                    manager=request.user,
-                    action='admission_offered',
-                    details=f"Admitted via merit list for {app.programs.name}"
-                )
-                admitted_count += 1
-            except Applicant.DoesNotExist:
-                pass
-
-        messages.success(request, f'{admitted_count} applicants admitted successfully.')
+        result = admit_applicants(request.POST.getlist('applicant_ids'), manager=request.user)
+        message = f"{result['admitted']} applicants admitted successfully."
+        if result['skipped']:
+            message += f" {result['skipped']} skipped (already admitted or not found)."
+        messages.success(request, message)
         return redirect(request.get_full_path())
 
     context = {
@@ -453,6 +377,8 @@ def app_manager_merit_list(request):
         'selected_program': selected_program,
         'min_score': request.GET.get('min_score', 0),
         'slots': request.GET.get('slots', 100),
+        'tie_break': tie_break,
+        'tie_breaks': [(name, label) for name, (label, _) in TIE_BREAKS.items()],
     }
     return render(request, 'app_manager/merit_list.html', context)
 
@@ -471,39 +397,19 @@ def app_manager_communicate(request):
             messages.error(request, 'Message cannot be empty.')
             return redirect('accounts:app_manager_communicate')
 
-        # Determine recipients
-        if target == 'all':
-            recipients = Applicant.objects.select_related('user').all()
-        elif target == 'admitted':
-            recipients = Applicant.objects.filter(status='approved').select_related('user')
-        elif target == 'pending':
-            recipients = Applicant.objects.filter(status='pending_review').select_related('user')
-        elif target == 'rejected':
-            recipients = Applicant.objects.filter(status='rejected').select_related('user')
-        elif target == 'paid':
-            recipients = Applicant.objects.filter(
-                screening_payments__status='success'
-            ).select_related('user').distinct()
-        else:
-            recipients = Applicant.objects.none()
-
-        count = 0
-        for applicant in recipients:
-            personalised = message_text.replace('{name}', applicant.user.get_full_name())
-            Notification.objects.create(
-                user=applicant.user,
-                message=f"{subject}: {personalised}" if subject else personalised
-            )
-            count += 1
+        if target not in APPLICANT_TARGETS:
+            messages.error(request, 'Please choose who should receive the notification.')
+            return redirect('accounts:app_manager_communicate')
 
-        ApplicationActivity.objects.create(
-            applicant=recipients.first() if recipients.exists() else None,
-            manager=request.user,
-            action='notification_sent',
-            details=f"Bulk notification sent to {count} applicants. Target: {target}"
-        ) if count > 0 else None
+        # Personalising and writing one notification per applicant happens in a background job
+        enqueue('applicants.notify', {
+            'target': target,
+            'subject': subject,
+            'message': message_text,
+            'activity_details': f"Bulk notification sent to {{count}} applicants. Target: {target}",
+        }, created_by=request.user)
 
-        messages.success(request, f'Notification sent to {count} applicants.')
+        messages.success(request, 'Notification queued. Progress is shown under Recent Broadcasts.')
         return redirect('accounts:app_manager_communicate')
 
     context = {
@@ -511,5 +417,21 @@ def app_manager_communicate(request):
         'admitted_count': Applicant.objects.filter(status='approved').count(),
         'pending_count': Applicant.objects.filter(status='pending_review').count(),
         'rejected_count': Applicant.objects.filter(status='rejected').count(),
+        'recent_jobs': Job.objects.filter(name='applicants.notify', created_by=request.user)[:5],
     }
     return render(request, 'app_manager/communicate.html', context)
+
+
+@login_required
+@user_passes_test(is_application_manager, login_url='/accounts/app-manager/login/')
+def app_manager_job_status(request, job_id):
+    """JSON progress of a background job started by this manager"""
+    job = get_object_or_404(Job, id=job_id, created_by=request.user)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'result': job.result,
+    })
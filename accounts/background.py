@@ -0,0 +1,172 @@
+"""
+Background jobs stored in the accounts.Job table.
+
+Handlers are plain functions registered under a name with @job_handler and
+live in a `jobs.py` module of any installed app (autodiscovered like admin.py).
+Any view can call enqueue() to hand slow work off.
+
+Jobs are executed by `manage.py run_workers`, which claims queued rows with
+SELECT ... FOR UPDATE SKIP LOCKED where the database supports it and a
+conditional UPDATE everywhere (so SQLite works too). Failed jobs are retried
+with exponential backoff until max_attempts is reached. When JOBS_RUN_IN_THREAD
+is on (the default, for deployments without a worker) enqueue() also starts
+the job in a daemon thread after commit, and a retry is re-run by a daemon
+timer once its backoff has passed; whichever side claims it first runs it.
+Timers die with their process, so production should still run `run_workers`
+(see the deploy guides) to pick up jobs a restarted web process left behind.
+"""
+
+import logging
+import random
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+_discovered = False
+
+
+def job_handler(name):
+    """Register `func(job)` as the handler for jobs called `name`"""
+    def register(func):
+        HANDLERS[name] = func
+        return func
+    return register
+
+
+def get_handler(name):
+    global _discovered
+    if not _discovered:
+        autodiscover_modules('jobs')
+        _discovered = True
+    return HANDLERS[name]
+
+
+def enqueue(name, payload=None, created_by=None, total=0, max_attempts=None, delay=0):
+    """Store a job for the workers (and start it in a thread if JOBS_RUN_IN_THREAD)"""
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        created_by=created_by,
+        total=total,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    if settings.JOBS_RUN_IN_THREAD:
+        transaction.on_commit(lambda: start_in_thread(job.pk, delay))
+    return job
+
+
+def start_in_thread(job_id, delay=0):
+    """Run the job in a daemon thread, now or after `delay` seconds"""
+    if delay:
+        timer = threading.Timer(delay, _run_in_thread, args=(job_id,))
+        timer.daemon = True
+        timer.start()
+    else:
+        threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True).start()
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        job = claim(f"thread:{uuid.uuid4().hex[:8]}", job_id=job_id)
+        if job is not None:
+            run_job(job)
+    except Exception:
+        logger.exception("Background job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run (locked longer than JOBS_LOCK_TIMEOUT)"""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued', locked_by='', locked_at=None, run_after=timezone.now()
+    )
+
+
+def claim(worker_id, job_id=None, names=None):
+    """
+    Atomically take the next due queued job (or the given one) for `worker_id`.
+    Returns the claimed Job or None.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_after__lte=now)
+    if job_id is not None:
+        due = due.filter(pk=job_id)
+    if names:
+        due = due.filter(name__in=names)
+    due = due.order_by('run_after', 'pk').values_list('pk', flat=True)
+
+    def take(candidate):
+        # The status condition keeps this safe on databases without row locks
+        return Job.objects.filter(pk=candidate, status='queued').update(
+            status='running',
+            locked_by=f"{worker_id}:{uuid.uuid4().hex[:8]}",
+            locked_at=now,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            candidate = due.select_for_update(skip_locked=True).first()
+            claimed = candidate is not None and take(candidate)
+    else:
+        # e.g. SQLite: a lone conditional UPDATE avoids holding a read lock
+        # across two statements; losing the race just returns None
+        candidate = due.first()
+        claimed = candidate is not None and take(candidate)
+
+    if not claimed:
+        return None
+    return Job.objects.get(pk=candidate)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped at an hour"""
+    delay = min(settings.JOBS_RETRY_BACKOFF * (2 ** (attempts - 1)), 3600)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(job):
+    """Run a claimed job, recording the result or scheduling a retry"""
+    retry_in = None
+    try:
+        result = get_handler(job.name)(job)
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+        job.error = traceback.format_exc()
+        job.result = {}
+        if job.attempts < job.max_attempts:
+            retry_in = retry_delay(job.attempts)
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=retry_in)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'done'
+        job.error = ''
+        job.result = result if isinstance(result, dict) else {}
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'error', 'result', 'run_after', 'finished_at', 'locked_by', 'locked_at'])
+    if retry_in is not None and settings.JOBS_RUN_IN_THREAD:
+        # Without a run_workers process nothing else would pick the retry up
+        start_in_thread(job.pk, retry_in + 1)
+    return job
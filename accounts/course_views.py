@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q
+from . import payments, reference_data
 from .models import Course, CourseOffering, CourseRegistration, Department, StudentProfile, PaymentTransaction, AcademicSession, Level
 
 def is_staff(user):
@@ -27,8 +29,8 @@ def create_course(request):
         # Restrict to staff's programme type only
         staff_dept = request.user.staffprofile.department
         staff_programme_type = getattr(staff_dept.faculty, 'programme_type', 'degree') or 'degree'
-        allowed_dept_ids = set(Department.objects.filter(faculty__programme_type=staff_programme_type).values_list('id', flat=True))
-        allowed_level_ids = set(Level.objects.filter(programme_type=staff_programme_type).values_list('id', flat=True))
+        allowed_dept_ids = {d.id for d in reference_data.departments(staff_programme_type)}
+        allowed_level_ids = {lvl.id for lvl in reference_data.levels(staff_programme_type)}
 
         offerings_created = 0
         for dept_id in selected_departments:
@@ -37,8 +39,8 @@ def create_course(request):
                     did, lid = int(dept_id), int(level_id)
                     if did not in allowed_dept_ids or lid not in allowed_level_ids:
                         continue
-                    department = Department.objects.get(id=did)
-                    level = Level.objects.get(id=lid)
+                    department = reference_data.get('accounts.Department', did)
+                    level = reference_data.get('accounts.Level', lid)
                     CourseOffering.objects.create(
                         course=course,
                         department=department,
@@ -59,8 +61,8 @@ def create_course(request):
     # Staff can create courses for any department in their programme type (multiple depts can offer one course)
     staff_dept = request.user.staffprofile.department
     staff_programme_type = getattr(staff_dept.faculty, 'programme_type', 'degree') or 'degree'
-    departments = Department.objects.filter(faculty__programme_type=staff_programme_type).select_related('faculty').order_by('name')
-    levels = Level.objects.filter(programme_type=staff_programme_type).order_by('order')
+    departments = reference_data.departments(staff_programme_type)
+    levels = reference_data.levels(staff_programme_type)
     
     context = {
         'departments': departments,
@@ -134,81 +136,73 @@ def manage_courses(request):
 
 @login_required
 def register_courses(request):
-    student = request.user.studentprofile
+    # One query for the profile and everything the page reads off it; primed
+    # on request.user so the templates reuse it
+    student = StudentProfile.objects.select_related(
+        'current_level', 'current_session', 'department'
+    ).get(user=request.user)
+    request.user.studentprofile = student
 
     # Check if student has paid school fees for current session
-    has_paid = PaymentTransaction.objects.filter(
-        student=student,
-        session=student.current_session.name if student.current_session else "2023/2024",
-        semester=student.current_semester,
-        status='success'
-    ).exists()
+    has_paid = payments.has_cleared_fees(student, student.current_session, student.current_semester)
 
     if not has_paid:
         messages.error(request, "You need to pay your school fees before registering courses.")
         return redirect('accounts:school_fees')
 
-    if request.method == 'POST':
-        selected_course_ids = request.POST.getlist('courses')
-        student = request.user.studentprofile
+    # Allow current level + carry-over (any level up to current), same programme type only
+    student_programme_type = getattr(student, 'programme_type', 'degree') or 'degree'
+    current_level_order = student.current_level.order
+    available_levels = reference_data.levels(student_programme_type, max_order=current_level_order)
 
-        # Get the selected courses to determine which semesters and levels to clear
-        selected_courses = Course.objects.filter(id__in=selected_course_ids)
-        affected_semesters = set(selected_courses.values_list('semester', flat=True))
+    if request.method == 'POST':
+        selected_course_ids = [
+            course_id for course_id in request.POST.getlist('courses') if course_id.isdigit()
+        ]
+
+        # Resolve every selected course that is offered to this student in one query
+        eligible = dict(
+            CourseOffering.objects.filter(
+                course_id__in=selected_course_ids,
+                department=student.department,
+                level__in=available_levels,
+                is_active=True
+            ).values_list('course_id', 'course__semester').distinct()
+        )
+        affected_semesters = set(eligible.values())
 
-        # Clear existing registrations ONLY for the current session affected by this semester
-        # We do NOT touch historical registrations from previous sessions
-        for semester in affected_semesters:
+        with transaction.atomic():
+            # Clear existing registrations ONLY for the current session affected by this semester
+            # We do NOT touch historical registrations from previous sessions
             CourseRegistration.objects.filter(
                 student=student,
-                course__semester=semester,
+                course__semester__in=affected_semesters,
                 academic_session=student.current_session,
                 status='registered'
             ).delete()
 
-        # Allow current level + carry-over (any level up to current), same programme type only
-        student_programme_type = getattr(student, 'programme_type', 'degree') or 'degree'
-        current_level_order = student.current_level.order
-        available_levels = Level.objects.filter(
-            programme_type=student_programme_type,
-            order__lte=current_level_order
-        )
-
-        registered_count = 0
-        for course_id in selected_course_ids:
-            try:
-                course = Course.objects.get(id=course_id)
-                offering_exists = CourseOffering.objects.filter(
-                    course=course,
-                    department=student.department,
-                    level__in=available_levels,
-                    is_active=True
-                ).exists()
-
-                if offering_exists:
-                    CourseRegistration.objects.update_or_create(
+            CourseRegistration.objects.bulk_create(
+                [
+                    CourseRegistration(
                         student=student,
-                        course=course,
+                        course_id=course_id,
                         academic_session=student.current_session,
-                        defaults={'status': 'registered'}
+                        status='registered'
                     )
-                    registered_count += 1
-            except Course.DoesNotExist:
-                continue
+                    for course_id in eligible
+                ],
+                ignore_conflicts=True
+            )
+            # Rows that survived the delete (dropped/completed) are re-registered
+            CourseRegistration.objects.filter(
+                student=student,
+                course_id__in=eligible,
+                academic_session=student.current_session
+            ).exclude(status='registered').update(status='registered')
 
-        messages.success(request, f'Successfully registered for {registered_count} course(s)!')
+        messages.success(request, f'Successfully registered for {len(eligible)} course(s)!')
         return redirect('accounts:view_registered_courses')
 
-    student = request.user.studentprofile
-
-    # Restrict to same programme type (degree/ND/NCE) so ND students only see ND1/ND2, etc.
-    student_programme_type = getattr(student, 'programme_type', 'degree') or 'degree'
-    current_level_order = student.current_level.order
-    available_levels = Level.objects.filter(
-        programme_type=student_programme_type,
-        order__lte=current_level_order
-    ).order_by('order')
-
     # Broaden query to allow students to see:
     # 1. Current level courses in current session.
     # 2. Previous level courses from ANY session (to allow Carry-over selection).
@@ -240,13 +234,15 @@ def register_courses(request):
             elif offering.course.semester == 'second':
                 carry_over_courses['second'].append(course_data)
 
-    # Get registered courses for the current academic session ONLY
-    registered_courses = CourseRegistration.objects.filter(
-        student=student,
-        academic_session=student.current_session
-    ).select_related('course', 'academic_session', 'course__academic_session')
+    # Get registered courses for the current academic session ONLY (evaluated once)
+    registered_courses = list(
+        CourseRegistration.objects.filter(
+            student=student,
+            academic_session=student.current_session
+        ).select_related('course', 'academic_session', 'course__academic_session')
+    )
 
-    registered_course_ids = set(reg.course.id for reg in registered_courses)
+    registered_course_ids = set(reg.course_id for reg in registered_courses)
     has_carry_over_courses = len(carry_over_courses['first']) > 0 or len(carry_over_courses['second']) > 0
 
     context = {
@@ -254,7 +250,7 @@ def register_courses(request):
         'carry_over_courses': carry_over_courses,
         'registered_course_ids': registered_course_ids,
         'registered_courses': registered_courses,
-        'total_registered': registered_courses.count(),
+        'total_registered': len(registered_courses),
         'total_credits': sum(reg.course.credits for reg in registered_courses),
         'has_carry_over_courses': has_carry_over_courses
     }
@@ -2,6 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import F, Max, Q, Value
+from django.db.models.functions import Coalesce, Concat
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
@@ -10,6 +13,14 @@ from .models import (
     Course, CourseOffering, CourseRegistration, StudentProfile,
     AcademicSession, Level, Department, Faculty
 )
+from . import reference_data
+from .exports import EXPORT_CHUNK_SIZE, export_response
+from .gpa import recompute_semester_gpas
+from .result_import import commit_import, plan_import
+from .results import bulk_upsert_results, eligible_students, exam_officer_summary, with_result_progress
+
+
+GPA_PAGE_SIZE = 50
 
 
 def is_exam_officer(user):
@@ -49,38 +60,11 @@ def exam_officer_dashboard(request):
     assigned_types = officer.assigned_programme_types
 
     # Get current academic session
-    current_session = AcademicSession.objects.filter(is_active=True).first()
+    current_session = AcademicSession.get_active()
     session_name = f"{current_session.start_year}/{current_session.end_year}" if current_session else "N/A"
 
-    # Stats for assigned programme types
-    total_courses = Course.objects.filter(
-        offerings__department__faculty__programme_type__in=assigned_types,
-        academic_session=current_session
-    ).distinct().count() if current_session and assigned_types else 0
-
-    total_results_uploaded = Result.objects.filter(
-        uploaded_by=request.user,
-        academic_session=current_session
-    ).count() if current_session else 0
-
-    # Get courses that need results (have registered students but no results yet)
-    pending_courses = 0
-    if current_session and assigned_types:
-        courses_with_registrations = Course.objects.filter(
-            offerings__department__faculty__programme_type__in=assigned_types,
-            academic_session=current_session,
-            is_active=True,
-            registrations__status='registered'
-        ).distinct()
-        for course in courses_with_registrations:
-            registered_count = CourseRegistration.objects.filter(
-                course=course, status='registered'
-            ).count()
-            results_count = Result.objects.filter(
-                course=course, academic_session=current_session
-            ).count()
-            if results_count < registered_count:
-                pending_courses += 1
+    # Stats for assigned programme types (cached; refreshed when results are written)
+    summary = exam_officer_summary(request.user, assigned_types, current_session)
 
     # Recent uploads
     recent_results = Result.objects.filter(
@@ -92,9 +76,9 @@ def exam_officer_dashboard(request):
         'session_name': session_name,
         'current_session': current_session,
         'assigned_types': assigned_types,
-        'total_courses': total_courses,
-        'total_results_uploaded': total_results_uploaded,
-        'pending_courses': pending_courses,
+        'total_courses': summary['total_courses'],
+        'total_results_uploaded': summary['total_results_uploaded'],
+        'pending_courses': summary['pending_courses'],
         'recent_results': recent_results,
     }
     return render(request, 'accounts/exam_officer/dashboard.html', context)
@@ -107,7 +91,7 @@ def select_course(request):
     officer = request.user.examofficerprofile
     assigned_types = officer.assigned_programme_types
 
-    current_session = AcademicSession.objects.filter(is_active=True).first()
+    current_session = AcademicSession.get_active()
 
     # Get filter params
     filter_session = request.GET.get('session', '')
@@ -123,7 +107,7 @@ def select_course(request):
 
     course_data = []
     
-    active_session = AcademicSession.objects.filter(is_active=True).first()
+    active_session = AcademicSession.get_active()
     is_historical = selected_session != active_session
     
     # Check if user has actively searched using specific filters (not just session)
@@ -154,31 +138,14 @@ def select_course(request):
             except ValueError:
                 pass
 
-        # Build course data with registration counts and result status
-        from django.db.models import Q
+        # Build course data with registration counts and result status in one query.
+        # For historical sessions, a cohort based on current level is meaningless.
+        courses = with_result_progress(courses, selected_session, include_cohort=not is_historical)
         for course in courses:
-            # Get offerings to find eligible students
-            course_offerings = CourseOffering.objects.filter(course=course)
-            
-            if not is_historical:
-                # Active session: calculate potential eligible from current level
-                student_q = Q()
-                for offering in course_offerings:
-                    student_q |= Q(department=offering.department, current_level=offering.level)
-                
-                cohort_size = StudentProfile.objects.filter(student_q).count() if course_offerings.exists() else 0
-            else:
-                # Historical session: cohort_size based on current level is meaningless
-                cohort_size = 0
-            
-            registered = CourseRegistration.objects.filter(
-                course=course, status='registered', academic_session=selected_session
-            ).count()
-            
-            results_done = Result.objects.filter(
-                course=course, academic_session=selected_session
-            ).count()
-            
+            registered = course.registered
+            results_done = course.results_done
+            cohort_size = course.cohort_size
+
             # Use max to get the realistic denominator
             total_eligible = max(registered, results_done, cohort_size)
             
@@ -192,9 +159,7 @@ def select_course(request):
 
     # Get available filters
     available_sessions = AcademicSession.objects.all().order_by('-start_year')
-    available_levels = Level.objects.filter(
-        programme_type__in=assigned_types
-    ).order_by('order')
+    available_levels = reference_data.levels(assigned_types)
 
     context = {
         'course_data': course_data,
@@ -225,7 +190,7 @@ def upload_results(request, course_id):
     if session_id:
         current_session = get_object_or_404(AcademicSession, id=session_id)
     else:
-        current_session = AcademicSession.objects.filter(is_active=True).first()
+        current_session = AcademicSession.get_active()
 
     # Verify this course belongs to officer's assigned programme types
     valid_offerings = CourseOffering.objects.filter(
@@ -237,35 +202,13 @@ def upload_results(request, course_id):
         return redirect('accounts:exam_officer_select_course')
 
     # Determine if this is a historical session
-    active_session = AcademicSession.objects.filter(is_active=True).first()
+    active_session = AcademicSession.get_active()
     is_historical = current_session != active_session
 
-    # Get all departments and levels that offer this course
-    offering_dept_levels = valid_offerings.values_list('department_id', 'level_id')
-
-    # Build query to get the correct students
-    from django.db.models import Q
-    student_q = Q()
-    
-    if not is_historical:
-        # For the active session, pull everyone currently in the level to allow uploading for unregistered students
-        for dept_id, level_id in offering_dept_levels:
-            student_q |= Q(department_id=dept_id, current_level_id=level_id)
-            
-    # Always include students who actually registered or already have results for this course/session
-    student_q |= Q(
-        registrations__course=course, 
-        registrations__academic_session=current_session,
-        registrations__status='registered'
-    )
-    student_q |= Q(
-        results__course=course,
-        results__academic_session=current_session
-    )
-
-    all_students = StudentProfile.objects.filter(
-        student_q
-    ).distinct().select_related('user', 'current_level', 'department').order_by('user__id_number')
+    # Students in an offering department/level (active session only), registered, or with a result
+    all_students = eligible_students(
+        course, current_session, assigned_types, include_cohort=not is_historical
+    ).select_related('user', 'current_level', 'department').order_by('user__id_number')
 
     # Get set of registered student IDs for this course
     registered_student_ids = set(
@@ -276,57 +219,20 @@ def upload_results(request, course_id):
     )
 
     if request.method == 'POST':
-        saved_count = 0
-        errors = []
-        for student in all_students:
-            test_key = f"test_{student.id}"
-            exam_key = f"exam_{student.id}"
-
-            test_score = request.POST.get(test_key, '').strip()
-            exam_score = request.POST.get(exam_key, '').strip()
-
-            if not test_score and not exam_score:
-                continue  # Skip students with no scores entered
-
-            try:
-                test_val = float(test_score) if test_score else 0
-                exam_val = float(exam_score) if exam_score else 0
-
-                if test_val < 0 or test_val > 40:
-                    errors.append(f"{student.user.get_full_name()}: Test score must be 0-40")
-                    continue
-                if exam_val < 0 or exam_val > 60:
-                    errors.append(f"{student.user.get_full_name()}: Exam score must be 0-60")
-                    continue
-
-                # Get the level from the course offering for this student
-                offering = CourseOffering.objects.filter(
-                    course=course,
-                    department=student.department
-                ).first()
-                level = offering.level if offering else student.current_level
-
-                result, created = Result.objects.update_or_create(
-                    student=student,
-                    course=course,
-                    academic_session=current_session,
-                    defaults={
-                        'semester': course.semester,
-                        'level': level,
-                        'test_score': test_val,
-                        'exam_score': exam_val,
-                        'uploaded_by': request.user,
-                    }
-                )
-                
-                # IMPORTANT: update_or_create doesn't always trigger custom save() logic 
-                # (like calculate_grade) if fields don't seem to change in the way Django expects,
-                # or it might use bulk updates. We must call save() explicitly to force recalculation.
-                result.save()
-                
-                saved_count += 1
-            except (ValueError, TypeError) as e:
-                errors.append(f"{student.user.get_full_name()}: Invalid score value")
+        report = bulk_upsert_results(
+            course,
+            current_session,
+            (
+                (student, request.POST.get(f"test_{student.id}", ''), request.POST.get(f"exam_{student.id}", ''))
+                for student in all_students
+            ),
+            uploaded_by=request.user,
+        )
+        saved_count = report['saved']
+        errors = [
+            f"{row['student'].user.get_full_name()}: {row['message']}"
+            for row in report['errors']
+        ]
 
         if errors:
             for err in errors:
@@ -334,34 +240,11 @@ def upload_results(request, course_id):
         if saved_count > 0:
             messages.success(request, f"Successfully saved {saved_count} result(s) for {course.code}!")
 
-            # Auto-calculate GPA/CGPA for all students who got results
-            students_with_results = Result.objects.filter(
-                course=course,
-                academic_session=current_session
-            ).values_list('student_id', flat=True).distinct()
-
-            gpa_updated = 0
-            for student_id in students_with_results:
-                try:
-                    student_profile = StudentProfile.objects.get(id=student_id)
-                    # Get or create SemesterGPA for this student/session/semester
-                    semester_gpa, created = SemesterGPA.objects.get_or_create(
-                        student=student_profile,
-                        academic_session=current_session,
-                        semester=course.semester,
-                        defaults={
-                            'level': student_profile.current_level,
-                        }
-                    )
-                    # Calculate GPA for this semester
-                    semester_gpa.calculate_gpa()
-                    # Calculate cumulative GPA
-                    semester_gpa.calculate_cgpa()
-                    semester_gpa.save()
-
-                    gpa_updated += 1
-                except Exception as e:
-                    print(f"Error calculating GPA for student {student_id}: {e}")
+            # Recompute GPA/CGPA only for the students whose result was written
+            gpa_updated = recompute_semester_gpas(
+                (student_id, current_session.id, course.semester)
+                for student_id in report['student_ids']
+            )
 
             if gpa_updated > 0:
                 messages.info(request, f"GPA/CGPA updated for {gpa_updated} student(s).")
@@ -402,6 +285,99 @@ def upload_results(request, course_id):
     return render(request, 'accounts/exam_officer/upload_results.html', context)
 
 
+@login_required
+@user_passes_test(is_exam_officer)
+def import_results(request):
+    """Import scores from a CSV/XLSX sheet: upload, dry-run preview, then commit"""
+    officer = request.user.examofficerprofile
+    assigned_types = officer.assigned_programme_types
+    current_session = AcademicSession.get_active()
+
+    if request.method == 'POST':
+        action = request.POST.get('action', 'preview')
+
+        if action == 'cancel':
+            request.session.pop('result_import', None)
+            messages.info(request, "Import cancelled.")
+            return redirect('accounts:exam_officer_import_results')
+
+        if action == 'commit':
+            pending = request.session.pop('result_import', None)
+            if not pending:
+                messages.error(request, "Nothing to import. Please upload the file again.")
+                return redirect('accounts:exam_officer_import_results')
+            session = get_object_or_404(AcademicSession, id=pending['session_id'])
+            saved = commit_import(pending['rows'], session, request.user)
+            messages.success(request, f"Imported {saved} result(s) for {session.name}. GPA/CGPA updated.")
+            return redirect('accounts:exam_officer_select_course')
+
+        # Preview (dry run)
+        session_id = request.POST.get('session')
+        session = get_object_or_404(AcademicSession, id=session_id) if session_id else current_session
+        uploaded_file = request.FILES.get('file')
+        if not session:
+            messages.error(request, "No active academic session found. Please select a session.")
+        elif not uploaded_file:
+            messages.error(request, "Please choose a CSV or XLSX file to import.")
+        else:
+            try:
+                plan = plan_import(uploaded_file, session, assigned_types)
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                request.session['result_import'] = {'session_id': session.id, 'rows': plan['rows']}
+                context = {
+                    'plan': plan,
+                    'selected_session': session,
+                    'file_name': uploaded_file.name,
+                }
+                return render(request, 'accounts/exam_officer/import_results.html', context)
+
+    context = {
+        'available_sessions': AcademicSession.objects.all().order_by('-start_year'),
+        'current_session': current_session,
+    }
+    return render(request, 'accounts/exam_officer/import_results.html', context)
+
+
+def filtered_gpa_records(assigned_types, session, filter_level='', filter_department=''):
+    """SemesterGPA rows for a session, limited to the officer's programme types and filters"""
+    gpa_records = SemesterGPA.objects.filter(
+        academic_session=session,
+        student__programme_type__in=assigned_types
+    ).order_by('student__department__name', 'student__user__last_name')
+
+    if filter_level:
+        gpa_records = gpa_records.filter(level_id=filter_level)
+
+    if filter_department:
+        gpa_records = gpa_records.filter(student__department_id=filter_department)
+
+    return gpa_records
+
+
+def pivot_semester_gpas(gpa_records):
+    """
+    Group SemesterGPA rows by student in the database: first/second semester
+    GPA and credits become columns, CGPA is taken from the later semester.
+    """
+    first, second = Q(semester='first'), Q(semester='second')
+    return gpa_records.values('student_id').annotate(
+        full_name=Concat('student__user__first_name', Value(' '), 'student__user__last_name'),
+        id_number=F('student__user__id_number'),
+        department_name=F('student__department__name'),
+        last_name=F('student__user__last_name'),
+        level_name=Coalesce(
+            Max('level__display_name', filter=first), Max('level__display_name', filter=second)
+        ),
+        first_gpa=Max('gpa', filter=first),
+        first_credits=Max('total_credits', filter=first),
+        second_gpa=Max('gpa', filter=second),
+        second_credits=Max('total_credits', filter=second),
+        cgpa=Coalesce(Max('cgpa', filter=second), Max('cgpa', filter=first)),
+    ).order_by('department_name', 'last_name', 'student_id')
+
+
 @login_required
 @user_passes_test(is_exam_officer)
 def view_student_gpas(request):
@@ -414,7 +390,7 @@ def view_student_gpas(request):
     filter_level = request.GET.get('level', '')
     filter_department = request.GET.get('department', '')
 
-    current_session = AcademicSession.objects.filter(is_active=True).first()
+    current_session = AcademicSession.get_active()
 
     # Use selected session or current
     if filter_session:
@@ -422,52 +398,20 @@ def view_student_gpas(request):
     else:
         selected_session = current_session
 
-    # Get all SemesterGPA records for the selected session
-    gpa_records = SemesterGPA.objects.filter(
-        academic_session=selected_session,
-        student__programme_type__in=assigned_types
-    ).select_related(
-        'student__user', 'student__department', 'student__current_level',
-        'level', 'academic_session'
-    ).order_by('student__department__name', 'student__user__last_name')
-
-    if filter_level:
-        gpa_records = gpa_records.filter(level_id=filter_level)
-
-    if filter_department:
-        gpa_records = gpa_records.filter(student__department_id=filter_department)
-
-    # Group by student for display
-    from collections import OrderedDict
-    student_gpas = OrderedDict()
-    for record in gpa_records:
-        student_id = record.student_id
-        if student_id not in student_gpas:
-            student_gpas[student_id] = {
-                'student': record.student,
-                'first_semester': None,
-                'second_semester': None,
-                'cgpa': 0.00,
-            }
-        if record.semester == 'first':
-            student_gpas[student_id]['first_semester'] = record
-        elif record.semester == 'second':
-            student_gpas[student_id]['second_semester'] = record
-        # Use the latest CGPA
-        if float(record.cgpa) > float(student_gpas[student_id]['cgpa']):
-            student_gpas[student_id]['cgpa'] = record.cgpa
+    # One row per student with the two semesters pivoted into columns
+    student_gpas = pivot_semester_gpas(
+        filtered_gpa_records(assigned_types, selected_session, filter_level, filter_department)
+    )
+    paginator = Paginator(student_gpas, GPA_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
 
     # Get available filters
     available_sessions = AcademicSession.objects.all().order_by('-start_year')
-    available_levels = Level.objects.filter(
-        programme_type__in=assigned_types
-    ).order_by('order')
-    available_departments = Department.objects.filter(
-        faculty__programme_type__in=assigned_types
-    ).order_by('name')
+    available_levels = reference_data.levels(assigned_types)
+    available_departments = reference_data.departments(assigned_types)
 
     context = {
-        'student_gpas': student_gpas,
+        'page_obj': page_obj,
         'available_sessions': available_sessions,
         'available_levels': available_levels,
         'available_departments': available_departments,
@@ -475,6 +419,70 @@ def view_student_gpas(request):
         'filter_session': filter_session,
         'filter_level': filter_level,
         'filter_department': filter_department,
-        'total_records': len(student_gpas),
+        'total_records': paginator.count,
     }
     return render(request, 'accounts/exam_officer/student_gpas.html', context)
+
+
+@login_required
+@user_passes_test(is_exam_officer)
+def export_course_results(request, course_id):
+    """Download the result sheet for one course/session as CSV (default) or XLSX"""
+    officer = request.user.examofficerprofile
+    course = get_object_or_404(Course, id=course_id)
+
+    if not CourseOffering.objects.filter(
+        course=course, department__faculty__programme_type__in=officer.assigned_programme_types
+    ).exists():
+        messages.error(request, "You are not authorized to export results for this course.")
+        return redirect('accounts:exam_officer_select_course')
+
+    session_id = request.GET.get('session')
+    if session_id:
+        session = get_object_or_404(AcademicSession, id=session_id)
+    else:
+        session = AcademicSession.get_active()
+
+    rows = Result.objects.filter(
+        course=course, academic_session=session
+    ).order_by('student__user__id_number').values_list(
+        'student__user__id_number', 'student__user__last_name', 'student__user__first_name',
+        'student__department__name', 'level__display_name',
+        'test_score', 'exam_score', 'total_score', 'grade', 'grade_point',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    header = ['Matric No', 'Surname', 'First Name', 'Department', 'Level',
+              'Test (40)', 'Exam (60)', 'Total', 'Grade', 'Grade Point']
+    session_label = session.name.replace('/', '-') if session else 'no-session'
+    filename = f"{course.code}_{session_label}_results"
+    return export_response(request.GET.get('format', 'csv'), filename, header, rows)
+
+
+@login_required
+@user_passes_test(is_exam_officer)
+def export_student_gpas(request):
+    """Download the session GPA broadsheet; accepts the same filters as view_student_gpas"""
+    officer = request.user.examofficerprofile
+    assigned_types = officer.assigned_programme_types
+
+    filter_session = request.GET.get('session', '')
+    if filter_session:
+        selected_session = get_object_or_404(AcademicSession, id=filter_session)
+    else:
+        selected_session = AcademicSession.get_active()
+
+    rows = filtered_gpa_records(
+        assigned_types, selected_session,
+        request.GET.get('level', ''), request.GET.get('department', '')
+    ).order_by(
+        'student__department__name', 'student__user__last_name', 'student_id', 'semester'
+    ).values_list(
+        'student__user__id_number', 'student__user__last_name', 'student__user__first_name',
+        'student__department__name', 'level__display_name', 'semester',
+        'total_credits', 'total_quality_points', 'gpa', 'cumulative_credits', 'cgpa',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    header = ['Matric No', 'Surname', 'First Name', 'Department', 'Level', 'Semester',
+              'Credits', 'Quality Points', 'GPA', 'Cumulative Credits', 'CGPA']
+    session_label = selected_session.name.replace('/', '-') if selected_session else 'no-session'
+    return export_response(request.GET.get('format', 'csv'), f"gpa_broadsheet_{session_label}", header, rows)
@@ -0,0 +1,66 @@
+"""
+CSV/XLSX download helpers.
+
+CSV is streamed row by row with StreamingHttpResponse; XLSX is built with
+openpyxl's write-only workbook (rows are flushed to a temporary file rather
+than kept in memory) and sent as a file response. Callers pass row iterators
+such as queryset.values_list(...).iterator(chunk_size=...).
+"""
+
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(filename, header, rows):
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield '\ufeff'  # BOM so Excel opens UTF-8 names correctly
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(filename, header, rows):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(list(row))
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f"{filename}.xlsx",
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def export_response(export_format, filename, header, rows):
+    """Return an XLSX download when asked for (and openpyxl is installed), CSV otherwise"""
+    if export_format == 'xlsx':
+        try:
+            return xlsx_response(filename, header, rows)
+        except ImportError:
+            pass
+    return csv_response(filename, header, rows)
@@ -0,0 +1,211 @@
+"""
+Set-based GPA/CGPA recomputation.
+
+Instead of calling SemesterGPA.calculate_gpa()/calculate_cgpa() per student
+(each re-scanning that student's whole history), recompute only the affected
+(student, session, semester) keys with grouped aggregate queries and write
+the SemesterGPA rows back in bulk.
+
+Each SemesterGPA row also stores running credit/quality point totals in
+session/semester order, so its CGPA can be read without touching other rows.
+"""
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Window
+from django.db.models.expressions import RowRange
+
+from .models import Result, SemesterGPA, StudentProfile
+from .utils import chunked
+
+GPA_BATCH_SIZE = 500
+
+TWO_PLACES = Decimal('0.01')
+
+CUMULATIVE_FIELDS = [
+    'total_credits', 'total_quality_points', 'gpa',
+    'cumulative_credits', 'cumulative_quality_points', 'cgpa',
+]
+
+QUALITY_POINTS = Sum(
+    F('grade_point') * F('course__credits'),
+    output_field=DecimalField(max_digits=8, decimal_places=2),
+)
+
+
+def _ratio(quality_points, credits):
+    if not credits:
+        return Decimal('0.00')
+    return (Decimal(quality_points) / credits).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def recompute_semester_gpas(keys, batch_size=GPA_BATCH_SIZE):
+    """
+    Recompute GPA and CGPA for the given (student_id, session_id, semester) keys.
+    Missing SemesterGPA rows are created. Returns the number of rows written.
+    """
+    keys = sorted(set(keys))
+    written = 0
+    for chunk in chunked(keys, batch_size):
+        written += _recompute_chunk(chunk)
+    return written
+
+
+def _recompute_chunk(keys):
+    key_set = set(keys)
+    student_ids = {k[0] for k in keys}
+    session_ids = {k[1] for k in keys}
+    semesters = {k[2] for k in keys}
+
+    # One grouped query for credits and quality points of every affected key
+    totals = {}
+    rows = (
+        Result.objects.filter(
+            student_id__in=student_ids,
+            academic_session_id__in=session_ids,
+            semester__in=semesters,
+        )
+        .values('student_id', 'academic_session_id', 'semester')
+        .annotate(credits=Sum('course__credits'), quality_points=QUALITY_POINTS)
+        .order_by()
+    )
+    for row in rows:
+        key = (row['student_id'], row['academic_session_id'], row['semester'])
+        if key in key_set:
+            totals[key] = (row['credits'] or 0, Decimal(row['quality_points'] or 0))
+
+    with transaction.atomic():
+        existing = {
+            (g.student_id, g.academic_session_id, g.semester): g
+            for g in SemesterGPA.objects.filter(
+                student_id__in=student_ids,
+                academic_session_id__in=session_ids,
+                semester__in=semesters,
+            )
+        }
+
+        missing = [k for k in keys if k not in existing]
+        if missing:
+            current_levels = dict(
+                StudentProfile.objects.filter(id__in={k[0] for k in missing})
+                .values_list('id', 'current_level_id')
+            )
+            SemesterGPA.objects.bulk_create(
+                [
+                    SemesterGPA(
+                        student_id=student_id,
+                        academic_session_id=session_id,
+                        semester=semester,
+                        level_id=current_levels[student_id],
+                    )
+                    for student_id, session_id, semester in missing
+                    if student_id in current_levels
+                ],
+                ignore_conflicts=True,
+            )
+            existing.update({
+                (g.student_id, g.academic_session_id, g.semester): g
+                for g in SemesterGPA.objects.filter(
+                    student_id__in={k[0] for k in missing},
+                    academic_session_id__in={k[1] for k in missing},
+                    semester__in={k[2] for k in missing},
+                )
+            })
+
+        changed = []
+        for key in keys:
+            gpa_row = existing.get(key)
+            if gpa_row is None:
+                continue
+            credits, quality_points = totals.get(key, (0, Decimal('0.00')))
+            gpa_row.total_credits = credits
+            gpa_row.total_quality_points = quality_points
+            gpa_row.gpa = _ratio(quality_points, credits)
+            changed.append(gpa_row)
+
+        # Running totals in session/semester order for every semester of the
+        # affected students; later semesters shift when an earlier one changes
+        changed_by_pk = {g.pk: g for g in changed}
+        history = SemesterGPA.objects.filter(student_id__in=student_ids).order_by(
+            'student_id', *SemesterGPA.CHRONOLOGICAL_ORDER
+        ).values_list(
+            'pk', 'student_id', 'total_credits', 'total_quality_points', 'gpa',
+            'cumulative_credits', 'cumulative_quality_points', 'cgpa',
+        )
+        to_write = []
+        current_student = None
+        for pk, student_id, credits, quality_points, gpa, cum_credits, cum_quality_points, cgpa in history:
+            if student_id != current_student:
+                current_student = student_id
+                running_credits, running_quality_points = 0, Decimal('0.00')
+            gpa_row = changed_by_pk.get(pk)
+            if gpa_row is not None:
+                credits, quality_points = gpa_row.total_credits, gpa_row.total_quality_points
+            running_credits += credits
+            running_quality_points += Decimal(quality_points)
+            new_cgpa = _ratio(running_quality_points, running_credits)
+            if gpa_row is None:
+                if (cum_credits, Decimal(cum_quality_points), cgpa) == (running_credits, running_quality_points, new_cgpa):
+                    continue
+                gpa_row = SemesterGPA(
+                    pk=pk, total_credits=credits, total_quality_points=quality_points, gpa=gpa,
+                )
+            gpa_row.cumulative_credits = running_credits
+            gpa_row.cumulative_quality_points = running_quality_points
+            gpa_row.cgpa = new_cgpa
+            to_write.append(gpa_row)
+
+        SemesterGPA.objects.bulk_update(to_write, CUMULATIVE_FIELDS, batch_size=GPA_BATCH_SIZE)
+
+    return len(changed)
+
+
+def rebuild_cumulative_gpas(students=None, batch_size=GPA_BATCH_SIZE):
+    """
+    Recompute running credits/quality points and CGPA for a cohort.
+
+    The running totals come from one windowed query (SUM() OVER the student's
+    semesters in chronological order); only rows whose stored values differ
+    are written back. `students` is an optional StudentProfile queryset.
+    Returns the number of rows updated.
+    """
+    window = {
+        'partition_by': [F('student_id')],
+        'order_by': [F(field).asc() for field in SemesterGPA.CHRONOLOGICAL_ORDER],
+        'frame': RowRange(start=None, end=0),
+    }
+    rows = SemesterGPA.objects.all()
+    if students is not None:
+        rows = rows.filter(student__in=students)
+    rows = rows.annotate(
+        running_credits=Window(Sum('total_credits'), **window),
+        running_quality_points=Window(Sum('total_quality_points'), **window),
+    ).values_list(
+        'pk', 'running_credits', 'running_quality_points',
+        'cumulative_credits', 'cumulative_quality_points', 'cgpa',
+    ).order_by()
+
+    updated = 0
+    pending = []
+    for pk, credits, quality_points, cum_credits, cum_quality_points, cgpa in rows.iterator(chunk_size=2000):
+        credits = credits or 0
+        quality_points = Decimal(quality_points or 0).quantize(TWO_PLACES)
+        new_cgpa = _ratio(quality_points, credits)
+        if (cum_credits, Decimal(cum_quality_points), cgpa) == (credits, quality_points, new_cgpa):
+            continue
+        pending.append(SemesterGPA(
+            pk=pk,
+            cumulative_credits=credits,
+            cumulative_quality_points=quality_points,
+            cgpa=new_cgpa,
+        ))
+        if len(pending) >= batch_size:
+            SemesterGPA.objects.bulk_update(pending, ['cumulative_credits', 'cumulative_quality_points', 'cgpa'])
+            updated += len(pending)
+            pending = []
+    if pending:
+        SemesterGPA.objects.bulk_update(pending, ['cumulative_credits', 'cumulative_quality_points', 'cgpa'])
+        updated += len(pending)
+    return updated
@@ -0,0 +1,25 @@
+"""Background job handlers for payments (see accounts.background)"""
+
+from .background import job_handler
+from .models import PaystackEvent
+from .payments import process_event, verify_and_reconcile
+
+
+@job_handler('paystack.event')
+def reconcile_event(job):
+    event = PaystackEvent.objects.get(pk=job.payload['event_id'])
+    try:
+        process_event(event)
+    except Exception as e:
+        event.status = 'failed'
+        event.error = str(e)
+        event.save(update_fields=['status', 'error'])
+        raise
+    return {'event': event.event, 'reference': event.reference, 'status': event.status}
+
+
+@job_handler('paystack.verify')
+def verify_payment(job):
+    # PaystackError propagates so the job is retried with backoff
+    status, changed = verify_and_reconcile(job.payload['reference'])
+    return {'reference': job.payload['reference'], 'paystack_status': status, 'changed': changed}
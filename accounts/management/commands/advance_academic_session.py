@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
-from accounts.models import StudentProfile, Level, AcademicSession
-from datetime import date
+from accounts.models import AcademicSession
+from accounts.promotion import apply_promotion, plan_promotion
 
 
 class Command(BaseCommand):
@@ -29,7 +29,9 @@ class Command(BaseCommand):
                 self.stderr.write(f"Session '{options['session_name']}' not found")
                 return
         else:
-            target_session = AcademicSession.objects.filter(is_active=True).first()
+            # Read the active session from the database, not a cached copy
+            AcademicSession.clear_active_cache()
+            target_session = AcademicSession.get_active()
             if not target_session:
                 self.stderr.write("No active academic session found")
                 return
@@ -38,47 +40,38 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write("DRY RUN - No changes will be made")
 
-        # Get all students
-        students = StudentProfile.objects.select_related('current_level').all()
-        advanced_count = 0
-        semester_advanced_count = 0
-        level_advanced_count = 0
+        plan = plan_promotion(target_session)
 
-        for student in students:
-            original_level = student.current_level.name
-            original_semester = student.current_semester
+        self.stdout.write("")
+        for row in plan['levels']:
+            level = row['level']
+            label = f"{level.display_name} ({level.programme_type})"
+            if row['to_second_semester']:
+                self.stdout.write(f"  {label}: {row['to_second_semester']} student(s) first → second semester")
+            if row['promoted']:
+                self.stdout.write(
+                    f"  {label}: {row['promoted']} student(s) → {row['next_level'].display_name}, first semester"
+                )
+            if row['at_final_level']:
+                self.stdout.write(f"  {label}: {row['at_final_level']} student(s) already at final level, unchanged")
+        if plan['session_changes']:
+            self.stdout.write(f"  Current session: {plan['session_changes']} student(s) → {target_session.name}")
 
-            # Advance semester first
-            if student.current_semester == 'first':
-                student.current_semester = 'second'
-                semester_advanced_count += 1
-                if not dry_run:
-                    student.save()
-                self.stdout.write(f"  {student.user.get_full_name()}: {original_semester} → {student.current_semester}")
-            else:
-                # End of year - advance to next level
-                next_level = Level.objects.filter(order=student.current_level.order + 1).first()
-                if next_level:
-                    student.current_level = next_level
-                    student.current_semester = 'first'  # Start new level with first semester
-                    level_advanced_count += 1
-                    if not dry_run:
-                        student.save()
-                    self.stdout.write(f"  {student.user.get_full_name()}: Level {original_level} → Level {next_level.name}, Semester {original_semester} → first")
-                else:
-                    self.stdout.write(f"  {student.user.get_full_name()}: Already at final level ({original_level}), cannot advance further")
-
-            # Update current session
-            if student.current_session != target_session:
-                student.current_session = target_session
-                if not dry_run:
-                    student.save()
+        if not dry_run:
+            apply_promotion(plan, target_session)
+            AcademicSession.clear_active_cache()
 
         # Summary
         self.stdout.write("\nSummary:")
-        self.stdout.write(f"  Students advanced to next semester: {semester_advanced_count}")
-        self.stdout.write(f"  Students advanced to next level: {level_advanced_count}")
-        self.stdout.write(f"  Total students processed: {students.count()}")
+        self.stdout.write(f"  Students advanced to next semester: {sum(r['to_second_semester'] for r in plan['levels'])}")
+        self.stdout.write(f"  Students advanced to next level: {sum(r['promoted'] for r in plan['levels'])}")
+        self.stdout.write(f"  Students at final level: {sum(r['at_final_level'] for r in plan['levels'])}")
+        self.stdout.write(
+            f"  Total students processed: "
+            f"{sum(r['to_second_semester'] + r['promoted'] + r['at_final_level'] for r in plan['levels'])}"
+        )
 
         if dry_run:
-            self.stdout.write("\nThis was a dry run. Run without --dry-run to apply changes.")
\ No newline at end of file
+            self.stdout.write("\nThis was a dry run. Run without --dry-run to apply changes.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Changes applied in a single transaction."))
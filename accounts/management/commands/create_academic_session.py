@@ -88,6 +88,8 @@ class Command(BaseCommand):
             end_date=end_date,
             registration_deadline=registration_deadline
         )
+        # save() already clears it; repeated here so the intent is explicit
+        AcademicSession.clear_active_cache()
 
         self.stdout.write(
             self.style.SUCCESS(f"Created academic session: {session.name}")
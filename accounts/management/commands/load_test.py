@@ -0,0 +1,61 @@
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent requests at a URL to exercise admission control locally'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Full URL, e.g. http://127.0.0.1:8000/accounts/register-courses/')
+        parser.add_argument('--requests', type=int, default=200, help='Total requests to send (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once (default: 50)')
+        parser.add_argument(
+            '--cookie',
+            action='append',
+            default=[],
+            help='Cookie to send, e.g. sessionid=abc (can be repeated; cycled across requests)',
+        )
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        cookies = options['cookie'] or [None]
+
+        def fetch(index):
+            request = urllib.request.Request(options['url'])
+            cookie = cookies[index % len(cookies)]
+            if cookie:
+                request.add_header('Cookie', cookie)
+            started = time.monotonic()
+            try:
+                with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    status, retry_after = response.status, response.headers.get('Retry-After')
+            except urllib.error.HTTPError as e:
+                status, retry_after = e.code, e.headers.get('Retry-After')
+            except Exception as e:
+                status, retry_after = type(e).__name__, None
+            return status, retry_after, time.monotonic() - started
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.monotonic() - started
+
+        statuses = Counter(str(status) for status, _, _ in results)
+        retry_afters = Counter(retry_after for _, retry_after, _ in results if retry_after)
+        latencies = sorted(latency for _, _, latency in results)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(f"{len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:.1f} req/s)")
+        for status, count in sorted(statuses.items()):
+            self.stdout.write(f"  {status}: {count}")
+        if retry_afters:
+            self.stdout.write("  Retry-After: " + ", ".join(f"{value}s x{count}" for value, count in sorted(retry_afters.items())))
+        self.stdout.write(f"  latency p50 {percentile(0.5):.0f}ms, p95 {percentile(0.95):.0f}ms, max {latencies[-1] * 1000:.0f}ms")
@@ -0,0 +1,78 @@
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the Paystack API (set PAYSTACK_BASE_URL=http://127.0.0.1:<port>)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8010)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to sleep before each response')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with a 503')
+        parser.add_argument(
+            '--status',
+            default='success',
+            help='Transaction status returned by verify (success, failed, abandoned...); '
+                 'a comma-separated list picks one at random per call',
+        )
+
+    def handle(self, *args, **options):
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like Paystack
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path.rstrip('/') != '/transaction/initialize':
+                    return self.reply(404, {'status': False, 'message': 'Not found'})
+                payload = json.loads(body or b'{}')
+                reference = payload.get('reference', '')
+                self.reply(200, {
+                    'status': True,
+                    'message': 'Authorization URL created',
+                    'data': {
+                        'authorization_url': f"{payload.get('callback_url', '')}?trxref={reference}",
+                        'access_code': f'stub-{reference}',
+                        'reference': reference,
+                    },
+                })
+
+            def do_GET(self):
+                prefix = '/transaction/verify/'
+                if not self.path.startswith(prefix):
+                    return self.reply(404, {'status': False, 'message': 'Not found'})
+                reference = self.path[len(prefix):]
+                self.reply(200, {
+                    'status': True,
+                    'message': 'Verification successful',
+                    'data': {'reference': reference, 'status': random.choice(options['status'].split(','))},
+                })
+
+            def reply(self, status, data):
+                if options['latency']:
+                    time.sleep(options['latency'])
+                if random.random() < options['fail_rate']:
+                    status, data = 503, {'status': False, 'message': 'Stub failure'}
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                stdout.write(f"{self.address_string()} {format % args}")
+
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        self.stdout.write(f"Paystack stub listening on http://127.0.0.1:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
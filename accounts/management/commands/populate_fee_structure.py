@@ -8,7 +8,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         # Get active academic session
         try:
-            current_session = AcademicSession.objects.filter(is_active=True).first()
+            current_session = AcademicSession.get_active()
             if not current_session:
                 current_session = AcademicSession.objects.filter(name="2023/2024").first()
             if not current_session:
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from accounts.models import StudentProfile, Level, PROGRAMME_TYPE_CHOICES
+from accounts.gpa import rebuild_cumulative_gpas
+
+
+class Command(BaseCommand):
+    help = 'Rebuild cumulative credits, quality points and CGPA on SemesterGPA rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--programme-type',
+            type=str,
+            choices=[choice for choice, _ in PROGRAMME_TYPE_CHOICES],
+            help='Only rebuild students of this programme type',
+        )
+        parser.add_argument(
+            '--department',
+            type=int,
+            help='Only rebuild students in this department (ID)',
+        )
+        parser.add_argument(
+            '--level',
+            type=str,
+            help='Only rebuild students currently at this level, by name (e.g., "200", "ND1")',
+        )
+
+    def handle(self, *args, **options):
+        students = StudentProfile.objects.all()
+
+        if options['programme_type']:
+            students = students.filter(programme_type=options['programme_type'])
+        if options['department']:
+            students = students.filter(department_id=options['department'])
+        if options['level']:
+            try:
+                level = Level.objects.get(name=options['level'])
+            except Level.DoesNotExist:
+                self.stderr.write(f"Level '{options['level']}' not found")
+                return
+            students = students.filter(current_level=level)
+
+        has_filter = options['programme_type'] or options['department'] or options['level']
+        updated = rebuild_cumulative_gpas(students if has_filter else None)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} SemesterGPA record(s)"))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from accounts.models import AcademicSession, Result
+from accounts.gpa import recompute_semester_gpas
+from datetime import date
+
+
+class Command(BaseCommand):
+    help = 'Recompute SemesterGPA rows (GPA and CGPA) from uploaded results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--session',
+            type=str,
+            help='Only recompute this session, by name (e.g., "2024/2025")',
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only recompute semesters with results updated on/after this date (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        results = Result.objects.all()
+
+        if options['session']:
+            try:
+                session = AcademicSession.objects.get(name=options['session'])
+            except AcademicSession.DoesNotExist:
+                self.stderr.write(f"Session '{options['session']}' not found")
+                return
+            results = results.filter(academic_session=session)
+
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                self.stderr.write("Invalid --since date. Use format YYYY-MM-DD")
+                return
+            results = results.filter(updated_at__date__gte=since)
+
+        keys = list(
+            results.values_list('student_id', 'academic_session_id', 'semester').distinct().order_by()
+        )
+        self.stdout.write(f"Recomputing {len(keys)} student semester(s)...")
+
+        updated = recompute_semester_gpas(keys)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} SemesterGPA record(s)"))
@@ -0,0 +1,110 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import PaymentTransaction
+from accounts.payments import invalidate_fee_clearance, target_status
+from accounts.paystack import PaystackError, get_client
+from core.models import ScreeningPayment
+
+
+class Command(BaseCommand):
+    help = 'Verify stale pending payments against Paystack and record their final status'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=30,
+            help='Only pending payments created more than this many minutes ago (default: 30)',
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows loaded and written per batch (default: 200)')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent Paystack calls (default: 8)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without saving')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        client = get_client()
+        started = time.monotonic()
+
+        self.stdout.write(f"Reconciling payments pending since before {cutoff:%Y-%m-%d %H:%M}")
+        if options['dry_run']:
+            self.stdout.write("DRY RUN - No changes will be made")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for model, label in ((PaymentTransaction, 'School fees'), (ScreeningPayment, 'Screening')):
+                report = self.reconcile_model(model, cutoff, client, pool, options)
+                self.stdout.write(f"\n{label}:")
+                for outcome in ('checked', 'success', 'failed', 'still_open', 'unknown', 'error', 'changed_meanwhile'):
+                    self.stdout.write(f"  {outcome.replace('_', ' ').capitalize()}: {report[outcome]}")
+
+        self.stdout.write(self.style.SUCCESS(f"\nDone in {time.monotonic() - started:.1f}s"))
+
+    def reconcile_model(self, model, cutoff, client, pool, options):
+        report = Counter(checked=0)
+        pending = model.objects.filter(status='pending', payment_date__lt=cutoff).order_by('pk')
+        fields = ['reference', 'status', 'paystack_reference', 'verified_at']
+        if model is PaymentTransaction:
+            # Needed to drop the cached fee clearance of settled payments
+            fields += ['student_id', 'academic_session_id', 'semester']
+        last_pk = 0
+        while True:
+            # Keyset paging: rows fixed in this run drop out of `pending`, so offsets would skip rows
+            batch = list(pending.filter(pk__gt=last_pk).only(*fields)[:options['batch_size']])
+            if not batch:
+                return report
+            last_pk = batch[-1].pk
+            report['checked'] += len(batch)
+
+            changed = []
+            for payment, result in zip(batch, pool.map(lambda p: self.verify(client, p.reference), batch)):
+                if result is None:
+                    report['error'] += 1
+                    continue
+                if not result.get('status'):
+                    report['unknown'] += 1
+                    continue
+                data = result.get('data') or {}
+                status = target_status(data.get('status'))
+                if status is None:
+                    report['still_open'] += 1
+                    continue
+                report[status] += 1
+                payment.status = status
+                if status == 'success':
+                    payment.paystack_reference = data.get('reference') or payment.reference
+                    payment.verified_at = timezone.now()
+                changed.append(payment)
+
+            if changed and not options['dry_run']:
+                report['changed_meanwhile'] += self.save(model, changed)
+
+    def verify(self, client, reference):
+        try:
+            return client.verify(reference)
+        except PaystackError as e:
+            self.stderr.write(f"  {reference}: {e}")
+            return None
+
+    def save(self, model, changed):
+        """bulk_update the rows that are still pending (a webhook may have settled some meanwhile)"""
+        with transaction.atomic():
+            still_pending = set(
+                model.objects.select_for_update()
+                .filter(pk__in=[payment.pk for payment in changed], status='pending')
+                .values_list('pk', flat=True)
+            )
+            model.objects.bulk_update(
+                [payment for payment in changed if payment.pk in still_pending],
+                ['status', 'paystack_reference', 'verified_at'],
+            )
+        if model is PaymentTransaction:
+            invalidate_fee_clearance(
+                payment for payment in changed if payment.pk in still_pending and payment.status == 'success'
+            )
+        return len(changed) - len(still_pending)
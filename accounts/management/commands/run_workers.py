@@ -0,0 +1,112 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.background import claim, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers (accounts.Job queue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOBS_WORKER_THREADS,
+            help='Worker threads per process (default: JOBS_WORKER_THREADS)',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes to start (default: 1)',
+        )
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='names',
+            help='Only run jobs with this handler name (can be repeated)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no due jobs are left instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1:
+            return self.run_processes(options)
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        worker_name = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f"{worker_name}:{i}", options['names'], options['once'], stop),
+                daemon=True,
+            )
+            for i in range(max(options['threads'], 1))
+        ]
+        self.stdout.write(f"Starting {len(threads)} worker thread(s) as {worker_name}")
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            stop.set()
+            self.stdout.write("Stopping after the current jobs finish...")
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
+
+    def work(self, worker_id, names, once, stop):
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim(worker_id, names=names)
+            except Exception as e:
+                self.stderr.write(f"{worker_id}: could not claim a job: {e}")
+                stop.wait(settings.JOBS_POLL_INTERVAL)
+                continue
+            if job is None:
+                if once:
+                    break
+                stop.wait(settings.JOBS_POLL_INTERVAL)
+                continue
+            job = run_job(job)
+            self.stdout.write(f"{worker_id}: {job}")
+        close_old_connections()
+
+    def run_processes(self, options):
+        """Start one single-process worker per --processes and wait for them"""
+        command = [sys.executable, sys.argv[0], 'run_workers', '--threads', str(options['threads'])]
+        for name in options['names'] or []:
+            command += ['--queue', name]
+        if options['once']:
+            command.append('--once')
+
+        children = [subprocess.Popen(command) for _ in range(options['processes'])]
+        self.stdout.write(f"Started {len(children)} worker process(es)")
+        try:
+            for child in children:
+                child.wait()
+        except KeyboardInterrupt:
+            for child in children:
+                child.send_signal(signal.SIGTERM)
+            for child in children:
+                child.wait()
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:20
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def populate_cumulative_totals(apps, schema_editor):
+    """Fill running credit/quality point totals and CGPA in session/semester order"""
+    SemesterGPA = apps.get_model('accounts', 'SemesterGPA')
+
+    rows = SemesterGPA.objects.order_by(
+        'student_id', 'academic_session__start_year', 'academic_session__end_year',
+        'academic_session_id', 'semester',
+    )
+    changed = []
+    student_id = None
+    for row in rows.iterator(chunk_size=2000):
+        if row.student_id != student_id:
+            student_id = row.student_id
+            credits, quality_points = 0, Decimal('0.00')
+        credits += row.total_credits
+        quality_points += row.total_quality_points
+        row.cumulative_credits = credits
+        row.cumulative_quality_points = quality_points
+        # Same rounding as accounts.gpa
+        row.cgpa = (
+            (quality_points / credits).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            if credits else Decimal('0.00')
+        )
+        changed.append(row)
+        if len(changed) >= 500:
+            SemesterGPA.objects.bulk_update(changed, ['cumulative_credits', 'cumulative_quality_points', 'cgpa'])
+            changed = []
+    SemesterGPA.objects.bulk_update(changed, ['cumulative_credits', 'cumulative_quality_points', 'cgpa'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0033_alter_courseregistration_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semestergpa',
+            name='cumulative_credits',
+            field=models.PositiveIntegerField(default=0, help_text='Credits up to and including this semester'),
+        ),
+        migrations.AddField(
+            model_name='semestergpa',
+            name='cumulative_quality_points',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Quality points up to and including this semester', max_digits=7),
+        ),
+        migrations.RunPython(populate_cumulative_totals, migrations.RunPython.noop),
+    ]
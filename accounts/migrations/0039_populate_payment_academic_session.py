@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def populate_payment_sessions(apps, schema_editor):
+    """Link existing payments to the AcademicSession named in their `session` text"""
+    PaymentTransaction = apps.get_model('accounts', 'PaymentTransaction')
+    AcademicSession = apps.get_model('accounts', 'AcademicSession')
+
+    for session_id, name in AcademicSession.objects.values_list('id', 'name'):
+        PaymentTransaction.objects.filter(
+            academic_session__isnull=True, session=name
+        ).update(academic_session_id=session_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0038_paymenttransaction_academic_session_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_payment_sessions, migrations.RunPython.noop),
+    ]
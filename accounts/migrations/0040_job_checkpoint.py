@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0039_populate_payment_academic_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict, help_text='Handler state for resuming after a failed attempt'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0040_job_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['department', 'current_level'], name='accounts_st_departm_1e82f4_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
 from .state import NIGERIA_STATES_AND_LGAS
 from django.core.exceptions import ValidationError
 
@@ -99,11 +101,36 @@ class AcademicSession(models.Model):
     def __str__(self):
         return f"{self.name} ({self.session_type})"
 
+    ACTIVE_CACHE_KEY = 'academic_session:active'
+    ACTIVE_CACHE_SECONDS = 300
+
     def save(self, *args, **kwargs):
         # Ensure only one active session at a time
         if self.is_active:
             AcademicSession.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
         super().save(*args, **kwargs)
+        AcademicSession.clear_active_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        AcademicSession.clear_active_cache()
+        return result
+
+    @classmethod
+    def get_active(cls):
+        """Return the active session (or None), cached across requests"""
+        session = cache.get(cls.ACTIVE_CACHE_KEY)
+        if session is None:
+            # False marks "no active session" so that case is cached too
+            session = cls.objects.filter(is_active=True).first() or False
+            cache.set(cls.ACTIVE_CACHE_KEY, session, cls.ACTIVE_CACHE_SECONDS)
+        return session or None
+
+    @classmethod
+    def clear_active_cache(cls):
+        """Drop the cached active session now and again once the transaction commits"""
+        cache.delete(cls.ACTIVE_CACHE_KEY)
+        transaction.on_commit(lambda: cache.delete(cls.ACTIVE_CACHE_KEY))
 
     @property
     def is_current(self):
@@ -219,6 +246,10 @@ class StudentProfile(models.Model):
     local_government = models.CharField(max_length=100, verbose_name="Local Government")
     cgpa = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
 
+    class Meta:
+        # Cohort counts per course offering (accounts.results.with_result_progress)
+        indexes = [models.Index(fields=['department', 'current_level'])]
+
     @property
     def is_profile_complete(self):
         """Check if all required profile fields are filled"""
@@ -393,6 +424,9 @@ class PaymentTransaction(models.Model):
     paystack_reference = models.CharField(max_length=100, blank=True, null=True)
     status = models.CharField(max_length=10, choices=PAYMENT_STATUS, default='pending')
     session = models.CharField(max_length=10)  # e.g., "2023/2024"
+    academic_session = models.ForeignKey(
+        AcademicSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments'
+    )
     semester = models.CharField(max_length=10, choices=StudentProfile.SEMESTER_CHOICES)
     payment_date = models.DateTimeField(auto_now_add=True)
     verified_at = models.DateTimeField(null=True, blank=True)
@@ -400,8 +434,19 @@ class PaymentTransaction(models.Model):
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.payment_type} - {self.session}"
 
+    def save(self, *args, **kwargs):
+        # Rows created with only the session name (admin, scripts) still get the FK
+        if self.academic_session_id is None and self.session:
+            self.academic_session = AcademicSession.objects.filter(name=self.session).first()
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            # Fee gating: has this student paid for the session/semester?
+            models.Index(fields=['student', 'academic_session', 'semester', 'status']),
+            models.Index(fields=['status', 'payment_date']),
+        ]
 
 
 class ApplicationActivity(models.Model):
@@ -554,6 +599,10 @@ class SemesterGPA(models.Model):
                                                 help_text='Sum of (grade_point x credits) for all courses')
     cgpa = models.DecimalField(max_digits=3, decimal_places=2, default=0.00,
                                help_text='Cumulative GPA up to and including this semester')
+    cumulative_credits = models.PositiveIntegerField(default=0,
+                                                     help_text='Credits up to and including this semester')
+    cumulative_quality_points = models.DecimalField(max_digits=7, decimal_places=2, default=0.00,
+                                                    help_text='Quality points up to and including this semester')
     is_finalized = models.BooleanField(default=False, help_text='Set to True when all results are confirmed')
     finalized_at = models.DateTimeField(null=True, blank=True)
 
@@ -585,17 +634,114 @@ class SemesterGPA(models.Model):
         self.total_quality_points = total_quality_points
         self.gpa = round(total_quality_points / total_credits, 2) if total_credits > 0 else 0.00
 
+    # Chronological order of a student's semesters (first < second within a session)
+    CHRONOLOGICAL_ORDER = (
+        'academic_session__start_year', 'academic_session__end_year', 'academic_session_id', 'semester',
+    )
+
     def calculate_cgpa(self):
         """Calculate cumulative GPA from all semesters up to and including this one"""
-        all_gpas = SemesterGPA.objects.filter(
+        session = self.academic_session
+        this_key = (session.start_year, session.end_year, session.id, self.semester)
+
+        earlier = SemesterGPA.objects.filter(
             student=self.student,
-        ).exclude(pk=self.pk)
+        ).exclude(pk=self.pk).values_list(
+            *self.CHRONOLOGICAL_ORDER, 'total_credits', 'total_quality_points'
+        )
 
         total_credits = self.total_credits
         total_quality_points = float(self.total_quality_points)
 
-        for gpa_record in all_gpas:
-            total_credits += gpa_record.total_credits
-            total_quality_points += float(gpa_record.total_quality_points)
+        for start_year, end_year, session_id, semester, credits, quality_points in earlier:
+            if (start_year, end_year, session_id, semester) < this_key:
+                total_credits += credits
+                total_quality_points += float(quality_points)
 
+        self.cumulative_credits = total_credits
+        self.cumulative_quality_points = round(total_quality_points, 2)
         self.cgpa = round(total_quality_points / total_credits, 2) if total_credits > 0 else 0.00
+
+
+class Job(models.Model):
+    """A unit of background work stored in the database (see accounts.background)"""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    name = models.CharField(max_length=100, help_text='Registered handler name, e.g. "applicants.notify"')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveIntegerField(default=0, help_text='Items processed so far')
+    total = models.PositiveIntegerField(default=0, help_text='Items to process (0 if unknown)')
+    result = models.JSONField(default=dict, blank=True)
+    checkpoint = models.JSONField(default=dict, blank=True, help_text='Handler state for resuming after a failed attempt')
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text='Not picked up before this time (retry backoff)')
+    locked_by = models.CharField(max_length=100, blank=True, help_text='Worker that claimed the job')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        return int(self.progress * 100 / self.total) if self.total else 0
+
+    def set_progress(self, progress, total=None, checkpoint=None):
+        """
+        Record progress (and optionally a resume checkpoint) without touching
+        other columns. Call it inside the transaction that did the work so the
+        checkpoint never runs ahead of, or behind, what was written.
+        """
+        self.progress = progress
+        fields = {'progress': progress}
+        if total is not None:
+            self.total = total
+            fields['total'] = total
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+            fields['checkpoint'] = checkpoint
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+
+class PaystackEvent(models.Model):
+    """A raw webhook event from Paystack, reconciled in the background (see accounts.payments)"""
+    STATUS_CHOICES = (
+        ('received', 'Received'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    )
+
+    event = models.CharField(max_length=100, help_text='Event type, e.g. "charge.success"')
+    reference = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='received')
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-received_at']
+
+    def __str__(self):
+        return f"{self.event} {self.reference} ({self.status})"
@@ -0,0 +1,217 @@
+"""
+Keyset (seek) pagination.
+
+Instead of OFFSET, each page remembers the sort key of its last (or first) row
+in an opaque cursor and the next page is fetched with a WHERE clause on that
+key, so any page costs the same as the first one. The ordering must end with a
+unique field (normally '-id' or 'id') and its fields must not be NULL.
+
+The total shown next to the pages is a COUNT(*) cached for
+PAGINATION_COUNT_CACHE_TIMEOUT seconds per distinct query, so following the
+cursors does not count the rows again. KeysetPagination does the same for the
+DRF list endpoints.
+"""
+
+import base64
+import binascii
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values, direction):
+    """Opaque, URL-safe token for the row with sort key `values`"""
+    payload = json.dumps({'d': direction, 'v': [_json_value(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(direction, values) for a cursor from encode_cursor(); raises ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        direction, values = payload['d'], payload['v']
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    # encode_cursor() only writes scalars (sort keys are never NULL)
+    if not all(isinstance(v, (str, int, float)) for v in values):
+        raise ValueError('Invalid cursor')
+    return direction, values
+
+
+def _json_value(value):
+    # The ORM parses these back when comparing against the column
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return encode_cursor(self.paginator.sort_key(self.object_list[-1]), 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        return encode_cursor(self.paginator.sort_key(self.object_list[0]), 'prev')
+
+
+class KeysetPaginator:
+    """
+    Paginate `queryset` by `ordering` (e.g. ('-search_rank', '-id')). Fields
+    may be model fields, lookups across relations or annotations.
+    """
+
+    def __init__(self, queryset, ordering, per_page=25):
+        self.queryset = queryset
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.per_page = per_page
+
+    @cached_property
+    def count(self):
+        """Total rows, from the cache when the same query was counted recently"""
+        try:
+            sql, params = self.queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.sha1(f'{sql}|{params!r}'.encode()).hexdigest()
+        key = f'keyset_count:{self.queryset.model._meta.label_lower}:{digest}'
+        total = cache.get(key)
+        if total is None:
+            total = self.queryset.count()
+            cache.set(key, total, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return total
+
+    def sort_key(self, obj):
+        values = []
+        for field, _ in self.ordering:
+            value = obj
+            for part in field.split('__'):
+                value = getattr(value, part)
+            values.append(getattr(value, 'pk', value))
+        return values
+
+    def _seek(self, values, forward):
+        """Rows strictly after (forward) or before `values` in the ordering"""
+        condition = Q()
+        for i, (field, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[i]})
+            for j, (prior, _) in enumerate(self.ordering[:i]):
+                step &= Q(**{prior: values[j]})
+            condition |= step
+        return condition
+
+    def get_page(self, cursor=None):
+        """The page after/before `cursor`; the first page for a missing or invalid cursor"""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor)
+            except ValueError:
+                pass
+            if values is not None and len(values) != len(self.ordering):
+                direction, values = 'next', None
+
+        forward = direction == 'next'
+        # Pages before the cursor are read in reverse and flipped back
+        order_by = [
+            f"{'-' if descending == forward else ''}{field}" for field, descending in self.ordering
+        ]
+        queryset = self.queryset.order_by(*order_by)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self._seek(values, forward))
+            except (TypeError, ValueError, ValidationError):
+                # A tampered cursor whose values do not fit the sort fields
+                return self.get_page()
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return KeysetPage(self, rows, has_next=has_more, has_previous=values is not None)
+        rows.reverse()
+        return KeysetPage(self, rows, has_next=True, has_previous=has_more)
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination over KeysetPaginator. Views set `ordering` (default
+    ('-id',)); responses keep the PageNumberPagination shape
+    (count/next/previous/results) with `?cursor=` links.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.paginator = KeysetPaginator(queryset, getattr(view, 'ordering', self.ordering), self.page_size)
+        self.page = self.paginator.get_page(request.query_params.get(self.cursor_query_param))
+        return list(self.page)
+
+    def get_next_link(self):
+        if not self.page.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.page.next_cursor)
+
+    def get_previous_link(self):
+        if not self.page.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['count', 'results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,168 @@
+"""
+Reconciling our payment rows with Paystack.
+
+Paystack reports payments through signed webhook events (stored as
+PaystackEvent and processed by the `paystack.event` job) and through the
+verify endpoint (the `paystack.verify` job, queued when a browser returns
+before the webhook has been processed). Both end up in reconcile(), which
+updates PaymentTransaction ("SF-" references) or ScreeningPayment ("SCR-")
+with conditional UPDATEs keyed by reference: applying the same result twice,
+or concurrently, changes nothing, and a successful payment is never
+downgraded.
+"""
+
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .background import enqueue
+from .models import Job, PaymentTransaction, PaystackEvent
+from .paystack import get_client
+
+# Paystack transaction statuses that end a pending payment as failed
+FAILED_STATUSES = {'failed', 'abandoned', 'reversed'}
+SCREENING_PREFIX = 'SCR-'
+
+
+def payment_model(reference):
+    """The model holding `reference` (screening references start with SCR-)"""
+    if reference.startswith(SCREENING_PREFIX):
+        from core.models import ScreeningPayment
+        return ScreeningPayment
+    return PaymentTransaction
+
+
+def target_status(paystack_status):
+    """Our status for a Paystack transaction status, or None while it is still open"""
+    if paystack_status == 'success':
+        return 'success'
+    if paystack_status in FAILED_STATUSES:
+        return 'failed'
+    return None
+
+
+def reconcile(reference, paystack_status, paystack_reference=None):
+    """Apply a Paystack transaction status to our row; returns the number of rows changed"""
+    model = payment_model(reference)
+    payments = model.objects.filter(reference=reference)
+    status = target_status(paystack_status)
+    if status == 'success':
+        changed = payments.exclude(status='success').update(
+            status='success',
+            paystack_reference=paystack_reference or reference,
+            verified_at=timezone.now(),
+        )
+        if changed and model is PaymentTransaction:
+            invalidate_fee_clearance(payments.values('student_id', 'academic_session_id', 'semester'))
+        return changed
+    if status == 'failed':
+        return payments.filter(status='pending').update(status='failed')
+    return 0
+
+
+def valid_signature(body, signature):
+    """Paystack signs the raw body with HMAC-SHA512 using the secret key"""
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature or '')
+
+
+def event_data(payload):
+    """The `data` object of an event payload ({} when it is missing or not an object)"""
+    data = payload.get('data')
+    return data if isinstance(data, dict) else {}
+
+
+def record_event(payload):
+    """Store a webhook event (a decoded JSON object) and queue its reconciliation"""
+    data = event_data(payload)
+    with transaction.atomic():
+        event = PaystackEvent.objects.create(
+            event=str(payload.get('event', ''))[:100],
+            reference=str(data.get('reference') or '')[:100],
+            payload=payload,
+        )
+        enqueue('paystack.event', {'event_id': event.pk})
+    return event
+
+
+def process_event(event):
+    """Reconcile one stored event (safe to run more than once)"""
+    data = event_data(event.payload)
+    if event.event == 'charge.success' and event.reference:
+        reconcile(event.reference, data.get('status', 'success'), data.get('reference'))
+        event.status = 'processed'
+    else:
+        event.status = 'ignored'
+    event.error = ''
+    event.processed_at = timezone.now()
+    event.save(update_fields=['status', 'error', 'processed_at'])
+    return event
+
+
+def verify_and_reconcile(reference, client=None):
+    """Ask Paystack for the transaction's status and apply it; returns (paystack status, rows changed)"""
+    response = (client or get_client()).verify(reference)
+    if not response.get('status'):
+        # Paystack does not know the reference (checkout never started)
+        return None, 0
+    data = response.get('data') or {}
+    return data.get('status'), reconcile(reference, data.get('status'), data.get('reference'))
+
+
+def request_verification(reference):
+    """
+    Queue a background verify for `reference` unless one is running or due now.
+    A verify waiting out its retry backoff does not count, so a returning
+    browser gets a fresh check instead of waiting for the retry.
+    """
+    pending = Job.objects.filter(name='paystack.verify', payload__reference=reference).filter(
+        Q(status='running') | Q(status='queued', run_after__lte=timezone.now())
+    ).exists()
+    if not pending:
+        enqueue('paystack.verify', {'reference': reference})
+
+
+# Fee clearance (has the student paid school fees for a session/semester?)
+
+FEES_CLEARED_KEY = 'fees_cleared:{student_id}:{session_id}:{semester}'
+FEES_CLEARED_SECONDS = 600
+
+
+def has_cleared_fees(student, session, semester):
+    """
+    Check for a successful school-fees payment for (student, session, semester).
+    Only a cleared result is cached: a student who has just paid must not be
+    held back by a cached "not paid" from another process.
+    """
+    key = FEES_CLEARED_KEY.format(
+        student_id=student.pk, session_id=session.pk if session else 'none', semester=semester
+    )
+    if cache.get(key):
+        return True
+    payments = PaymentTransaction.objects.filter(student=student, semester=semester, status='success')
+    if session is not None:
+        payments = payments.filter(academic_session=session)
+    else:
+        payments = payments.filter(session="2023/2024")
+    cleared = payments.exists()
+    if cleared:
+        cache.set(key, True, FEES_CLEARED_SECONDS)
+    return cleared
+
+
+def invalidate_fee_clearance(payments):
+    """Drop cached clearance for an iterable of PaymentTransaction rows (or dicts of their ids)"""
+    keys = set()
+    for payment in payments:
+        if isinstance(payment, dict):
+            student_id, session_id, semester = payment['student_id'], payment['academic_session_id'], payment['semester']
+        else:
+            student_id, session_id, semester = payment.student_id, payment.academic_session_id, payment.semester
+        keys.add(FEES_CLEARED_KEY.format(student_id=student_id, session_id=session_id or 'none', semester=semester))
+    if keys:
+        cache.delete_many(list(keys))
@@ -0,0 +1,164 @@
+"""
+Shared Paystack API client.
+
+All calls go through one pooled requests.Session per process, so repeated
+calls reuse keep-alive connections instead of paying a TLS handshake each
+time. Every call has connect/read timeouts. Retries use exponential backoff
+with jitter and only happen when they are safe:
+
+- verify (GET) is retried on connection errors, timeouts, 429 and 5xx;
+- initialize (POST) is only retried when the connection could not be made,
+  since a request that reached Paystack would fail as a duplicate reference.
+
+Per-call latencies are kept in in-process histograms (paystack_metrics()).
+"""
+
+import bisect
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Upper bounds (seconds) of the latency histogram buckets; the last one is open-ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class PaystackError(Exception):
+    """Paystack could not be reached or kept failing after the retries"""
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+
+    def record(self, seconds, error=False, retries=0):
+        with self.lock:
+            self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.total += seconds
+            self.calls += 1
+            self.errors += int(error)
+            self.retries += retries
+
+    def snapshot(self):
+        with self.lock:
+            labels = [f'le_{bound}' for bound in LATENCY_BUCKETS] + ['le_inf']
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'mean_ms': round(self.total / self.calls * 1000, 1) if self.calls else None,
+                'buckets': dict(zip(labels, self.counts)),
+            }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def _histogram(operation):
+    histogram = _histograms.get(operation)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(operation, LatencyHistogram())
+    return histogram
+
+
+def paystack_metrics():
+    """Latency histograms per operation for this process"""
+    return {operation: histogram.snapshot() for operation, histogram in sorted(_histograms.items())}
+
+
+class PaystackClient:
+    def __init__(self, secret_key=None, base_url=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff=None, pool_size=None):
+        self.secret_key = secret_key or settings.PAYSTACK_SECRET_KEY
+        self.base_url = (base_url or settings.PAYSTACK_BASE_URL).rstrip('/')
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else settings.PAYSTACK_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else settings.PAYSTACK_READ_TIMEOUT,
+        )
+        self.max_retries = max_retries if max_retries is not None else settings.PAYSTACK_MAX_RETRIES
+        self.backoff = backoff if backoff is not None else settings.PAYSTACK_RETRY_BACKOFF
+
+        pool_size = pool_size or settings.PAYSTACK_POOL_SIZE
+        self.session = requests.Session()
+        # Retries are done in _request() so they can be limited to safe cases
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.secret_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def initialize(self, payload):
+        """POST /transaction/initialize; returns Paystack's JSON body"""
+        return self._request('POST', '/transaction/initialize', 'transaction.initialize',
+                             idempotent=False, json=payload)
+
+    def verify(self, reference):
+        """GET /transaction/verify/<reference>; returns Paystack's JSON body"""
+        return self._request('GET', f'/transaction/verify/{reference}', 'transaction.verify',
+                             idempotent=True)
+
+    def _request(self, method, path, operation, idempotent, **kwargs):
+        url = f'{self.base_url}{path}'
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A connect failure means nothing was sent, so even a POST may be repeated
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout) or _is_connect_error(e)
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    _histogram(operation).record(time.monotonic() - started, retries=attempt)
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise PaystackError(f'Invalid response from Paystack ({response.status_code})')
+                retryable = idempotent
+                error = PaystackError(f'Paystack returned {response.status_code}')
+
+            if not retryable or attempt >= self.max_retries:
+                _histogram(operation).record(time.monotonic() - started, error=True, retries=attempt)
+                logger.warning('Paystack %s %s failed after %s attempt(s): %s', method, path, attempt + 1, error)
+                raise PaystackError(str(error)) from error
+
+            attempt += 1
+            time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+
+def _is_connect_error(error):
+    """True if the request failed while connecting (urllib3 NewConnectionError and friends)"""
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, 'reason', reason)
+    return type(reason).__name__ in ('NewConnectionError', 'NameResolutionError', 'ConnectTimeoutError')
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The shared per-process client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaystackClient()
+    return _client
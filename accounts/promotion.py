@@ -0,0 +1,90 @@
+"""
+Set-based promotion of students to the next semester/level.
+
+Students in the first semester move to the second semester of the same level.
+Students in the second semester move to the first semester of the next level
+of the same programme type (100 -> 200, ND1 -> ND2, ...); students at the final
+level of their programme stay where they are. Everything is done with a few
+UPDATE statements per level inside one transaction.
+"""
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Level, StudentProfile
+
+# Applicant levels (APP_DEG, APP_ND, APP_NCE) only exist for screening fees
+APPLICANT_LEVEL_PREFIX = 'APP_'
+
+
+def next_level_map():
+    """Map level_id -> next Level of the same programme type (None at the final level)"""
+    levels = list(Level.objects.exclude(name__startswith=APPLICANT_LEVEL_PREFIX).order_by('order'))
+    next_levels = {}
+    for level in levels:
+        next_levels[level.id] = next(
+            (
+                other for other in levels
+                if other.programme_type == level.programme_type
+                and other.order > level.order
+                and other.is_active
+            ),
+            None,
+        )
+    return next_levels
+
+
+def plan_promotion(target_session):
+    """
+    Work out what advancing to `target_session` would change, using one
+    grouped query. Returns a dict with `levels` (one row per current level, in
+    descending order so promotions never cascade) and `session_changes`.
+    """
+    levels = Level.objects.in_bulk()
+    next_levels = next_level_map()
+
+    counts = {}
+    for level_id, semester, total in (
+        StudentProfile.objects.values_list('current_level_id', 'current_semester')
+        .annotate(total=Count('id'))
+        .order_by()
+    ):
+        row = counts.setdefault(level_id, {'first': 0, 'second': 0})
+        row['first' if semester == 'first' else 'second'] += total
+
+    rows = []
+    for level_id, row in counts.items():
+        level = levels[level_id]
+        rows.append({
+            'level': level,
+            'next_level': next_levels.get(level_id),
+            'to_second_semester': row['first'],
+            'promoted': row['second'] if next_levels.get(level_id) else 0,
+            'at_final_level': 0 if next_levels.get(level_id) else row['second'],
+        })
+    rows.sort(key=lambda r: r['level'].order, reverse=True)
+
+    return {
+        'levels': rows,
+        'session_changes': StudentProfile.objects.exclude(current_session=target_session).count(),
+    }
+
+
+def apply_promotion(plan, target_session):
+    """Apply a plan from plan_promotion() atomically. Returns the number of rows updated."""
+    updated = 0
+    with transaction.atomic():
+        # Highest levels first, so students promoted into a level are not
+        # moved again when that level's first-semester students are updated
+        for row in plan['levels']:
+            students = StudentProfile.objects.filter(current_level=row['level'])
+            if row['next_level'] is not None:
+                updated += students.exclude(current_semester='first').update(
+                    current_level=row['next_level'], current_semester='first'
+                )
+            updated += students.filter(current_semester='first').update(current_semester='second')
+
+        updated += StudentProfile.objects.exclude(current_session=target_session).update(
+            current_session=target_session
+        )
+    return updated
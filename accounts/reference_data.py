@@ -0,0 +1,143 @@
+"""
+In-process cache of small reference tables (levels, faculties, departments,
+programmes and programme choices).
+
+Each table is loaded once per process and kept with the version number it was
+loaded at. The version lives in Django's cache, so a post_save/post_delete on
+any worker bumps it and every process reloads on its next lookup. Cached
+instances are shared between requests and must not be modified.
+"""
+
+import threading
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .utils import bump_cache_version, cache_version
+
+VERSION_KEY = 'refdata:version:{label}'
+
+# label -> options; `depends_on` lists tables whose changes also invalidate this one
+REGISTRY = {
+    'accounts.Level': {'order_by': ('order',), 'select_related': ()},
+    'accounts.Faculty': {'order_by': ('pk',), 'select_related': ()},
+    'accounts.Department': {
+        'order_by': ('name',),
+        'select_related': ('faculty',),
+        'depends_on': ('accounts.Faculty',),
+    },
+    'core.Program': {'order_by': ('pk',), 'select_related': ()},
+    'core.ProgramChoice': {'order_by': ('program_type', 'name'), 'select_related': ()},
+}
+
+_local = {}  # label -> (version, rows, {pk: row})
+_stats = {label: {'hits': 0, 'misses': 0} for label in REGISTRY}
+_lock = threading.Lock()
+
+
+def _version(label):
+    return cache_version(VERSION_KEY.format(label=label))
+
+
+def _load(label):
+    version = _version(label)
+    entry = _local.get(label)
+    if entry is not None and entry[0] == version:
+        _stats[label]['hits'] += 1
+        return entry
+    with _lock:
+        options = REGISTRY[label]
+        rows = tuple(
+            apps.get_model(label).objects
+            .select_related(*options['select_related'])
+            .order_by(*options['order_by'])
+        )
+        entry = (version, rows, {row.pk: row for row in rows})
+        _local[label] = entry
+        _stats[label]['misses'] += 1
+    return entry
+
+
+def rows(label):
+    """All rows of a registered table, in the registered order"""
+    return _load(label)[1]
+
+
+def get(label, pk):
+    """Cached row by primary key; raises the model's DoesNotExist like objects.get()"""
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        pk = None
+    row = _load(label)[2].get(pk)
+    if row is None:
+        raise apps.get_model(label).DoesNotExist(f"{label} matching id={pk!r} does not exist.")
+    return row
+
+
+def invalidate(label):
+    """Bump the shared version of `label` (and of tables that depend on it)"""
+    labels = [label] + [
+        other for other, options in REGISTRY.items() if label in options.get('depends_on', ())
+    ]
+    for name in labels:
+        bump_cache_version(VERSION_KEY.format(label=name))
+        _local.pop(name, None)
+
+
+def reference_stats():
+    """Hit/miss counters for this process, per table"""
+    return {label: dict(counts) for label, counts in _stats.items()}
+
+
+def _on_change(sender, **kwargs):
+    label = sender._meta.label
+    invalidate(label)
+    # Again after commit, in case another request reloaded the old rows meanwhile
+    transaction.on_commit(lambda: invalidate(label))
+
+
+def connect_signals():
+    for label in REGISTRY:
+        post_save.connect(_on_change, sender=label, dispatch_uid=f'refdata-save-{label}')
+        post_delete.connect(_on_change, sender=label, dispatch_uid=f'refdata-delete-{label}')
+
+
+# Lookups used by views and dropdowns
+
+def levels(programme_type=None, max_order=None):
+    result = rows('accounts.Level')
+    if programme_type is not None:
+        if isinstance(programme_type, str):
+            programme_type = [programme_type]
+        result = [lvl for lvl in result if lvl.programme_type in programme_type]
+    if max_order is not None:
+        result = [lvl for lvl in result if lvl.order <= max_order]
+    return list(result)
+
+
+def faculties():
+    return list(rows('accounts.Faculty'))
+
+
+def departments(programme_type=None, faculty_id=None):
+    result = rows('accounts.Department')
+    if programme_type is not None:
+        if isinstance(programme_type, str):
+            programme_type = [programme_type]
+        result = [dept for dept in result if dept.faculty.programme_type in programme_type]
+    if faculty_id is not None:
+        result = [dept for dept in result if dept.faculty_id == int(faculty_id)]
+    return list(result)
+
+
+def programs():
+    return list(rows('core.Program'))
+
+
+def program_choices(program_type, active_only=True):
+    return [
+        choice for choice in rows('core.ProgramChoice')
+        if choice.program_type == program_type and (choice.is_active or not active_only)
+    ]
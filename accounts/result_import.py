@@ -0,0 +1,239 @@
+"""
+Spreadsheet (CSV/XLSX) import of exam results.
+
+Files are read row by row (csv reader / openpyxl read-only mode), matched to
+students through a dict index on user.id_number, checked against the same
+student/course eligibility as the upload grid, validated, diffed against
+existing Result rows and finally written with bulk_upsert_results().
+"""
+
+import csv
+import io
+from decimal import Decimal
+
+from django.db import transaction
+
+from .gpa import recompute_semester_gpas
+from .models import AcademicSession, Course, Result, StudentProfile
+from .results import bulk_upsert_results, eligible_students, parse_scores
+from .utils import chunked
+
+IMPORT_COLUMNS = ('id_number', 'course_code', 'test_score', 'exam_score')
+
+HEADER_ALIASES = {
+    'matric_no': 'id_number',
+    'matric_number': 'id_number',
+    'student_id': 'id_number',
+    'course': 'course_code',
+    'code': 'course_code',
+    'test': 'test_score',
+    'exam': 'exam_score',
+}
+
+# How many changed rows the dry-run page lists
+PREVIEW_LIMIT = 200
+
+LOOKUP_CHUNK_SIZE = 500
+
+ONE_PLACE = Decimal('0.1')
+
+
+def _normalise_header(value):
+    key = str(value or '').strip().lower().replace(' ', '_').replace('.', '')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _iter_csv(uploaded_file):
+    uploaded_file.seek(0)
+    text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(uploaded_file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import needs the openpyxl package. Upload a CSV file instead.")
+    uploaded_file.seek(0)
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_spreadsheet_rows(uploaded_file):
+    """
+    Yield (line_number, row_dict) for every non-empty data row of an uploaded
+    .csv or .xlsx file. Raises ValueError for unsupported or malformed files.
+    """
+    name = uploaded_file.name.lower()
+    if name.endswith('.csv'):
+        rows = _iter_csv(uploaded_file)
+    elif name.endswith('.xlsx'):
+        rows = _iter_xlsx(uploaded_file)
+    else:
+        raise ValueError("Unsupported file type. Upload a .csv or .xlsx file.")
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("The file is empty.")
+    columns = [_normalise_header(h) for h in header]
+    missing = [c for c in IMPORT_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    for line_number, values in enumerate(rows, start=2):
+        if not any(str(v).strip() for v in values if v is not None):
+            continue
+        yield line_number, dict(zip(columns, values))
+
+
+def _cell(row, column):
+    value = row.get(column)
+    return '' if value is None else str(value).strip()
+
+
+def plan_import(uploaded_file, session, assigned_types):
+    """
+    Parse and validate an uploaded results sheet without writing anything.
+
+    Returns a dict with:
+        rows     -- [student_id, course_id, test, exam] for new/changed results
+        errors   -- [{'line', 'message'}] for rejected rows
+        new, changed, unchanged -- row counts
+        preview  -- first PREVIEW_LIMIT new/changed rows for display
+    Raises ValueError if the file itself cannot be read.
+    """
+    parsed = {}
+    errors = []
+    for line_number, row in iter_spreadsheet_rows(uploaded_file):
+        id_number = _cell(row, 'id_number')
+        course_code = _cell(row, 'course_code').upper()
+        if not id_number or not course_code:
+            errors.append({'line': line_number, 'message': "ID number and course code are required"})
+            continue
+        test_raw, exam_raw = _cell(row, 'test_score'), _cell(row, 'exam_score')
+        if not test_raw and not exam_raw:
+            continue
+        try:
+            test_val, exam_val = parse_scores(test_raw, exam_raw)
+        except ValueError as e:
+            errors.append({'line': line_number, 'message': f"{id_number} {course_code}: {e}"})
+            continue
+        # A later row for the same student/course replaces an earlier one
+        parsed[(id_number, course_code)] = (line_number, test_val, exam_val)
+
+    # Dict indexes for students and (authorised) courses, built with a few IN queries
+    students = {}
+    for chunk in chunked({k[0] for k in parsed}, LOOKUP_CHUNK_SIZE):
+        students.update(
+            StudentProfile.objects.filter(user__id_number__in=chunk).values_list('user__id_number', 'id')
+        )
+    courses = dict(
+        Course.objects.filter(
+            code__in={k[1] for k in parsed},
+            offerings__department__faculty__programme_type__in=assigned_types,
+        ).distinct().values_list('code', 'id')
+    )
+    # Same eligibility as the upload grid: one IN query per course (per chunk)
+    # for the students the file names against it
+    include_cohort = session == AcademicSession.get_active()
+    candidates = {}
+    for id_number, course_code in parsed:
+        if id_number in students and course_code in courses:
+            candidates.setdefault(courses[course_code], set()).add(students[id_number])
+    eligible = set()
+    for course_id, student_ids in candidates.items():
+        for chunk in chunked(student_ids, LOOKUP_CHUNK_SIZE):
+            eligible.update(
+                (student_id, course_id) for student_id in eligible_students(
+                    course_id, session, assigned_types, include_cohort
+                ).filter(id__in=chunk).values_list('id', flat=True)
+            )
+
+    existing = {
+        (student_id, course_id): (test, exam)
+        for student_id, course_id, test, exam in Result.objects.filter(
+            academic_session=session, course_id__in=courses.values()
+        ).values_list('student_id', 'course_id', 'test_score', 'exam_score')
+    }
+
+    plan = {'rows': [], 'errors': errors, 'new': 0, 'changed': 0, 'unchanged': 0, 'preview': []}
+    for (id_number, course_code), (line_number, test_val, exam_val) in sorted(parsed.items(), key=lambda i: i[1][0]):
+        student_id = students.get(id_number)
+        course_id = courses.get(course_code)
+        if student_id is None:
+            errors.append({'line': line_number, 'message': f"{id_number}: student not found"})
+            continue
+        if course_id is None:
+            errors.append({'line': line_number, 'message': f"{course_code}: course not found or not assigned to you"})
+            continue
+        if (student_id, course_id) not in eligible:
+            errors.append({
+                'line': line_number,
+                'message': f"{id_number}: not eligible for {course_code} in {session.name} "
+                           f"(not registered and not in a department/level offering it)",
+            })
+            continue
+
+        old = existing.get((student_id, course_id))
+        new = (Decimal(str(test_val)).quantize(ONE_PLACE), Decimal(str(exam_val)).quantize(ONE_PLACE))
+        if old == new:
+            plan['unchanged'] += 1
+            continue
+        status = 'new' if old is None else 'changed'
+        plan[status] += 1
+        plan['rows'].append([student_id, course_id, test_val, exam_val])
+        if len(plan['preview']) < PREVIEW_LIMIT:
+            plan['preview'].append({
+                'line': line_number,
+                'id_number': id_number,
+                'course_code': course_code,
+                'status': status,
+                'old_test': old[0] if old else None,
+                'old_exam': old[1] if old else None,
+                'test': test_val,
+                'exam': exam_val,
+            })
+    errors.sort(key=lambda e: e['line'])
+    return plan
+
+
+def commit_import(rows, session, uploaded_by):
+    """
+    Write planned rows ([student_id, course_id, test, exam]) in one transaction,
+    one bulk upsert per course, then recompute the affected GPAs.
+    Returns the number of results saved.
+    """
+    by_course = {}
+    for student_id, course_id, test_val, exam_val in rows:
+        by_course.setdefault(course_id, []).append((student_id, test_val, exam_val))
+
+    students = {}
+    for chunk in chunked({row[0] for row in rows}, LOOKUP_CHUNK_SIZE):
+        students.update(
+            (s.id, s) for s in StudentProfile.objects.filter(id__in=chunk).only('id', 'department_id', 'current_level_id')
+        )
+    courses = Course.objects.in_bulk(by_course.keys())
+
+    saved = 0
+    gpa_keys = set()
+    with transaction.atomic():
+        for course_id, entries in by_course.items():
+            course = courses.get(course_id)
+            if course is None:
+                continue
+            report = bulk_upsert_results(
+                course,
+                session,
+                ((students[sid], test, exam) for sid, test, exam in entries if sid in students),
+                uploaded_by=uploaded_by,
+            )
+            saved += report['saved']
+            gpa_keys.update((sid, session.id, course.semester) for sid in report['student_ids'])
+        recompute_semester_gpas(gpa_keys)
+    return saved
@@ -0,0 +1,253 @@
+"""
+Bulk result upload helpers for the exam officer views.
+
+Scores are validated and graded in memory, then written with a handful of
+bulk statements instead of one update_or_create() per student.
+"""
+
+import math
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Course, CourseOffering, CourseRegistration, Result, StudentProfile
+from .utils import bump_cache_version, cache_version
+
+# Rows per INSERT ... ON CONFLICT statement (keeps SQLite under its variable limit)
+RESULT_BATCH_SIZE = 500
+
+RESULT_UPDATE_FIELDS = [
+    'semester', 'level', 'test_score', 'exam_score',
+    'total_score', 'grade', 'grade_point', 'uploaded_by', 'updated_at',
+]
+
+# Bumped whenever Result rows are written; part of every cached summary key
+RESULTS_VERSION_KEY = 'results:version'
+DASHBOARD_CACHE_SECONDS = 300
+
+
+def results_version():
+    return cache_version(RESULTS_VERSION_KEY)
+
+
+def bump_results_version():
+    """Invalidate cached result summaries (call after writing Result rows)"""
+    bump_cache_version(RESULTS_VERSION_KEY)
+
+
+def parse_scores(test_score, exam_score):
+    """
+    Validate raw test/exam inputs (strings from a form or spreadsheet).
+    Blank values count as 0. Raises ValueError with a user-facing message.
+    """
+    test_score = str(test_score if test_score is not None else '').strip()
+    exam_score = str(exam_score if exam_score is not None else '').strip()
+    try:
+        test_val = float(test_score) if test_score else 0
+        exam_val = float(exam_score) if exam_score else 0
+    except (ValueError, TypeError):
+        raise ValueError("Invalid score value")
+    if not (math.isfinite(test_val) and math.isfinite(exam_val)):
+        raise ValueError("Invalid score value")
+    if test_val < 0 or test_val > 40:
+        raise ValueError("Test score must be 0-40")
+    if exam_val < 0 or exam_val > 60:
+        raise ValueError("Exam score must be 0-60")
+    return test_val, exam_val
+
+
+def offering_levels_by_department(course):
+    """Map department_id -> level_id the course is offered at (lowest level wins)"""
+    levels = {}
+    offerings = CourseOffering.objects.filter(course=course).order_by('level__order')
+    for department_id, level_id in offerings.values_list('department_id', 'level_id'):
+        levels.setdefault(department_id, level_id)
+    return levels
+
+
+def eligible_students(course, session, assigned_types, include_cohort=True):
+    """
+    Students whose results may be entered for `course` in `session`: those
+    registered for it or already holding a result for it, plus, when
+    `include_cohort` (the active session), everyone currently in a
+    department/level that offers the course under `assigned_types`.
+    """
+    student_q = Q(
+        registrations__course=course,
+        registrations__academic_session=session,
+        registrations__status='registered',
+    )
+    student_q |= Q(results__course=course, results__academic_session=session)
+    if include_cohort:
+        offerings = CourseOffering.objects.filter(
+            course=course, department__faculty__programme_type__in=assigned_types
+        )
+        for department_id, level_id in offerings.values_list('department_id', 'level_id'):
+            student_q |= Q(department_id=department_id, current_level_id=level_id)
+    return StudentProfile.objects.filter(student_q).distinct()
+
+
+def build_result(student, course, session, test_val, exam_val, level_id, uploaded_by):
+    """Build an unsaved Result with total/grade/grade point filled in"""
+    total = test_val + exam_val
+    grade, grade_point = Result.calculate_grade(total)
+    return Result(
+        student=student,
+        course=course,
+        academic_session=session,
+        semester=course.semester,
+        level_id=level_id,
+        test_score=test_val,
+        exam_score=exam_val,
+        total_score=total,
+        grade=grade,
+        grade_point=grade_point,
+        uploaded_by=uploaded_by,
+    )
+
+
+def bulk_upsert_results(course, session, entries, uploaded_by, batch_size=RESULT_BATCH_SIZE):
+    """
+    Validate and save scores for one course/session in a single transaction.
+
+    `entries` is an iterable of (student, test_score, exam_score) with raw
+    input values; rows where both scores are blank are skipped.
+
+    Returns a report dict:
+        saved, created, updated -- row counts
+        student_ids             -- students whose result was written
+        errors                  -- list of {'student', 'message'} per rejected row
+    """
+    levels = offering_levels_by_department(course)
+    existing_ids = set(
+        Result.objects.filter(course=course, academic_session=session)
+        .values_list('student_id', flat=True)
+    )
+
+    results = []
+    errors = []
+    for student, test_score, exam_score in entries:
+        test_raw = str(test_score if test_score is not None else '').strip()
+        exam_raw = str(exam_score if exam_score is not None else '').strip()
+        if not test_raw and not exam_raw:
+            continue
+        try:
+            test_val, exam_val = parse_scores(test_raw, exam_raw)
+        except ValueError as e:
+            errors.append({'student': student, 'message': str(e)})
+            continue
+        level_id = levels.get(student.department_id, student.current_level_id)
+        results.append(build_result(student, course, session, test_val, exam_val, level_id, uploaded_by))
+
+    if results:
+        # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target; it uses
+        # the (student, course, academic_session) unique key by itself
+        conflict_target = {}
+        if connection.features.supports_update_conflicts_with_target:
+            conflict_target['unique_fields'] = ['student', 'course', 'academic_session']
+        with transaction.atomic():
+            Result.objects.bulk_create(
+                results,
+                batch_size=batch_size,
+                update_conflicts=True,
+                update_fields=RESULT_UPDATE_FIELDS,
+                **conflict_target,
+            )
+            transaction.on_commit(bump_results_version)
+
+    student_ids = [r.student_id for r in results]
+    created = sum(1 for sid in student_ids if sid not in existing_ids)
+    return {
+        'saved': len(results),
+        'created': created,
+        'updated': len(results) - created,
+        'student_ids': student_ids,
+        'errors': errors,
+    }
+
+
+def with_result_progress(courses, session, include_cohort=True):
+    """
+    Annotate a Course queryset with `registered`, `results_done` and
+    `cohort_size` for `session` using correlated subqueries, so listing any
+    number of courses costs a single query.
+
+    `cohort_size` counts students whose current department/level match one of
+    the course's offerings; it is only meaningful for the active session and
+    is 0 when `include_cohort` is False.
+    """
+    registered = CourseRegistration.objects.filter(
+        course=OuterRef('pk'), status='registered', academic_session=session
+    ).order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count')
+
+    results_done = Result.objects.filter(
+        course=OuterRef('pk'), academic_session=session
+    ).order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count')
+
+    if include_cohort:
+        # Students are counted per offering from the (department, current_level)
+        # index and summed per course; offerings are unique per course, and each
+        # student has one department/level, so nobody is counted twice
+        offering_cohort = StudentProfile.objects.filter(
+            department=OuterRef('department_id'), current_level=OuterRef('level_id'),
+        ).order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count')
+        cohort = CourseOffering.objects.filter(course=OuterRef('pk')).order_by().annotate(
+            students=Subquery(offering_cohort, output_field=IntegerField())
+        ).values('course').annotate(total=Sum('students')).values('total')
+        cohort_size = Coalesce(Subquery(cohort, output_field=IntegerField()), 0)
+    else:
+        cohort_size = Value(0, output_field=IntegerField())
+
+    return courses.annotate(
+        registered=Coalesce(Subquery(registered, output_field=IntegerField()), 0),
+        results_done=Coalesce(Subquery(results_done, output_field=IntegerField()), 0),
+        cohort_size=cohort_size,
+    )
+
+
+def pending_course_count(assigned_types, session):
+    """
+    Number of active courses in `session` (for the given programme types)
+    that have fewer results than registrations, in one grouped query.
+    """
+    courses = Course.objects.filter(
+        offerings__department__faculty__programme_type__in=assigned_types,
+        academic_session=session,
+        is_active=True,
+    ).distinct()
+    return with_result_progress(courses, session, include_cohort=False).filter(
+        registered__gt=0, results_done__lt=F('registered')
+    ).count()
+
+
+def exam_officer_summary(user, assigned_types, session):
+    """
+    Dashboard counters for an exam officer, cached per officer/session and
+    invalidated whenever results are written.
+    """
+    if not session or not assigned_types:
+        return {
+            'total_courses': 0,
+            'total_results_uploaded': Result.objects.filter(
+                uploaded_by=user, academic_session=session
+            ).count() if session else 0,
+            'pending_courses': 0,
+        }
+
+    key = f"exam_officer_summary:{user.pk}:{session.pk}:{','.join(sorted(assigned_types))}:{results_version()}"
+    summary = cache.get(key)
+    if summary is None:
+        summary = {
+            'total_courses': Course.objects.filter(
+                offerings__department__faculty__programme_type__in=assigned_types,
+                academic_session=session,
+            ).distinct().count(),
+            'total_results_uploaded': Result.objects.filter(
+                uploaded_by=user, academic_session=session
+            ).count(),
+            'pending_courses': pending_course_count(assigned_types, session),
+        }
+        cache.set(key, summary, DASHBOARD_CACHE_SECONDS)
+    return summary
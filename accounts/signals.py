@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from .models import StudentProfile, StaffProfile, ExamOfficerProfile, Faculty, Department, Level
+from .models import StudentProfile, StaffProfile, ExamOfficerProfile, Faculty, Department, Level, Result, PaymentTransaction
+from .payments import invalidate_fee_clearance
+from .reference_data import connect_signals as connect_reference_data_signals
+from .results import bump_results_version
 import random
 import string
 import logging
@@ -115,3 +118,21 @@ def create_user_profile(sender, instance, created, **kwargs):
         except Exception as e:
             logger.error(f"Error creating profile for {instance.username}: {e}")
             raise
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def invalidate_result_summaries(sender, instance, **kwargs):
+    # Bulk uploads bump the version themselves; this covers admin edits and deletes
+    bump_results_version()
+
+
+@receiver(post_save, sender=PaymentTransaction)
+@receiver(post_delete, sender=PaymentTransaction)
+def invalidate_payment_clearance(sender, instance, **kwargs):
+    # Reconciliation updates invalidate themselves; this covers admin edits
+    invalidate_fee_clearance([instance])
+
+
+# Level/Faculty/Department/Program/ProgramChoice changes invalidate accounts.reference_data
+connect_reference_data_signals()
@@ -1,3 +1,791 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import hmac
+import json
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    AcademicSession, Course, CourseOffering, CourseRegistration, Department, Faculty, Job, Level,
+    PaymentTransaction, PaystackEvent, Result, SemesterGPA, StudentProfile, User,
+)
+from . import background, payments, paystack, reference_data
+from .background import job_handler, run_job
+from .gpa import TWO_PLACES, rebuild_cumulative_gpas, recompute_semester_gpas
+from .pagination import KeysetPaginator, encode_cursor
+from .paystack import PaystackClient, PaystackError, paystack_metrics
+from .result_import import plan_import
+from .results import bulk_upsert_results, with_result_progress
+
+
+def reset_caches():
+    """Forget cached summaries and reference data so query counts are cold-cache counts"""
+    cache.clear()
+
+
+class AcademicDataMixin:
+    """A department with two levels, an active session, courses and students"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = Faculty.objects.create(name='Science', short_name='SCI')
+        cls.department = Department.objects.create(faculty=cls.faculty, name='Computer Science', short_name='CSC')
+        cls.level_100 = Level.objects.create(name='100', display_name='100 Level', order=1)
+        cls.level_200 = Level.objects.create(name='200', display_name='200 Level', order=2)
+        cls.session = AcademicSession.objects.create(
+            name='2024/2025', start_year=2024, end_year=2025, is_active=True,
+            start_date=datetime.date(2024, 9, 1), end_date=datetime.date(2025, 8, 31),
+            registration_deadline=datetime.date(2024, 9, 15),
+        )
+        cls.course = Course.objects.create(
+            code='CSC101', title='Introduction to Computing', credits=3, semester='first',
+            academic_session=cls.session,
+        )
+        CourseOffering.objects.create(course=cls.course, department=cls.department, level=cls.level_100)
+        cls.students = [cls.create_student(i) for i in range(5)]
+
+    @classmethod
+    def create_student(cls, index, level=None):
+        user = User.objects.create(
+            username=f'student{index}', user_type='student', id_number=f'LVC/{index:04d}',
+            first_name='Student', last_name=str(index), is_verified=True,
+        )
+        profile = user.studentprofile
+        profile.faculty = cls.faculty
+        profile.department = cls.department
+        profile.current_level = level or cls.level_100
+        profile.current_session = cls.session
+        profile.save()
+        return profile
+
+    def setUp(self):
+        reset_caches()
+
+
+class BulkUpsertResultsTests(AcademicDataMixin, TestCase):
+    def upsert(self, scores, batch_size=2):
+        entries = [(student, test, exam) for student, (test, exam) in zip(self.students, scores)]
+        with CaptureQueriesContext(connection) as queries:
+            report = bulk_upsert_results(self.course, self.session, entries, None, batch_size=batch_size)
+        return report, len(queries)
+
+    def test_second_upload_updates_without_duplicating(self):
+        report, _ = self.upsert([(10, 20)] * 5)
+        self.assertEqual((report['saved'], report['created'], report['updated']), (5, 5, 0))
+
+        report, _ = self.upsert([(30, 50)] * 5)
+        self.assertEqual((report['saved'], report['created'], report['updated']), (5, 0, 5))
+
+        results = Result.objects.filter(course=self.course, academic_session=self.session)
+        self.assertEqual(results.count(), 5)
+        self.assertEqual(set(results.values_list('total_score', 'grade')), {(80, 'A')})
+
+    def test_one_insert_per_batch(self):
+        # Offering levels + existing results, then savepoint/release around one statement per batch
+        _, queries = self.upsert([(10, 20)] * 5, batch_size=2)
+        self.assertEqual(queries, 2 + 2 + 3)
+        _, queries = self.upsert([(10, 20)] * 5, batch_size=5)
+        self.assertEqual(queries, 2 + 2 + 1)
+
+    def test_invalid_and_blank_rows(self):
+        report, _ = self.upsert([(10, 20), (50, 10), ('', ''), ('x', 1), (40, 60)])
+        self.assertEqual(report['saved'], 2)
+        self.assertEqual([e['student'] for e in report['errors']], [self.students[1], self.students[3]])
+
+
+class SelectCourseQueryTests(AcademicDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.officer = User.objects.create(username='officer', user_type='exam_officer')
+        cls.officer.examofficerprofile.can_manage_degree = True
+        cls.officer.examofficerprofile.save()
+
+    def add_courses(self, count):
+        for i in range(count):
+            course = Course.objects.create(
+                code=f'CSC2{i:02d}', title=f'Course {i}', credits=2, semester='first',
+                academic_session=self.session,
+            )
+            CourseOffering.objects.create(course=course, department=self.department, level=self.level_200)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.officer)
+
+    def get(self):
+        reset_caches()
+        return self.client.get(reverse('accounts:exam_officer_select_course'), {'semester': 'first'})
+
+    def test_query_count_does_not_grow_with_courses(self):
+        # Session, user, officer profile, active session, the annotated courses,
+        # levels, unread notifications and the session dropdown
+        with self.assertNumQueries(8):
+            response = self.get()
+        self.assertEqual(len(response.context['course_data']), 1)
+
+        self.add_courses(10)
+        with self.assertNumQueries(8):
+            response = self.get()
+        self.assertEqual(len(response.context['course_data']), 11)
+
+
+class RegisterCoursesQueryTests(AcademicDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = cls.create_student(200, level=cls.level_200)
+        PaymentTransaction.objects.create(
+            student=cls.student, payment_type='school_fees', amount=1000, reference='SF-200',
+            session=cls.session.name, academic_session=cls.session, semester='first', status='success',
+        )
+
+    def add_courses(self, count, level):
+        courses = []
+        for i in range(count):
+            course = Course.objects.create(
+                code=f'GEN{level.order}{i:02d}', title=f'Course {i}', credits=2,
+                semester='first' if i % 2 else 'second', academic_session=self.session,
+            )
+            CourseOffering.objects.create(course=course, department=self.department, level=level)
+            courses.append(course)
+        return courses
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student.user)
+
+    def get(self):
+        reset_caches()
+        return self.client.get(reverse('accounts:register_courses'))
+
+    def post(self, courses):
+        reset_caches()
+        return self.client.post(reverse('accounts:register_courses'), {'courses': [c.pk for c in courses]})
+
+    def test_get_query_count_does_not_grow_with_courses(self):
+        # Session, user, profile, fee clearance, levels, the offerings,
+        # registrations and unread notifications
+        with self.assertNumQueries(8):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+
+        self.add_courses(6, self.level_200)
+        self.add_courses(6, self.level_100)
+        with self.assertNumQueries(8):
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_query_count_does_not_grow_with_selection(self):
+        # Session, user, profile, fee clearance, levels, the eligible offerings,
+        # then savepoint/release around the delete, insert and re-register update
+        with self.assertNumQueries(11):
+            response = self.post([self.course])
+        self.assertRedirects(response, reverse('accounts:view_registered_courses'), fetch_redirect_response=False)
+
+        courses = self.add_courses(6, self.level_200) + self.add_courses(6, self.level_100)
+        with self.assertNumQueries(11):
+            self.post(courses)
+        # The new selection replaces the earlier one for the semesters it covers
+        self.assertEqual(
+            set(CourseRegistration.objects.filter(student=self.student).values_list('course_id', flat=True)),
+            {c.pk for c in courses},
+        )
+
+
+class GpaDataMixin(AcademicDataMixin):
+    """Earlier sessions (created newest first, so ids run against time) and a second course"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.session_2023 = cls.create_session(2023)
+        cls.session_2022 = cls.create_session(2022)
+        cls.maths = Course.objects.create(
+            code='MTH101', title='Calculus', credits=2, semester='second', academic_session=cls.session,
+        )
+
+    @classmethod
+    def create_session(cls, start_year):
+        return AcademicSession.objects.create(
+            name=f'{start_year}/{start_year + 1}', start_year=start_year, end_year=start_year + 1,
+            start_date=datetime.date(start_year, 9, 1), end_date=datetime.date(start_year + 1, 8, 31),
+            registration_deadline=datetime.date(start_year, 9, 15),
+        )
+
+    def add_result(self, student, course, session, semester, test, exam):
+        Result.objects.create(
+            student=student, course=course, academic_session=session, semester=semester,
+            level=student.current_level, test_score=test, exam_score=exam,
+        )
+        return (student.pk, session.pk, semester)
+
+
+class CumulativeGpaTests(GpaDataMixin, TestCase):
+    def upload_history_backwards(self, student):
+        # Newest semester first, recomputing after each upload like the upload views
+        for args in (
+            (self.maths, self.session, 'second', 25, 40),          # B: 2 credits x 4
+            (self.course, self.session_2023, 'first', 15, 27),     # E: 3 credits x 1
+            (self.maths, self.session_2022, 'second', 20, 35),     # C: 2 credits x 3
+            (self.course, self.session_2022, 'first', 30, 50),     # A: 3 credits x 5
+        ):
+            recompute_semester_gpas([self.add_result(student, *args)])
+
+    def history(self, student):
+        rows = SemesterGPA.objects.filter(student=student).order_by(*SemesterGPA.CHRONOLOGICAL_ORDER)
+        return [
+            (row.academic_session.name, row.semester, row.gpa, row.cumulative_credits, row.cgpa)
+            for row in rows.select_related('academic_session')
+        ]
+
+    def test_out_of_order_uploads_give_chronological_running_totals(self):
+        student = self.students[0]
+        self.upload_history_backwards(student)
+        self.assertEqual(self.history(student), [
+            ('2022/2023', 'first', Decimal('5.00'), 3, Decimal('5.00')),
+            ('2022/2023', 'second', Decimal('3.00'), 5, Decimal('4.20')),
+            ('2023/2024', 'first', Decimal('1.00'), 8, Decimal('3.00')),
+            ('2024/2025', 'second', Decimal('4.00'), 10, Decimal('3.20')),
+        ])
+        # The per-row calculation agrees with the running totals
+        for row in SemesterGPA.objects.filter(student=student).select_related('academic_session'):
+            cgpa = row.cgpa
+            row.calculate_cgpa()
+            self.assertEqual(Decimal(str(row.cgpa)), cgpa)
+
+    def test_rebuild_is_idempotent(self):
+        for student in self.students[:2]:
+            self.upload_history_backwards(student)
+        self.assertEqual(rebuild_cumulative_gpas(), 0)
+
+        SemesterGPA.objects.filter(student=self.students[0]).update(cgpa=0, cumulative_credits=0)
+        self.assertEqual(rebuild_cumulative_gpas(), 4)
+        self.assertEqual(self.history(self.students[0])[-1][3:], (10, Decimal('3.20')))
+        self.assertEqual(rebuild_cumulative_gpas(), 0)
+        call_command('rebuild_cgpa', stdout=StringIO())
+        self.assertEqual(rebuild_cumulative_gpas(), 0)
+
+
+class RecomputeGpasTests(GpaDataMixin, TestCase):
+    def add_results(self, students):
+        for i, student in enumerate(students):
+            self.add_result(student, self.course, self.session, 'first', 10 + i * 5, 30 + i * 5)
+            self.add_result(student, self.maths, self.session, 'first', 20, 20 + i * 8)
+            self.add_result(student, self.course, self.session_2023, 'second', 30, 45)
+
+    def test_query_count_does_not_grow_with_students(self):
+        # Keys, grouped totals, existing rows, levels of the missing rows,
+        # INSERT, re-read, history and one bulk UPDATE, inside a savepoint
+        for students in (self.students[:1], self.students[1:]):
+            SemesterGPA.objects.all().delete()
+            self.add_results(students)
+            with self.assertNumQueries(10):
+                call_command('recompute_gpas', stdout=StringIO())
+        self.assertEqual(SemesterGPA.objects.count(), 10)
+
+    def test_matches_per_student_calculation(self):
+        self.add_results(self.students)
+        call_command('recompute_gpas', stdout=StringIO())
+        rows = SemesterGPA.objects.select_related('academic_session', 'student')
+        self.assertEqual(len(rows), 10)
+        for row in rows:
+            stored = (row.total_credits, row.total_quality_points, row.cumulative_credits,
+                      row.cumulative_quality_points, row.gpa, row.cgpa)
+            row.calculate_gpa()
+            row.calculate_cgpa()
+            # The per-student methods round floats; the stored values round half up
+            quality_points = Decimal(str(row.total_quality_points)).quantize(TWO_PLACES)
+            cumulative_quality_points = Decimal(str(row.cumulative_quality_points)).quantize(TWO_PLACES)
+            expected = (
+                row.total_credits, quality_points, row.cumulative_credits, cumulative_quality_points,
+                (quality_points / row.total_credits).quantize(TWO_PLACES, ROUND_HALF_UP),
+                (cumulative_quality_points / row.cumulative_credits).quantize(TWO_PLACES, ROUND_HALF_UP),
+            )
+            self.assertEqual(stored, expected)
+
+
+class AdvanceAcademicSessionTests(AcademicDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # ND1/ND2 (seeded by migration 0028) sit between 200 and 300 in `order`,
+        # so the next level must be chosen per programme type
+        cls.nd_1 = Level.objects.get(name='ND1')
+        cls.nd_2 = Level.objects.get(name='ND2')
+        cls.level_300 = Level.objects.create(name='300', display_name='300 Level', order=cls.nd_2.order + 10)
+        cls.next_session = AcademicSession.objects.create(
+            name='2025/2026', start_year=2025, end_year=2026,
+            start_date=datetime.date(2025, 9, 1), end_date=datetime.date(2026, 8, 31),
+            registration_deadline=datetime.date(2025, 9, 15),
+        )
+        placements = [
+            (cls.level_100, 'first'), (cls.level_100, 'second'), (cls.level_200, 'first'),
+            (cls.level_200, 'second'), (cls.nd_1, 'second'), (cls.nd_2, 'second'),
+        ]
+        cls.placed = []
+        for index, (level, semester) in enumerate(placements, start=10):
+            student = cls.create_student(index, level=level)
+            StudentProfile.objects.filter(pk=student.pk).update(current_semester=semester)
+            cls.placed.append(student)
+
+    def advance(self, *args):
+        call_command('advance_academic_session', '--session-name', '2025/2026', *args, stdout=StringIO())
+
+    def placements(self):
+        rows = StudentProfile.objects.filter(pk__in=[s.pk for s in self.placed]).order_by('user__username')
+        return [(s.current_level.name, s.current_semester, s.current_session.name) for s in rows]
+
+    def test_promotes_within_programme_type_once(self):
+        self.advance()
+        self.assertEqual(self.placements(), [
+            ('100', 'second', '2025/2026'),
+            ('200', 'first', '2025/2026'),   # promoted, not then moved on to 200 second
+            ('200', 'second', '2025/2026'),
+            ('300', 'first', '2025/2026'),   # not ND1, the next level by order
+            ('ND2', 'first', '2025/2026'),
+            ('ND2', 'second', '2025/2026'),  # final ND level, unchanged
+        ])
+        self.assertFalse(StudentProfile.objects.exclude(current_session=self.next_session).exists())
+
+    def test_dry_run_writes_nothing(self):
+        before = self.placements()
+        # Target session, levels, level map, grouped counts, session count: no UPDATEs
+        with self.assertNumQueries(5):
+            self.advance('--dry-run')
+        self.assertEqual(self.placements(), before)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = Faculty.objects.create(name='Science', short_name='SCI')
+        # Three names shared by eleven rows, created out of order
+        for i in range(11):
+            name = ('Physics', 'Biology', 'Chemistry')[i % 3]
+            Department.objects.create(faculty=faculty, name=name, short_name=f'D{i}')
+        cls.expected = list(Department.objects.order_by('name', 'id').values_list('id', flat=True))
+
+    def paginator(self):
+        return KeysetPaginator(Department.objects.all(), ('name', 'id'), per_page=3)
+
+    def test_cursors_walk_every_row_once_in_both_directions(self):
+        pages, page = [], self.paginator().get_page()
+        self.assertFalse(page.has_previous)
+        while True:
+            pages.append([d.id for d in page])
+            if not page.has_next:
+                break
+            page = self.paginator().get_page(page.next_cursor)
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 3, 2])
+
+        backwards = []
+        while page.has_previous:
+            page = self.paginator().get_page(page.previous_cursor)
+            backwards.insert(0, [d.id for d in page])
+        self.assertEqual(backwards, pages[:-1])
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        first = [d.id for d in self.paginator().get_page()]
+        for cursor in (
+            'not-a-cursor!', encode_cursor(['Physics'], 'next'), encode_cursor(['Physics', 'x'], 'next'),
+            encode_cursor(['Physics', [1]], 'prev'), encode_cursor([{'a': 1}, 2], 'next'),
+            encode_cursor([None, None], 'next'),
+        ):
+            self.assertEqual([d.id for d in self.paginator().get_page(cursor)], first, cursor)
+
+    def test_api_list_follows_links_and_ignores_bad_cursors(self):
+        user = User.objects.create(username='reader')
+        self.client.force_login(user)
+        url = reverse('accounts_api:department_list')
+        with mock.patch('accounts.pagination.KeysetPagination.page_size', 4):
+            seen, link = [], url
+            while link:
+                data = self.client.get(link).json()
+                seen += [row['id'] for row in data['results']]
+                link = data['next']
+            self.assertEqual(seen, self.expected)
+            self.assertEqual(data['count'], 11)
+
+            response = self.client.get(url, {'cursor': encode_cursor(['Physics', 'x'], 'next')})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row['id'] for row in response.json()['results']], self.expected[:4])
+
+
+class ResultProgressTests(AcademicDataMixin, TestCase):
+    def test_cohort_size_sums_the_course_offerings(self):
+        other = Department.objects.create(faculty=self.faculty, name='Mathematics', short_name='MTH')
+        CourseOffering.objects.create(course=self.course, department=self.department, level=self.level_200)
+        CourseOffering.objects.create(course=self.course, department=other, level=self.level_200)
+        for index in (10, 11):
+            self.create_student(index, level=self.level_200)
+        outsider = self.create_student(12)
+        StudentProfile.objects.filter(pk=outsider.pk).update(department=other)  # 100 level: not offered there
+        unoffered = Course.objects.create(code='CSC199', title='Seminar', credits=1, academic_session=self.session)
+        Result.objects.create(
+            student=self.students[0], course=self.course, academic_session=self.session, semester='first',
+            level=self.level_100, test_score=20, exam_score=30,
+        )
+
+        with self.assertNumQueries(1):
+            courses = {c.code: c for c in with_result_progress(Course.objects.all(), self.session)}
+        self.assertEqual(
+            (courses['CSC101'].cohort_size, courses['CSC101'].results_done, courses['CSC101'].registered), (7, 1, 0)
+        )
+        self.assertEqual(courses[unoffered.code].cohort_size, 0)
+        self.assertEqual(
+            with_result_progress(Course.objects.filter(pk=self.course.pk), self.session, include_cohort=False)
+            .get().cohort_size,
+            0,
+        )
+
+
+class ResultImportEligibilityTests(AcademicDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.course_200 = Course.objects.create(
+            code='CSC201', title='Data Structures', credits=3, semester='first',
+            academic_session=cls.session,
+        )
+        CourseOffering.objects.create(course=cls.course_200, department=cls.department, level=cls.level_200)
+        cls.student_200 = cls.create_student(200, level=cls.level_200)
+
+    def plan(self, rows):
+        lines = ['id_number,course_code,test_score,exam_score'] + [','.join(map(str, row)) for row in rows]
+        upload = SimpleUploadedFile('results.csv', '\n'.join(lines).encode(), content_type='text/csv')
+        return plan_import(upload, self.session, ['degree'])
+
+    def test_rejects_students_outside_the_course_cohort(self):
+        level_100 = self.students[0]
+        plan = self.plan([
+            (level_100.user.id_number, 'CSC201', 20, 40),
+            (self.student_200.user.id_number, 'CSC201', 20, 40),
+            (level_100.user.id_number, 'CSC101', 20, 40),
+        ])
+        self.assertEqual(
+            sorted(plan['rows']),
+            sorted([[self.student_200.id, self.course_200.id, 20, 40], [level_100.id, self.course.id, 20, 40]]),
+        )
+        self.assertEqual([e['line'] for e in plan['errors']], [2])
+        self.assertIn('not eligible for CSC201', plan['errors'][0]['message'])
+
+    def test_registered_student_is_eligible(self):
+        level_100 = self.students[0]
+        CourseRegistration.objects.create(
+            student=level_100, course=self.course_200, academic_session=self.session, status='registered'
+        )
+        plan = self.plan([(level_100.user.id_number, 'CSC201', 20, 40)])
+        self.assertEqual(plan['errors'], [])
+        self.assertEqual(plan['rows'], [[level_100.id, self.course_200.id, 20, 40]])
+
+
+class FeeClearanceTests(AcademicDataMixin, TestCase):
+    def test_not_cleared_is_not_cached(self):
+        student = self.students[0]
+        payment = PaymentTransaction.objects.create(
+            student=student, payment_type='school_fees', amount=1000, reference='SF-1',
+            session=self.session.name, academic_session=self.session, semester='first',
+        )
+        self.assertFalse(payments.has_cleared_fees(student, self.session, 'first'))
+        # Confirmed by another process: no invalidation reaches this cache
+        PaymentTransaction.objects.filter(pk=payment.pk).update(status='success')
+        self.assertTrue(payments.has_cleared_fees(student, self.session, 'first'))
+        with self.assertNumQueries(0):
+            self.assertTrue(payments.has_cleared_fees(student, self.session, 'first'))
+
+
+class ReferenceDataTests(AcademicDataMixin, TestCase):
+    def test_cache_flush_reloads_rows(self):
+        self.assertIn(self.level_100, reference_data.levels())
+        Level.objects.filter(pk=self.level_100.pk).update(display_name='Year One')  # no signal
+        cache.clear()
+        self.assertEqual(reference_data.get('accounts.Level', self.level_100.pk).display_name, 'Year One')
+
+    def test_metrics_endpoint(self):
+        admin = User.objects.create_superuser(username='admin', password='x', email='admin@example.com')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('accounts:reference_data_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['accounts.Level']), {'hits', 'misses'})
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_test_secret', JOBS_RUN_IN_THREAD=False)
+class PaystackWebhookTests(TestCase):
+    def post(self, body):
+        signature = hmac.new(b'sk_test_secret', body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('accounts:paystack_webhook'), body, content_type='application/json',
+            HTTP_X_PAYSTACK_SIGNATURE=signature,
+        )
+
+    def test_records_signed_event(self):
+        body = json.dumps({'event': 'charge.success', 'data': {'reference': 'SF-1'}}).encode()
+        self.assertEqual(self.post(body).status_code, 200)
+        self.assertEqual(PaystackEvent.objects.get().reference, 'SF-1')
+
+    def test_rejects_signed_non_object_payloads(self):
+        for body in (b'[1, 2]', b'"charge.success"', b'42', b'null'):
+            self.assertEqual(self.post(body).status_code, 400)
+        body = json.dumps({'event': 'charge.success', 'data': ['SF-1']}).encode()
+        self.assertEqual(self.post(body).status_code, 200)
+        self.assertEqual(PaystackEvent.objects.get().reference, '')
+
+    def test_verification_is_not_deduped_against_a_backed_off_retry(self):
+        payments.request_verification('SF-1')
+        payments.request_verification('SF-1')
+        self.assertEqual(Job.objects.filter(name='paystack.verify').count(), 1)
+
+        Job.objects.update(run_after=timezone.now() + datetime.timedelta(minutes=5))
+        payments.request_verification('SF-1')
+        self.assertEqual(Job.objects.filter(name='paystack.verify').count(), 2)
+
+    def test_rejects_bad_signature(self):
+        response = self.client.post(
+            reverse('accounts:paystack_webhook'), b'{}', content_type='application/json',
+            HTTP_X_PAYSTACK_SIGNATURE='0' * 128,
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class StubPaystackServer(ThreadingHTTPServer):
+    """
+    Local Paystack stand-in answering from a script of (status, body, delay)
+    replies, then verifies from `transactions` (reference -> Paystack status)
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubPaystackHandler)
+        self.script = []
+        self.requests = []
+        self.transactions = {}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def handle_error(self, request, client_address):
+        pass  # the client hung up on a deliberately slow reply
+
+
+class StubPaystackHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.reply()
+
+    def reply(self):
+        self.server.requests.append((self.command, self.path))
+        status, body, delay = self.server.script.pop(0) if self.server.script else self.default_reply()
+        if delay:
+            threading.Event().wait(delay)
+        body = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def default_reply(self):
+        prefix = '/transaction/verify/'
+        if self.command != 'GET' or not self.path.startswith(prefix):
+            return 200, {'status': True}, 0
+        reference = self.path[len(prefix):]
+        if reference not in self.server.transactions:
+            return 404, {'status': False, 'message': 'Transaction reference not found'}, 0
+        data = {'reference': reference, 'status': self.server.transactions[reference]}
+        return 200, {'status': True, 'message': 'Verification successful', 'data': data}, 0
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubPaystackMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubPaystackServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        super().setUp()
+        self.server.script = []
+        self.server.requests = []
+        self.server.transactions = {}
+
+
+class PaystackClientTests(StubPaystackMixin, SimpleTestCase):
+
+    def paystack(self, **kwargs):
+        options = {'secret_key': 'sk_test', 'base_url': self.server.url, 'read_timeout': 0.5,
+                   'max_retries': 2, 'backoff': 0}
+        return PaystackClient(**{**options, **kwargs})
+
+    def test_verify_retries_server_errors(self):
+        self.server.script = [(503, {}, 0), (502, {}, 0), (200, {'status': True, 'data': {'status': 'success'}}, 0)]
+        retries = paystack_metrics().get('transaction.verify', {}).get('retries', 0)
+        response = self.paystack().verify('SF-1')
+        self.assertEqual(response['data']['status'], 'success')
+        self.assertEqual(self.server.requests, [('GET', '/transaction/verify/SF-1')] * 3)
+        self.assertEqual(paystack_metrics()['transaction.verify']['retries'], retries + 2)
+
+    def test_verify_gives_up_after_max_retries(self):
+        self.server.script = [(429, {}, 0)] * 5
+        with self.assertRaisesMessage(PaystackError, 'Paystack returned 429'), \
+                self.assertLogs('accounts.paystack', 'WARNING') as logs:
+            self.paystack().verify('SF-1')
+        self.assertIn('failed after 3 attempt(s)', logs.output[0])
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_verify_retries_read_timeouts(self):
+        self.server.script = [(200, {'status': True}, 1), (200, {'status': True, 'data': {}}, 0)]
+        self.assertEqual(self.paystack(read_timeout=0.2).verify('SF-1'), {'status': True, 'data': {}})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_initialize_is_not_retried_once_sent(self):
+        self.server.script = [(503, {}, 0), (200, {'status': True}, 0)]
+        with self.assertRaises(PaystackError), self.assertLogs('accounts.paystack', 'WARNING'):
+            self.paystack().initialize({'reference': 'SF-1'})
+        self.assertEqual(self.server.requests, [('POST', '/transaction/initialize')])
+
+        self.server.script = [(200, {'status': True}, 1)]
+        with self.assertRaises(PaystackError), self.assertLogs('accounts.paystack', 'WARNING'):
+            self.paystack(read_timeout=0.2).initialize({'reference': 'SF-2'})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_initialize_retries_connection_failures(self):
+        closed = ThreadingHTTPServer(('127.0.0.1', 0), StubPaystackHandler)
+        port = closed.server_address[1]
+        closed.server_close()
+        with mock.patch('accounts.paystack.time.sleep') as sleep:
+            with self.assertRaises(PaystackError), self.assertLogs('accounts.paystack', 'WARNING'):
+                self.paystack(base_url=f'http://127.0.0.1:{port}').initialize({'reference': 'SF-1'})
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_client_errors_and_invalid_bodies(self):
+        self.server.script = [(404, {'status': False, 'message': 'Transaction reference not found'}, 0)]
+        self.assertEqual(self.paystack().verify('SF-1')['status'], False)
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.server.script = [(200, b'<html>gateway</html>', 0)]
+        with self.assertRaisesMessage(PaystackError, 'Invalid response from Paystack (200)'):
+            self.paystack().verify('SF-1')
+
+
+class ReconcilePaymentsTests(StubPaystackMixin, AcademicDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(PAYSTACK_BASE_URL=self.server.url, PAYSTACK_RETRY_BACKOFF=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # get_client() would otherwise keep a client for another base URL
+        patcher = mock.patch.object(paystack, '_client', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pending(self, reference, paystack_status, student=None, minutes_ago=60):
+        payment = PaymentTransaction.objects.create(
+            student=student or self.students[0], payment_type='school_fees', amount=1000, reference=reference,
+            session=self.session.name, academic_session=self.session, semester='first',
+        )
+        PaymentTransaction.objects.filter(pk=payment.pk).update(
+            payment_date=timezone.now() - datetime.timedelta(minutes=minutes_ago)
+        )
+        if paystack_status is not None:
+            self.server.transactions[reference] = paystack_status
+        return payment
+
+    def reconcile(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('reconcile_payments', '--batch-size', '2', *args, stdout=out, stderr=err)
+        return out.getvalue()
+
+    def statuses(self):
+        return dict(PaymentTransaction.objects.values_list('reference', 'status'))
+
+    def test_settles_pending_payments_once(self):
+        self.pending('SF-1', 'success')
+        self.pending('SF-2', 'abandoned', student=self.students[1])
+        self.pending('SF-3', 'ongoing', student=self.students[2])
+        self.pending('SF-4', None, student=self.students[3])  # unknown to Paystack
+        self.pending('SF-5', 'success', student=self.students[4], minutes_ago=5)  # too recent
+
+        self.assertFalse(payments.has_cleared_fees(self.students[0], self.session, 'first'))
+        output = self.reconcile()
+        self.assertEqual(
+            self.statuses(),
+            {'SF-1': 'success', 'SF-2': 'failed', 'SF-3': 'pending', 'SF-4': 'pending', 'SF-5': 'pending'},
+        )
+        self.assertIn('Checked: 4', output)
+        paid = PaymentTransaction.objects.get(reference='SF-1')
+        self.assertEqual(paid.paystack_reference, 'SF-1')
+        self.assertIsNotNone(paid.verified_at)
+        self.assertTrue(payments.has_cleared_fees(self.students[0], self.session, 'first'))
+
+        # Only the still-open rows are asked about again, and nothing changes
+        self.server.requests = []
+        verified_at = paid.verified_at
+        output = self.reconcile()
+        self.assertEqual(
+            sorted(path for _, path in self.server.requests),
+            ['/transaction/verify/SF-3', '/transaction/verify/SF-4'],
+        )
+        self.assertIn('Success: 0', output)
+        self.assertIn('Failed: 0', output)
+        self.assertEqual(self.statuses()['SF-1'], 'success')
+        paid.refresh_from_db()
+        self.assertEqual(paid.verified_at, verified_at)
+
+    def test_dry_run_writes_nothing(self):
+        self.pending('SF-1', 'success')
+        self.reconcile('--dry-run')
+        self.assertEqual(self.statuses(), {'SF-1': 'pending'})
+
+
+@job_handler('tests.always_fails')
+def _always_fails(job):
+    raise RuntimeError('Paystack is down')
+
+
+class BackgroundRetryTests(TestCase):
+    def run_failing_job(self):
+        job = Job.objects.create(name='tests.always_fails', status='running', attempts=1, max_attempts=3)
+        with mock.patch.object(background, 'start_in_thread') as start:
+            run_job(job)
+        job.refresh_from_db()
+        return job, start
+
+    @override_settings(JOBS_RUN_IN_THREAD=True)
+    def test_retry_is_rescheduled_in_thread_mode(self):
+        job, start = self.run_failing_job()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+        (job_id, delay), _ = start.call_args
+        self.assertEqual(job_id, job.pk)
+        self.assertGreaterEqual(timezone.now() + datetime.timedelta(seconds=delay), job.run_after)
+
+    @override_settings(JOBS_RUN_IN_THREAD=False)
+    def test_retry_is_left_to_workers(self):
+        job, start = self.run_failing_job()
+        self.assertEqual(job.status, 'queued')
+        start.assert_not_called()
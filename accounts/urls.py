@@ -24,9 +24,13 @@ urlpatterns = [
     path('school-fees/', views.school_fees, name='school_fees'),
     path('initiate-payment/', views.initiate_payment, name='initiate_payment'),
     path('verify-payment/<path:reference>/', views.verify_payment, name='verify_payment'),
+    path('paystack/webhook/', views.paystack_webhook, name='paystack_webhook'),
     path('payment-receipt/<int:payment_id>/', views.payment_receipt, name='payment_receipt'),
     #path('student-dashboard/', views.student_dashboard, name='student_dashboard'),
     path('student-attendance/', views.student_attendance, name='student_attendance'),
+    path('admission-metrics/', views.admission_metrics, name='admission_metrics'),
+    path('paystack-metrics/', views.paystack_metrics, name='paystack_metrics'),
+    path('reference-data-metrics/', views.reference_data_metrics, name='reference_data_metrics'),
     # path('login/', views, name='login'),
 
     # Application Manager URLs
@@ -37,11 +41,15 @@ urlpatterns = [
     path('app-manager/documents/', app_manager_views.app_manager_documents, name='app_manager_documents'),
     path('app-manager/merit-list/', app_manager_views.app_manager_merit_list, name='app_manager_merit_list'),
     path('app-manager/communicate/', app_manager_views.app_manager_communicate, name='app_manager_communicate'),
+    path('app-manager/jobs/<int:job_id>/', app_manager_views.app_manager_job_status, name='app_manager_job_status'),
 
     # Exam Officer URLs
     path('exam-officer/login/', exam_officer_views.exam_officer_login, name='exam_officer_login'),
     path('exam-officer/dashboard/', exam_officer_views.exam_officer_dashboard, name='exam_officer_dashboard'),
     path('exam-officer/select-course/', exam_officer_views.select_course, name='exam_officer_select_course'),
     path('exam-officer/upload-results/<int:course_id>/', exam_officer_views.upload_results, name='exam_officer_upload_results'),
+    path('exam-officer/import-results/', exam_officer_views.import_results, name='exam_officer_import_results'),
     path('exam-officer/student-gpas/', exam_officer_views.view_student_gpas, name='exam_officer_student_gpas'),
+    path('exam-officer/export/results/<int:course_id>/', exam_officer_views.export_course_results, name='exam_officer_export_results'),
+    path('exam-officer/export/student-gpas/', exam_officer_views.export_student_gpas, name='exam_officer_export_gpas'),
 ]
\ No newline at end of file
@@ -1,5 +1,8 @@
 # accounts/utils.py
 
+import time
+
+from django.core.cache import cache
 from django.http import HttpResponseForbidden
 from django.contrib.auth.decorators import login_required
 
@@ -13,3 +16,31 @@ def student_only(view_func):
             return view_func(request, *args, **kwargs)
         return HttpResponseForbidden("Access denied. This page is for students only.")
     return _wrapped_view
+
+
+def chunked(items, size):
+    """Split `items` (any iterable) into lists of at most `size` elements"""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def cache_version(key):
+    """
+    Current value of a version counter kept in the cache. Cached entries that
+    include it in their key are invalidated by bump_cache_version(key).
+    """
+    version = cache.get(key)
+    if version is None:
+        # Seeded from the clock so a flushed or evicted counter never comes
+        # back with a value that stale entries were stored under
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
@@ -1,18 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.db.models import Q
+from django.db.models import Count, Q
 from .models import User, StaffProfile, StudentProfile, Course, CourseOffering, CourseRegistration, Department, PaymentTransaction, AcademicSession, Level
 from django.contrib.auth import login, authenticate, logout, update_session_auth_hash
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import password_validation
 from django.core.exceptions import ValidationError
+from . import payments, paystack, reference_data
+from .admission import admission_metrics as current_admission_metrics
+from .pagination import KeysetPaginator
 from .state import NIGERIA_STATES_AND_LGAS
 import json
-import requests
 from django.conf import settings
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from .models import Attendance, CourseRegistration, StudentProfile
@@ -330,7 +332,7 @@ def is_staff(user):
 def create_course(request):
     if request.method == 'POST':
         # Get the active academic session
-        active_session = AcademicSession.objects.filter(is_active=True).first()
+        active_session = AcademicSession.get_active()
         if not active_session:
             messages.error(request, 'No active academic session found. Please contact the administrator.')
             return redirect('accounts:create_course')
@@ -355,8 +357,8 @@ def create_course(request):
         for dept_id in selected_departments:
             for level_id in selected_levels:
                 try:
-                    department = Department.objects.get(id=dept_id)
-                    level = Level.objects.get(id=level_id)
+                    department = reference_data.get('accounts.Department', dept_id)
+                    level = reference_data.get('accounts.Level', level_id)
                     CourseOffering.objects.create(
                         course=course,
                         department=department,
@@ -378,9 +380,9 @@ def create_course(request):
     academic_sessions = AcademicSession.objects.all().order_by('-start_year')
 
     context = {
-        'departments': Department.objects.all(),
+        'departments': reference_data.departments(),
         'academic_sessions': academic_sessions,
-        'levels': Level.objects.all().order_by('order')
+        'levels': reference_data.levels()
     }
     return render(request, 'accounts/courses/create_course.html', context)
 
@@ -423,24 +425,35 @@ def department_students(request):
         staff_profile = request.user.staffprofile
         department = staff_profile.department
         
-        # Get all students in the department
+        # Students in the department, a page at a time
         students = StudentProfile.objects.filter(
             department=department
-        ).select_related('user').order_by('current_level', 'user__first_name')
-        
-        # Group students by level
+        ).select_related('user', 'current_level')
+        paginator = KeysetPaginator(students, ('current_level__order', 'user__first_name', 'id'), 100)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+
+        # Group this page's students by level
         students_by_level = {}
-        for student in students:
+        for student in page_obj:
             level = student.current_level
             if level not in students_by_level:
                 students_by_level[level] = []
             students_by_level[level].append(student)
 
+        # Per-level totals for the whole department in one grouped query
+        level_counts = dict(
+            students.values_list('current_level').annotate(total=Count('id')).order_by()
+        )
+        level_totals = [
+            (level, level_counts[level.id]) for level in reference_data.levels() if level.id in level_counts
+        ]
 
         context = {
             'department': department,
             'students_by_level': students_by_level,
-            'total_students': students.count(),
+            'level_totals': level_totals,
+            'total_students': sum(level_counts.values()),
+            'page_obj': page_obj,
               }
         return render(request, 'accounts/department_students.html', context)
         
@@ -504,7 +517,7 @@ def school_fees(request):
     try:
         from .models import FeeStructure
         student = request.user.studentprofile
-        current_session = AcademicSession.objects.filter(is_active=True).first()
+        current_session = AcademicSession.get_active()
         if not current_session:
             # Fallback to a default session if none is active
             current_session = AcademicSession.objects.filter(name="2023/2024").first()
@@ -513,17 +526,12 @@ def school_fees(request):
                 return redirect('dashboard:student_dashboard')
 
         # Get payment history
-        payments = PaymentTransaction.objects.filter(
+        payment_history = PaymentTransaction.objects.filter(
             student=student
         ).order_by('-payment_date')
 
         # Check if student has paid for current session and semester
-        current_payment = PaymentTransaction.objects.filter(
-            student=student,
-            session=current_session.name,
-            semester=student.current_semester,
-            status='success'
-        ).first()
+        has_paid = payments.has_cleared_fees(student, current_session, student.current_semester)
 
         # Get fee amount from FeeStructure
         try:
@@ -543,8 +551,8 @@ def school_fees(request):
             'current_session': current_session.name,
             'current_session_obj': current_session,
             'current_fees': current_fees,
-            'has_paid': bool(current_payment),
-            'payments': payments,
+            'has_paid': has_paid,
+            'payments': payment_history,
         }
         return render(request, 'accounts/school_fees.html', context)
         
@@ -565,7 +573,7 @@ def initiate_payment(request):
             return JsonResponse({'error': 'Amount is required'}, status=400)
         
         # Get current active session
-        current_session = AcademicSession.objects.filter(is_active=True).first()
+        current_session = AcademicSession.get_active()
         if not current_session:
             current_session = AcademicSession.objects.filter(name="2023/2024").first()
         session_name = current_session.name if current_session else "2023/2024"
@@ -574,11 +582,6 @@ def initiate_payment(request):
         reference = f"SF-{student.id}-{int(timezone.now().timestamp())}"
 
         # Initialize payment with Paystack
-        url = "https://api.paystack.co/transaction/initialize"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
         data = {
             "email": student.user.email,
             "amount": float(amount) * 100,  # Convert to kobo
@@ -594,8 +597,7 @@ def initiate_payment(request):
                 }
         }
 
-        response = requests.post(url, headers=headers, json=data)
-        response_data = response.json()
+        response_data = paystack.get_client().initialize(data)
 
         if response_data['status']:
             # Create payment transaction record
@@ -605,51 +607,57 @@ def initiate_payment(request):
                 amount=amount,
                 reference=reference,
                 session=session_name,
+                academic_session=current_session,
                 semester=student.current_semester
             )
             return JsonResponse(response_data)
         else:
             return JsonResponse({'error': 'Payment initialization failed'}, status=400)
-            
+
+    except paystack.PaystackError:
+        return JsonResponse({'error': 'The payment service is not responding. Please try again shortly.'}, status=502)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
 @csrf_exempt
 def verify_payment(request, reference):
-    """Verify payment with Paystack"""
+    """
+    Paystack sends the browser back here after checkout. The payment itself is
+    confirmed by the webhook (or a background verify), so this only reads its status.
+    """
     try:
-        # Verify payment with Paystack
-        url = f"https://api.paystack.co/transaction/verify/{reference}"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"
-        }
-        response = requests.get(url, headers=headers)
-        response_data = response.json()
-        
-        # Get payment transaction
         transaction = PaymentTransaction.objects.get(reference=reference)
-        
-        if response_data['status'] and response_data['data']['status'] == 'success':
-            # Update transaction
-            transaction.status = 'success'
-            transaction.paystack_reference = response_data['data']['reference']
-            transaction.verified_at = timezone.now()
-            transaction.save()
-            
-            messages.success(request, "Payment verified successfully!")
-        else:
-            transaction.status = 'failed'
-            transaction.save()
-            messages.error(request, "Payment verification failed!")
-        
-        return redirect('accounts:school_fees')
-        
     except PaymentTransaction.DoesNotExist:
         messages.error(request, "Payment transaction not found!")
         return redirect('accounts:school_fees')
-    except Exception as e:
-        messages.error(request, f"An error occurred: {str(e)}")
-        return redirect('accounts:school_fees')
+
+    if transaction.status == 'success':
+        messages.success(request, "Payment verified successfully!")
+    elif transaction.status == 'failed':
+        messages.error(request, "Payment verification failed!")
+    else:
+        # The webhook has not been processed yet; confirm it in the background
+        payments.request_verification(reference)
+        messages.info(request, "Your payment is being confirmed. Refresh this page in a few seconds.")
+    return redirect('accounts:school_fees')
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def paystack_webhook(request):
+    """Record a signed Paystack event; reconciliation happens in a background job"""
+    if not payments.valid_signature(request.body, request.headers.get('X-Paystack-Signature')):
+        return HttpResponse(status=401)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+    if not isinstance(payload, dict):
+        # Signed but not an event object (a list or a bare value)
+        return HttpResponse(status=400)
+    payments.record_event(payload)
+    return HttpResponse(status=200)
+
 @login_required
 def student_attendance(request):
     student = request.user
@@ -791,10 +799,9 @@ def create_student(request):
                     counter += 1
 
                 # Get related objects
-                department = Department.objects.get(id=department_id)
-                from accounts.models import Faculty
-                faculty = Faculty.objects.get(id=faculty_id)
-                level = Level.objects.get(id=level_id)
+                department = reference_data.get('accounts.Department', department_id)
+                faculty = reference_data.get('accounts.Faculty', faculty_id)
+                level = reference_data.get('accounts.Level', level_id)
 
                 # Get academic session
                 session = None
@@ -855,12 +862,11 @@ def create_student(request):
                 messages.error(request, f"Error creating student: {str(e)}")
 
     # GET request - show form
-    from accounts.models import Faculty
-    faculties = Faculty.objects.all()
-    departments = Department.objects.all()
-    levels = Level.objects.all().order_by('order')
+    faculties = reference_data.faculties()
+    departments = reference_data.departments()
+    levels = reference_data.levels()
     sessions = AcademicSession.objects.all().order_by('-start_year')
-    active_session = AcademicSession.objects.filter(is_active=True).first()
+    active_session = AcademicSession.get_active()
     current_year = timezone.now().year
 
     context = {
@@ -874,4 +880,25 @@ def create_student(request):
         'admission_years': [str(year) for year in range(current_year - 5, current_year + 2)],
         'current_year': str(current_year),
     }
-    return render(request, 'accounts/create_student.html', context)
\ No newline at end of file
+    return render(request, 'accounts/create_student.html', context)
+
+
+@login_required
+@user_passes_test(lambda user: user.is_superuser)
+def admission_metrics(request):
+    """Queue depth and shed/throttle counters of the admission-control middleware (this process)"""
+    return JsonResponse(current_admission_metrics())
+
+
+@login_required
+@user_passes_test(lambda user: user.is_superuser)
+def paystack_metrics(request):
+    """Per-call Paystack latency histograms (this process)"""
+    return JsonResponse(paystack.paystack_metrics())
+
+
+@login_required
+@user_passes_test(lambda user: user.is_superuser)
+def reference_data_metrics(request):
+    """Hit/miss counters of the reference-data cache per table (this process)"""
+    return JsonResponse(reference_data.reference_stats())
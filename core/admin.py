@@ -3,6 +3,8 @@ from django.shortcuts import render, redirect
 from django.contrib import messages as django_messages
 from django.utils.html import format_html
 from .models import ContactSubmission, Applicant, Program, ProgramChoice, ScreeningForm, AcademicSubject, ExaminationDetail, ScreeningPayment
+from accounts.background import enqueue
+from .admissions import admit_applicants
 from dashboard.models import Notification
 
 # Register Program only
@@ -328,6 +330,7 @@ class ScreeningFormAdmin(admin.ModelAdmin):
         from django.utils import timezone
 
         updated_count = 0
+        applicant_ids = []
         for screening_form in queryset:
             screening_form.waec_result_status = 'verified'
             screening_form.jamb_result_slip_status = 'verified'
@@ -338,15 +341,16 @@ class ScreeningFormAdmin(admin.ModelAdmin):
             screening_form.verified_by = request.user
             screening_form.verified_at = timezone.now()
             screening_form.save()
-
-            # Send notification
-            Notification.objects.create(
-                user=screening_form.applicant.user,
-                message='All your documents have been verified! Your application is now being processed.'
-            )
+            applicant_ids.append(screening_form.applicant_id)
 
             updated_count += 1
 
+        if applicant_ids:
+            enqueue('applicants.notify', {
+                'applicant_ids': applicant_ids,
+                'message': 'All your documents have been verified! Your application is now being processed.',
+            }, created_by=request.user, total=len(applicant_ids))
+
         django_messages.success(request, f'Successfully verified all documents for {updated_count} screening form(s).')
 
     verify_all_documents.short_description = "✓ Verify all documents for selected forms"
@@ -395,7 +399,7 @@ class ApplicantAdmin(admin.ModelAdmin):
     list_filter = ('status',)
     list_editable = ('status',)
     search_fields = ('user__username', 'user__email', 'phone_number')
-    actions = ['send_notification_to_applicants']
+    actions = ['send_notification_to_applicants', 'admit_selected_applicants']
 
     def send_notification_to_applicants(self, request, queryset):
         """Admin action to send notifications to selected applicants"""
@@ -403,16 +407,14 @@ class ApplicantAdmin(admin.ModelAdmin):
             # Process the form submission
             message = request.POST.get('notification_message')
 
-            # Create notifications for all selected applicants
-            notification_count = 0
-            for applicant in queryset:
-                Notification.objects.create(
-                    user=applicant.user,
-                    message=message
-                )
-                notification_count += 1
+            # Notifications are written by a background job ({name} is personalised)
+            applicant_ids = list(queryset.values_list('id', flat=True))
+            enqueue('applicants.notify', {
+                'applicant_ids': applicant_ids,
+                'message': message,
+            }, created_by=request.user, total=len(applicant_ids))
 
-            django_messages.success(request, f'Successfully sent notification to {notification_count} applicant(s).')
+            django_messages.success(request, f'Sending notification to {len(applicant_ids)} applicant(s) in the background.')
             return redirect(request.get_full_path())
 
         # Show the form to enter the notification message
@@ -423,6 +425,19 @@ class ApplicantAdmin(admin.ModelAdmin):
 
     send_notification_to_applicants.short_description = "Send notification to selected applicants"
 
+    def admit_selected_applicants(self, request, queryset):
+        """Approve, notify and log the selected applicants in one transaction"""
+        result = admit_applicants(
+            list(queryset.values_list('id', flat=True)),
+            manager=request.user,
+            details="Admitted from the admin for {program}",
+        )
+        django_messages.success(
+            request, f"{result['admitted']} applicant(s) admitted, {result['skipped']} skipped (already admitted)."
+        )
+
+    admit_selected_applicants.short_description = "Offer admission to selected applicants"
+
     def save_model(self, request, obj, form, change):
         """Send notification when applicant status changes"""
         if change:  # If this is an edit (not a new applicant)
@@ -0,0 +1,67 @@
+"""
+Bulk admission: offer admission to many applicants in one transaction.
+
+One UPDATE flips the status, and the admission notifications and activity-log
+rows are written with bulk_create, so the number of queries grows with the
+number of batches rather than the number of applicants.
+"""
+
+from django.db import transaction
+
+from accounts.models import ApplicationActivity
+from dashboard.notifications import fan_out_notifications, invalidate_notification_summary
+
+from .models import Applicant
+
+ADMISSION_MESSAGE = "Congratulations! You have been offered provisional admission to {program}."
+BATCH_SIZE = 1000
+
+
+def admit_applicants(applicant_ids, manager=None, details="Admitted via merit list for {program}",
+                     message=ADMISSION_MESSAGE, batch_size=BATCH_SIZE):
+    """
+    Approve the given applicants, notify them and log the activity.
+    Applicants that do not exist or are already approved are skipped.
+    Returns {'admitted': n, 'skipped': n}.
+    """
+    applicant_ids = list(applicant_ids)  # may be a generator; it is read twice
+    requested = {int(aid) for aid in applicant_ids if str(aid).isdigit()}
+    skipped = len(applicant_ids) - len(requested)  # malformed or repeated ids
+
+    with transaction.atomic():
+        # Lock without joining Program: PostgreSQL refuses FOR UPDATE on the
+        # nullable side of the outer join that programs__name needs
+        locked = list(
+            Applicant.objects.select_for_update()
+            .filter(id__in=requested)
+            .exclude(status='approved')
+            .values_list('id', flat=True)
+        )
+        candidates = list(
+            Applicant.objects.filter(id__in=locked).values_list('id', 'user_id', 'programs__name')
+        )
+        ids = [applicant_id for applicant_id, _, _ in candidates]
+        Applicant.objects.filter(id__in=ids).update(status='approved')
+
+        fan_out_notifications(
+            ((user_id, {'program': program or ''}) for _, user_id, program in candidates),
+            message,
+            batch_size=batch_size,
+        )
+        ApplicationActivity.objects.bulk_create(
+            [
+                ApplicationActivity(
+                    applicant_id=applicant_id,
+                    manager=manager,
+                    action='admission_offered',
+                    details=details.format(program=program or ''),
+                )
+                for applicant_id, _, program in candidates
+            ],
+            batch_size=batch_size,
+        )
+        # Summaries cached by other requests before this commits would be stale
+        user_ids = [user_id for _, user_id, _ in candidates]
+        transaction.on_commit(lambda: invalidate_notification_summary(*user_ids))
+
+    return {'admitted': len(candidates), 'skipped': skipped + len(requested) - len(candidates)}
@@ -0,0 +1,76 @@
+"""Background job handlers for the admissions side (see accounts.background)"""
+
+from django.db import transaction
+
+from accounts.background import job_handler
+from accounts.models import ApplicationActivity
+from dashboard.notifications import NOTIFICATION_BATCH_SIZE, fan_out_notifications
+
+from .models import Applicant
+
+# Audiences offered on the app manager communication page
+APPLICANT_TARGETS = {
+    'all': {},
+    'admitted': {'status': 'approved'},
+    'pending': {'status': 'pending_review'},
+    'rejected': {'status': 'rejected'},
+    'paid': {'screening_payments__status': 'success'},
+}
+
+
+def applicants_for(payload):
+    """Applicants selected by a job payload: either `applicant_ids` or a `target` name"""
+    if 'applicant_ids' in payload:
+        return Applicant.objects.filter(id__in=payload['applicant_ids'])
+    target = payload.get('target')
+    if target not in APPLICANT_TARGETS:
+        return Applicant.objects.none()
+    return Applicant.objects.filter(**APPLICANT_TARGETS[target]).distinct()
+
+
+@job_handler('applicants.notify')
+def notify_applicants(job):
+    """
+    Send one notification per selected applicant. `message` may use {name}
+    and {program}; an optional `subject` is prefixed as "subject: message".
+    """
+    payload = job.payload
+    message = payload['message']
+    if payload.get('subject'):
+        message = f"{payload['subject']}: {message}"
+
+    applicants = applicants_for(payload).order_by('pk')
+    # On a retry, resume after the last applicant an earlier attempt reached.
+    # The checkpoint is a pk, not an offset, so applicants changing status in
+    # between neither shift others out of the selection nor get notified twice.
+    checkpoint = job.checkpoint if job.attempts > 1 else {}
+    last_pk = checkpoint.get('last_pk', 0)
+    sent = checkpoint.get('sent', 0)
+    job.set_progress(sent, total=sent + applicants.filter(pk__gt=last_pk).count())
+
+    while True:
+        rows = list(
+            applicants.filter(pk__gt=last_pk).values_list(
+                'pk', 'user_id', 'user__first_name', 'user__last_name', 'programs__name'
+            )[:NOTIFICATION_BATCH_SIZE]
+        )
+        if not rows:
+            break
+        recipients = (
+            (user_id, {'name': f"{first_name} {last_name}".strip(), 'program': program or ''})
+            for _, user_id, first_name, last_name, program in rows
+        )
+        # A chunk and its checkpoint commit together, so a crash re-sends nothing
+        with transaction.atomic():
+            sent += fan_out_notifications(recipients, message)
+            last_pk = rows[-1][0]
+            job.set_progress(sent, checkpoint={'last_pk': last_pk, 'sent': sent})
+
+    if sent and payload.get('activity_details'):
+        ApplicationActivity.objects.create(
+            applicant=applicants.first(),
+            manager=job.created_by,
+            action='notification_sent',
+            details=payload['activity_details'].format(count=sent),
+        )
+    return {'sent': sent}
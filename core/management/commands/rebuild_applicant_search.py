@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Applicant
+from core.search import index_applicants
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the applicant search tokens (core.search) for every applicant'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        applicants = Applicant.objects.select_related('user').order_by('pk')
+        last_pk = 0
+        indexed = 0
+        while True:
+            batch = list(applicants.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            index_applicants(batch)
+            last_pk = batch[-1].pk
+            indexed += len(batch)
+            self.stdout.write(f"  {indexed} applicants indexed")
+        self.stdout.write(self.style.SUCCESS(f"Search tokens rebuilt for {indexed} applicants"))
@@ -0,0 +1,49 @@
+"""
+Merit-list ranking in SQL.
+
+Applicants are ranked on ScreeningForm.jamb_score_value (the integer copy of
+the free-text jamb_score, kept in step on save) with min_score and the number
+of slots applied in the database, so only the admitted rows are ever loaded.
+Ties are broken by one of TIE_BREAKS.
+"""
+
+from django.db.models import Exists, F, OuterRef
+
+from .models import ScreeningForm, ScreeningPayment
+
+# name -> (label, ORDER BY after the JAMB score)
+TIE_BREAKS = {
+    'olevel': (
+        "O'level aggregate, then date submitted",
+        (F('olevel_aggregate').asc(nulls_last=True), 'created_at', 'pk'),
+    ),
+    'date': ('Date submitted', ('created_at', 'pk')),
+}
+DEFAULT_TIE_BREAK = 'olevel'
+
+
+def rank_applicants(program, min_score=0, slots=100, tie_break=DEFAULT_TIE_BREAK):
+    """
+    The top `slots` paid applicants to `program` with a JAMB score of at least
+    `min_score`, as a list of {'applicant', 'jamb_score', 'form'} dicts in rank order.
+    """
+    ordering = TIE_BREAKS.get(tie_break, TIE_BREAKS[DEFAULT_TIE_BREAK])[1]
+    paid = ScreeningPayment.objects.filter(applicant=OuterRef('applicant'), status='success')
+    # Rank each applicant on their first screening form only
+    earlier_form = ScreeningForm.objects.filter(applicant=OuterRef('applicant'), pk__lt=OuterRef('pk'))
+
+    forms = (
+        ScreeningForm.objects.filter(applicant__programs=program, jamb_score_value__gte=min_score)
+        .filter(Exists(paid), ~Exists(earlier_form))
+        .select_related('applicant__user')
+        .only(
+            'pk', 'jamb_score_value', 'olevel_aggregate', 'created_at',
+            'applicant__id', 'applicant__state', 'applicant__status',
+            'applicant__user__first_name', 'applicant__user__last_name', 'applicant__user__email',
+        )
+        .order_by(F('jamb_score_value').desc(), *ordering)[:max(slots, 0)]
+    )
+    return [
+        {'applicant': form.applicant, 'jamb_score': form.jamb_score_value, 'form': form}
+        for form in forms
+    ]
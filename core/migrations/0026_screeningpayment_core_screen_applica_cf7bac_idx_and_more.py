@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_alter_applicant_state_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='screeningpayment',
+            index=models.Index(fields=['applicant', 'status'], name='core_screen_applica_cf7bac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='screeningpayment',
+            index=models.Index(fields=['status', 'payment_date'], name='core_screen_status_8188d4_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_screeningpayment_core_screen_applica_cf7bac_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='screeningform',
+            name='jamb_score_value',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='screeningform',
+            name='olevel_aggregate',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text="Sum of grade points (A1=1 ... F9=9) of the best five O'level subjects; lower is better", null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+# Copies of core.models.parse_jamb_score / olevel_aggregate as they were when this ran
+def parse_jamb_score(value):
+    try:
+        return max(0, int(str(value).strip()))
+    except (TypeError, ValueError):
+        return 0
+
+
+def olevel_aggregate(subject_grades):
+    best = {}
+    for subject, grade in subject_grades:
+        points = int(grade[1:])
+        best[subject] = min(points, best.get(subject, points))
+    if len(best) < 5:
+        return None
+    return sum(sorted(best.values())[:5])
+
+
+def populate_merit_columns(apps, schema_editor):
+    """Fill jamb_score_value and olevel_aggregate for existing screening forms"""
+    ScreeningForm = apps.get_model('core', 'ScreeningForm')
+    AcademicSubject = apps.get_model('core', 'AcademicSubject')
+
+    last_pk = 0
+    while True:
+        forms = list(
+            ScreeningForm.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'jamb_score')[:BATCH_SIZE]
+        )
+        if not forms:
+            break
+        last_pk = forms[-1].pk
+
+        subjects = {}
+        for form_id, subject, grade in AcademicSubject.objects.filter(
+            screening_form__in=forms
+        ).values_list('screening_form_id', 'subject', 'grade'):
+            subjects.setdefault(form_id, []).append((subject, grade))
+
+        for form in forms:
+            form.jamb_score_value = parse_jamb_score(form.jamb_score)
+            form.olevel_aggregate = olevel_aggregate(subjects.get(form.pk, []))
+        ScreeningForm.objects.bulk_update(forms, ['jamb_score_value', 'olevel_aggregate'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_screeningform_merit_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_merit_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_populate_screeningform_merit_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='core.applicant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'applicant'], name='core_applic_token_24cfff_idx')],
+                'unique_together': {('applicant', 'token')},
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+# Copy of core.search.applicant_tokens (and helpers) as it was when this ran
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalise(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def phone_digits(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('234') and len(digits) > 10:
+        digits = digits[3:]
+    return digits.lstrip('0')
+
+
+def applicant_tokens(first_name, last_name, email, phone_number):
+    tokens = set(WORD_RE.findall(normalise(f'{first_name} {last_name} {email}')))
+    digits = phone_digits(phone_number)
+    if len(digits) >= 4:
+        tokens.add(digits)
+    return {token[:100] for token in tokens}
+
+
+def populate_search_tokens(apps, schema_editor):
+    """Build the search tokens of existing applicants (same as manage.py rebuild_applicant_search)"""
+    Applicant = apps.get_model('core', 'Applicant')
+    ApplicantSearchToken = apps.get_model('core', 'ApplicantSearchToken')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Applicant.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'user__first_name', 'user__last_name', 'user__email', 'phone_number')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        ApplicantSearchToken.objects.bulk_create(
+            [
+                ApplicantSearchToken(applicant_id=pk, token=token)
+                for pk, first_name, last_name, email, phone in batch
+                for token in applicant_tokens(first_name, last_name, email, phone)
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_applicantsearchtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_tokens, migrations.RunPython.noop),
+    ]
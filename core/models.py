@@ -36,7 +36,7 @@ class Program(models.Model):
             'nce': 5000.00,
         }
         try:
-            current_session = AcademicSession.objects.filter(is_active=True).first()
+            current_session = AcademicSession.get_active()
             if not current_session:
                 return fallback.get(self.program_type, 5000.00)
             # Level names: APP_DEG, APP_ND, APP_NCE (diploma -> ND)
@@ -106,6 +106,10 @@ class ScreeningPayment(models.Model):
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['applicant', 'status']),
+            models.Index(fields=['status', 'payment_date']),
+        ]
     
     def __str__(self):
         return f"{self.applicant.user.get_full_name()} - Screening Payment ({self.get_status_display()})"
@@ -114,6 +118,31 @@ class ScreeningPayment(models.Model):
     def is_paid(self):
         return self.status == 'success'
 
+def parse_jamb_score(value):
+    """jamb_score is free text; anything that is not a whole number counts as 0"""
+    try:
+        return max(0, int(str(value).strip()))
+    except (TypeError, ValueError):
+        return 0
+
+
+OLEVEL_SUBJECTS_COUNTED = 5
+
+
+def olevel_aggregate(subject_grades):
+    """
+    Sum of the grade points (A1=1 ... F9=9) of the best OLEVEL_SUBJECTS_COUNTED
+    distinct subjects across sittings, or None if fewer subjects were entered.
+    """
+    best = {}
+    for subject, grade in subject_grades:
+        points = int(grade[1:])
+        best[subject] = min(points, best.get(subject, points))
+    if len(best) < OLEVEL_SUBJECTS_COUNTED:
+        return None
+    return sum(sorted(best.values())[:OLEVEL_SUBJECTS_COUNTED])
+
+
 class AcademicSubject(models.Model):
     """Model to store individual subject-grade combinations for academic qualifications"""
     SUBJECT_CHOICES = [
@@ -203,6 +232,22 @@ class Applicant(models.Model):
     def __str__(self):
         return self.user.username
 
+
+class ApplicantSearchToken(models.Model):
+    """
+    Normalised search terms for an applicant (name words, email, phone digits),
+    maintained by core.signals and queried by prefix in core.search.
+    """
+    applicant = models.ForeignKey(Applicant, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ['applicant', 'token']
+        indexes = [models.Index(fields=['token', 'applicant'])]
+
+    def __str__(self):
+        return self.token
+
 class ScreeningForm(models.Model):
     applicant = models.ForeignKey(Applicant, on_delete=models.CASCADE, related_name='screening_forms')
     first_name = models.CharField(max_length=100, default='N/A')
@@ -222,6 +267,12 @@ class ScreeningForm(models.Model):
     
     jamb_reg_no = models.CharField(max_length=20, default='N/A')
     jamb_score = models.CharField(default=0, max_length=3)
+    # Derived on save from jamb_score / the academic subjects; used for merit ranking (core.merit)
+    jamb_score_value = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False)
+    olevel_aggregate = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False,
+        help_text="Sum of grade points (A1=1 ... F9=9) of the best five O'level subjects; lower is better"
+    )
     
     # Academic Qualification Fields
     primary_school = models.CharField(max_length=200, default='N/A')
@@ -350,8 +401,16 @@ class ScreeningForm(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        self.jamb_score_value = parse_jamb_score(self.jamb_score)
+        if kwargs.get('update_fields') is not None and 'jamb_score' in kwargs['update_fields']:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'jamb_score_value'}
         super().save(*args, **kwargs)
 
+    def refresh_olevel_aggregate(self):
+        """Recompute olevel_aggregate from the academic subjects (called when they change)"""
+        self.olevel_aggregate = olevel_aggregate(self.academic_subjects.values_list('subject', 'grade'))
+        ScreeningForm.objects.filter(pk=self.pk).update(olevel_aggregate=self.olevel_aggregate)
+
     def get_document_verification_summary(self):
         """Get a summary of document verification statuses"""
         documents = {
@@ -0,0 +1,119 @@
+"""
+Applicant search.
+
+Each applicant has a set of normalised tokens (ApplicantSearchToken): the
+lowercased, accent-free words of their name and email address and their phone
+number as bare national digits, so every token is made of [a-z0-9]. Queries
+are split the same way and every term must match some token by prefix. A
+prefix is matched as an index range (term <= token < next string after the
+prefix), which every backend can answer from the (token, applicant) index,
+unlike LIKE '%term%'. Results are ranked by how many terms matched a token
+exactly.
+
+core.signals keeps the tokens in sync when an applicant or their user is saved;
+`manage.py rebuild_applicant_search` rebuilds them all.
+"""
+
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Exists, IntegerField, OuterRef, Value
+from django.db.models.functions import Cast
+
+from .models import Applicant, ApplicantSearchToken
+
+TOKEN_MAX_LENGTH = 100
+# Fields the tokens are built from; saves limited to other fields (last_login,
+# status...) leave the index alone
+USER_INDEXED_FIELDS = frozenset({'first_name', 'last_name', 'email'})
+APPLICANT_INDEXED_FIELDS = frozenset({'phone_number', 'user'})
+MIN_PHONE_DIGITS = 4
+WORD_RE = re.compile(r'[a-z0-9]+')
+PHONE_QUERY_RE = re.compile(r'[\d\s()+-]+')
+
+
+def normalise(text):
+    """Lowercase and strip accents ('Adébáyọ̀' -> 'adebayo')"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def phone_digits(phone):
+    """National digits of a Nigerian number: '+234 803 123 4567' and '08031234567' -> '8031234567'"""
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('234') and len(digits) > 10:
+        digits = digits[3:]
+    return digits.lstrip('0')
+
+
+def applicant_tokens(first_name, last_name, email, phone_number):
+    tokens = set(WORD_RE.findall(normalise(f'{first_name} {last_name} {email}')))
+    digits = phone_digits(phone_number)
+    if len(digits) >= MIN_PHONE_DIGITS:
+        tokens.add(digits)
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens}
+
+
+def query_terms(query):
+    """Split a search box value into the terms to match"""
+    query = (query or '').strip()
+    if PHONE_QUERY_RE.fullmatch(query) and len(re.sub(r'\D', '', query)) >= MIN_PHONE_DIGITS:
+        digits = phone_digits(query)
+        return [digits] if digits else []
+    return [term[:TOKEN_MAX_LENGTH] for term in WORD_RE.findall(normalise(query))]
+
+
+def prefix_upper_bound(term):
+    """
+    Smallest [a-z0-9] string greater than every string starting with `term`
+    ('ad' -> 'ae', 'a9' -> 'aa', 'az' -> 'b'), or None for 'zz...'. Digits sort
+    before letters in ASCII and in the case-insensitive collations alike.
+    """
+    term = term.rstrip('z')
+    if not term:
+        return None
+    last = term[-1]
+    return term[:-1] + ('a' if last == '9' else chr(ord(last) + 1))
+
+
+def index_applicants(applicants):
+    """(Re)build the tokens of the given applicants (select_related('user') saves queries)"""
+    applicants = list(applicants)
+    with transaction.atomic():
+        ApplicantSearchToken.objects.filter(applicant__in=applicants).delete()
+        ApplicantSearchToken.objects.bulk_create(
+            [
+                ApplicantSearchToken(applicant=applicant, token=token)
+                for applicant in applicants
+                for token in applicant_tokens(
+                    applicant.user.first_name, applicant.user.last_name, applicant.user.email,
+                    applicant.phone_number,
+                )
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def search_applicants(queryset, query):
+    """
+    Filter `queryset` to applicants matching every term of `query` and annotate
+    `search_rank` (number of exactly matching terms). A blank query leaves
+    `queryset` unfiltered, with a zero rank; one with nothing searchable in it
+    (e.g. '!!') matches nothing.
+    """
+    terms = query_terms(query)
+    if not terms:
+        if (query or '').strip():
+            queryset = queryset.none()
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField()))
+    rank = Value(0, output_field=IntegerField())
+    for term in dict.fromkeys(terms):
+        tokens = ApplicantSearchToken.objects.filter(applicant=OuterRef('pk'))
+        matches = tokens.filter(token__gte=term)
+        upper = prefix_upper_bound(term)
+        if upper is not None:
+            matches = matches.filter(token__lt=upper)
+        queryset = queryset.filter(Exists(matches))
+        rank = rank + Cast(Exists(tokens.filter(token=term)), IntegerField())
+    return queryset.annotate(search_rank=rank)
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+
+from .models import AcademicSubject, Applicant, ScreeningForm
+from .search import APPLICANT_INDEXED_FIELDS, USER_INDEXED_FIELDS, index_applicants
+
+
+@receiver(post_save, sender=AcademicSubject)
+@receiver(post_delete, sender=AcademicSubject)
+def refresh_olevel_aggregate(sender, instance, **kwargs):
+    # Keeps ScreeningForm.olevel_aggregate (a merit-list tie-break) in step with the subjects
+    try:
+        form = ScreeningForm.objects.only('pk').get(pk=instance.screening_form_id)
+    except ScreeningForm.DoesNotExist:
+        return  # the form itself is being deleted
+    form.refresh_olevel_aggregate()
+
+
+@receiver(post_save, sender=Applicant)
+def index_applicant(sender, instance, update_fields=None, **kwargs):
+    # Keeps the applicant search tokens (core.search) current
+    if update_fields is not None and not APPLICANT_INDEXED_FIELDS.intersection(update_fields):
+        return
+    index_applicants([instance])
+
+
+@receiver(post_save, sender=User)
+def index_applicant_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not USER_INDEXED_FIELDS.intersection(update_fields):
+        return  # e.g. update_last_login on every sign-in
+    if instance.user_type == 'applicant':
+        index_applicants(Applicant.objects.filter(user=instance).select_related('user'))
@@ -0,0 +1,72 @@
+"""
+Admissions statistics rollup for the application manager dashboard.
+
+One conditional-aggregation query per table (plus the per-programme breakdown)
+computes every figure, and the result is cached together with the time it was
+computed. Readers accept it for ADMISSIONS_STATS_MAX_AGE seconds; the
+dashboard's refresh button recomputes it on demand.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Applicant, ScreeningForm, ScreeningPayment
+
+STATS_CACHE_KEY = 'admissions:stats'
+
+DOCUMENT_STATUS_FIELDS = (
+    'waec_result_status', 'jamb_result_slip_status', 'passport_photo_status', 'birth_certificate_status',
+)
+
+
+def compute_admission_stats():
+    week_ago = timezone.now() - timedelta(days=7)
+
+    applicants = Applicant.objects.aggregate(
+        total_applicants=Count('id'),
+        pending_applicants=Count('id', filter=Q(status='pending_review')),
+        admitted_applicants=Count('id', filter=Q(status='approved')),
+        rejected_applicants=Count('id', filter=Q(status='rejected')),
+        new_applicants=Count('id', filter=Q(user__date_joined__gte=week_ago)),
+    )
+
+    payments = ScreeningPayment.objects.filter(status='success').aggregate(
+        total_payments=Count('id'),
+        payment_amount=Sum('amount'),
+    )
+
+    any_pending_document = Q()
+    for field in DOCUMENT_STATUS_FIELDS:
+        any_pending_document |= Q(**{field: 'pending'})
+    forms = ScreeningForm.objects.aggregate(
+        total_forms=Count('id'),
+        pending_documents=Count('id', filter=any_pending_document),
+    )
+
+    applications_by_program = list(
+        Applicant.objects.values('programs__name').annotate(count=Count('id')).order_by('-count')[:10]
+    )
+
+    return {
+        **applicants,
+        **payments,
+        'payment_amount': payments['payment_amount'] or 0,
+        **forms,
+        'applications_by_program': applications_by_program,
+        'computed_at': timezone.now(),
+    }
+
+
+def get_admission_stats(refresh=False, max_age=None):
+    """Cached stats, recomputed when older than `max_age` seconds or when `refresh` is set"""
+    max_age = settings.ADMISSIONS_STATS_MAX_AGE if max_age is None else max_age
+    stats = None if refresh else cache.get(STATS_CACHE_KEY)
+    if stats is None or timezone.now() - stats['computed_at'] > timedelta(seconds=max_age):
+        stats = compute_admission_stats()
+        # Keep it a little longer than max_age so a reader with a wider window can still use it
+        cache.set(STATS_CACHE_KEY, stats, max_age * 2 or None)
+    return stats
@@ -1,3 +1,211 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import Job, User
+from dashboard.models import Notification
+
+from . import jobs
+from .admissions import admit_applicants
+from .merit import rank_applicants
+from .models import Applicant, ApplicantSearchToken, Program, ScreeningForm, ScreeningPayment
+from .search import search_applicants
+
+
+class ApplicantDataMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.program = Program.objects.create(name='Computer Science', program_type='degree')
+        cls.applicants = [cls.create_applicant(i) for i in range(5)]
+
+    @classmethod
+    def create_applicant(cls, index, status='pending_review'):
+        user = User.objects.create(
+            username=f'applicant{index}', user_type='applicant', first_name='Applicant', last_name=str(index),
+        )
+        return Applicant.objects.create(
+            user=user, state='Lagos', phone_number=f'0803000{index:04d}', programs=cls.program,
+            mode='utme', status=status,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+
+class NotifyApplicantsTests(ApplicantDataMixin, TestCase):
+    def make_job(self):
+        return Job.objects.create(
+            name='applicants.notify', payload={'target': 'pending', 'message': 'Hello {name}'}, attempts=1,
+        )
+
+    def test_retry_resumes_after_last_notified_applicant(self):
+        job = self.make_job()
+        real_fan_out = jobs.fan_out_notifications
+        calls = []
+
+        def fail_on_second_chunk(recipients, message):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('worker died')
+            return real_fan_out(recipients, message)
+
+        with mock.patch.object(jobs, 'NOTIFICATION_BATCH_SIZE', 2), \
+                mock.patch.object(jobs, 'fan_out_notifications', fail_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                jobs.notify_applicants(job)
+        self.assertEqual(Notification.objects.count(), 2)
+
+        # An already-notified applicant leaves the audience before the retry;
+        # with an offset resume the next applicant would be skipped
+        Applicant.objects.filter(pk=self.applicants[0].pk).update(status='approved')
+
+        job.refresh_from_db()
+        job.attempts = 2
+        with mock.patch.object(jobs, 'NOTIFICATION_BATCH_SIZE', 2):
+            result = jobs.notify_applicants(job)
+
+        self.assertEqual(result, {'sent': 5})
+        self.assertEqual(
+            sorted(Notification.objects.values_list('user_id', flat=True)),
+            sorted(a.user_id for a in self.applicants),
+        )
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.total), (5, 5))
+
+
+class AdmitApplicantsTests(ApplicantDataMixin, TestCase):
+    def test_queries_grow_with_batches_not_applicants(self):
+        applicants = self.applicants + [self.create_applicant(i) for i in range(5, 12)]
+        ids = [a.pk for a in applicants]
+        for batch_size, batches in ((12, 1), (5, 3), (2, 6)):
+            Applicant.objects.update(status='pending_review')
+            # Savepoint, lock, select, update and release, plus one
+            # notification and one activity INSERT per batch
+            with self.assertNumQueries(5 + 2 * batches):
+                result = admit_applicants(ids, batch_size=batch_size)
+            self.assertEqual(result, {'admitted': 12, 'skipped': 0})
+
+    def test_generator_input_counts_skipped_ids(self):
+        ids = [a.pk for a in self.applicants[:3]]
+        Applicant.objects.filter(pk=ids[0]).update(status='approved')
+        result = admit_applicants(aid for aid in ids + [ids[1], 'x', 99999])
+        # Already approved, repeated, malformed and unknown ids are all skipped
+        self.assertEqual(result, {'admitted': 2, 'skipped': 4})
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_lock_does_not_join_program(self):
+        Applicant.objects.filter(pk=self.applicants[0].pk).update(programs=None)
+        with CaptureQueriesContext(connection) as queries:
+            result = admit_applicants([a.pk for a in self.applicants])
+        self.assertEqual(result, {'admitted': 5, 'skipped': 0})
+        lock = next(q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT'))
+        # PostgreSQL rejects FOR UPDATE on the nullable side of an outer join
+        self.assertNotIn('JOIN', lock)
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', lock)
+
+
+class ApplicantSearchTests(ApplicantDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.adebayo = cls.applicants[0]
+        user = cls.adebayo.user
+        user.first_name, user.last_name, user.email = 'Adébáyọ̀', 'Okafor', 'ade.okafor@example.com'
+        user.save()
+        cls.adebayo.phone_number = '+234 803 123 4567'
+        cls.adebayo.save()
+
+    def search(self, query):
+        return list(search_applicants(Applicant.objects.all(), query).order_by('pk'))
+
+    def test_prefix_and_accent_insensitive_match(self):
+        self.assertEqual(self.search('ade'), [self.adebayo])
+        self.assertEqual(self.search('adebayo okaf'), [self.adebayo])
+        self.assertEqual(self.search('ade nobody'), [])
+        self.assertEqual(len(self.search('applic')), 4)
+
+    def test_phone_match_ignores_formatting_and_country_code(self):
+        for query in ('08031234567', '+2348031234567', '0803 123', '803-123-4567'):
+            self.assertEqual(self.search(query), [self.adebayo], query)
+
+    def test_index_follows_name_and_phone_changes(self):
+        user = self.adebayo.user
+        user.first_name = 'Chidi'
+        user.save(update_fields=['first_name'])
+        self.assertEqual(self.search('chid'), [self.adebayo])
+        self.assertEqual(self.search('adebayo'), [])
+
+        self.adebayo.phone_number = '07011112222'
+        self.adebayo.save()
+        self.assertEqual(self.search('0701111'), [self.adebayo])
+        self.assertEqual(self.search('08031234567'), [])
+
+    def test_unrelated_saves_leave_the_index_alone(self):
+        tokens = set(ApplicantSearchToken.objects.filter(applicant=self.adebayo).values_list('token', flat=True))
+        user = self.adebayo.user
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        self.adebayo.status = 'approved'
+        with self.assertNumQueries(1):
+            self.adebayo.save(update_fields=['status'])
+        self.assertEqual(
+            set(ApplicantSearchToken.objects.filter(applicant=self.adebayo).values_list('token', flat=True)),
+            tokens,
+        )
+
+
+class MeritRankingTests(ApplicantDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.applicants += [cls.create_applicant(i) for i in range(5, 8)]
+        day = timezone.now() - datetime.timedelta(days=10)
+        # (jamb score, O'level aggregate, days after `day` submitted, paid)
+        forms = [
+            (250, 12, 1, True),
+            (250, 10, 3, True),
+            (250, 12, 0, True),
+            (250, 12, 1, True),    # ties with 0 on score, aggregate and date: pk decides
+            (180, 5, 0, True),     # below the cut-off
+            (300, None, 5, True),
+            (260, 5, 0, False),    # not paid
+            (250, None, 2, True),  # no O'level results: last among the 250s
+        ]
+        for applicant, (score, aggregate, days, paid) in zip(cls.applicants, forms):
+            cls.create_form(applicant, score, aggregate, day + datetime.timedelta(days=days))
+            if paid:
+                ScreeningPayment.objects.create(applicant=applicant, reference=f'SCR-{applicant.pk}', status='success')
+        # Only an applicant's first form is ranked
+        cls.create_form(cls.applicants[1], 350, 5, day)
+
+    @classmethod
+    def create_form(cls, applicant, score, aggregate, created_at):
+        # bulk_create skips ScreeningForm.save(), whose full_clean() wants every document
+        form, = ScreeningForm.objects.bulk_create([ScreeningForm(
+            applicant=applicant, jamb_score=str(score), jamb_score_value=score, olevel_aggregate=aggregate,
+        )])
+        ScreeningForm.objects.filter(pk=form.pk).update(created_at=created_at)
+
+    def ranked(self, **kwargs):
+        ranked = rank_applicants(self.program, min_score=200, **kwargs)
+        return [self.applicants.index(row['applicant']) for row in ranked]
+
+    def test_olevel_tie_break_then_date_then_pk(self):
+        self.assertEqual(self.ranked(), [5, 1, 2, 0, 3, 7])
+
+    def test_date_tie_break(self):
+        self.assertEqual(self.ranked(tie_break='date'), [5, 2, 0, 3, 7, 1])
 
-# Create your tests here.
+    def test_threshold_and_slots_are_applied_in_the_query(self):
+        with self.assertNumQueries(1):
+            ranked = rank_applicants(self.program, min_score=251, slots=3)
+        self.assertEqual([row['jamb_score'] for row in ranked], [300])
+        self.assertEqual(self.ranked(slots=3), [5, 1, 2])
+        self.assertEqual(self.ranked(slots=0), [])
+        self.assertIn(4, [self.applicants.index(r['applicant']) for r in rank_applicants(self.program)])
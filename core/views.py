@@ -9,6 +9,7 @@ from django.template.loader import render_to_string
 from .forms import ApplicantForm, ApplicantScreeningForm
 from .models import ScreeningForm
 # from weasyprint import HTML
+from accounts import payments, paystack, reference_data
 from accounts.state import NIGERIA_STATES_AND_LGAS
 from .models import Program
 from django.contrib.auth import get_user_model
@@ -22,7 +23,6 @@ import json
 from .models import ScreeningPayment
 from django.views.decorators.http import require_http_methods
 import time
-import requests
 from django.conf import settings
 
 
@@ -30,7 +30,7 @@ def landing_page(request):
     return render(request, 'core/landing.html')
 
 def create_applicant(request):
-    programs = Program.objects.all()
+    programs = reference_data.programs()
     if request.method == 'POST':
         try:
             # Create user instance but don't save yet
@@ -67,7 +67,7 @@ def create_applicant(request):
             
             # Create applicant profile
             try:
-                program = Program.objects.get(id=request.POST.get('programs'))
+                program = reference_data.get('core.Program', request.POST.get('programs'))
                 applicant = Applicant.objects.create(
                     user=user,
                     state=request.POST.get('state', ''),
@@ -146,9 +146,7 @@ def applicant_dashboard(request):
         # Get screening form if submitted
         screening_form = ScreeningForm.objects.filter(applicant=applicant).first()
 
-        # Get recent unread notifications (context processor provides unread_count globally)
-        from dashboard.models import Notification
-        recent_notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:5]
+        # Recent unread notifications and unread_count come from the notifications context processor
 
         context = {
             'applicant': applicant,
@@ -156,7 +154,6 @@ def applicant_dashboard(request):
             'has_paid_screening_fee': has_paid_screening_fee,
             'screening_fee': screening_fee,
             'screening_form': screening_form,
-            'notifications': recent_notifications,
         }
         return render(request, 'dashboard/applicant-dashboard.html', context)
     except Applicant.DoesNotExist:
@@ -169,7 +166,7 @@ def health_check(request):
     
 
 def landing_page(request):
-    faculties = Faculty.objects.all()
+    faculties = reference_data.faculties()
     context = {'faculties': faculties}
     return render(request, 'core/landing.html', context)
 
@@ -181,13 +178,13 @@ def library_page(request):
     return render(request, 'core/library.html')
 
 def programs_list(request):
-    programs = Faculty.objects.all()
+    programs = reference_data.faculties()
     context = {'programs': programs}
     return render(request, 'core/programs.html', context)
 
 def program_detail(request, pk):
     program = get_object_or_404(Faculty, pk=pk)
-    departments = Department.objects.filter(faculty=program)
+    departments = reference_data.departments(faculty_id=program.pk)
     context = {
         'program':program,
         'departments':departments
@@ -250,11 +247,6 @@ def initiate_screening_payment(request):
         reference = f"SCR-{applicant.id}-{int(time.time())}"
         
         # Initialize payment with Paystack
-        url = "https://api.paystack.co/transaction/initialize"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
         data = {
             "email": request.user.email,
             "amount": float(amount) * 100,  # Convert to kobo
@@ -267,10 +259,9 @@ def initiate_screening_payment(request):
                 "payment_type": "screening_form"
             }
         }
-        
-        response = requests.post(url, headers=headers, json=data)
-        response_data = response.json()
-        
+
+        response_data = paystack.get_client().initialize(data)
+
         if response_data['status']:
             # Create payment record - EXACT COPY FROM SCHOOL FEES
             ScreeningPayment.objects.create(
@@ -281,7 +272,9 @@ def initiate_screening_payment(request):
             return JsonResponse(response_data)
         else:
             return JsonResponse({'error': 'Payment initialization failed'}, status=400)
-            
+
+    except paystack.PaystackError:
+        return JsonResponse({'error': 'The payment service is not responding. Please try again shortly.'}, status=502)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
@@ -289,14 +282,11 @@ def initiate_screening_payment(request):
 def get_program_choices(request, program_type):
     """API endpoint to get program choices based on program type"""
     try:
-        choices = ProgramChoice.objects.filter(
-            program_type=program_type,
-            is_active=True
-        ).values('id', 'name')
+        choices = reference_data.program_choices(program_type)
         
         return JsonResponse({
             'success': True,
-            'choices': list(choices)
+            'choices': [{'id': choice.id, 'name': choice.name} for choice in choices]
         })
     except Exception as e:
         return JsonResponse({
@@ -306,48 +296,30 @@ def get_program_choices(request, program_type):
 
 @login_required
 def verify_screening_payment(request, reference):
-    """Verify screening form payment with Paystack"""
+    """
+    Paystack sends the browser back here after checkout. The payment itself is
+    confirmed by the webhook (or a background verify), so this only reads its status.
+    """
     if request.user.user_type != 'applicant':
         messages.error(request, "Access denied. Applicants only.")
         return redirect('core:screening_payment_wall')
 
     try:
-        # Verify payment with Paystack
-        import requests
-        from django.conf import settings
-        from django.utils import timezone
-        
-        url = f"https://api.paystack.co/transaction/verify/{reference}"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"
-        }
-        response = requests.get(url, headers=headers)
-        response_data = response.json()
-        
-        # Get payment transaction
         payment = ScreeningPayment.objects.get(reference=reference, applicant__user=request.user)
-        
-        if response_data['status'] and response_data['data']['status'] == 'success':
-            # Update payment status
-            payment.status = 'success'
-            payment.paystack_reference = response_data['data']['reference']
-            payment.verified_at = timezone.now()
-            payment.save()
-            
-            messages.success(request, "Payment verified successfully! You can now access the screening form.")
-            return redirect('core:screening_form')
-        else:
-            payment.status = 'failed'
-            payment.save()
-            messages.error(request, "Payment verification failed!")
-            return redirect('core:screening_payment_wall')
-        
     except ScreeningPayment.DoesNotExist:
         messages.error(request, "Payment transaction not found!")
         return redirect('core:screening_payment_wall')
-    except Exception as e:
-        messages.error(request, f"An error occurred: {str(e)}")
-        return redirect('core:screening_payment_wall')
+
+    if payment.status == 'success':
+        messages.success(request, "Payment verified successfully! You can now access the screening form.")
+        return redirect('core:screening_form')
+    if payment.status == 'failed':
+        messages.error(request, "Payment verification failed!")
+    else:
+        # The webhook has not been processed yet; confirm it in the background
+        payments.request_verification(reference)
+        messages.info(request, "Your payment is being confirmed. Refresh this page in a few seconds.")
+    return redirect('core:screening_payment_wall')
 
 
 @login_required
@@ -711,7 +683,7 @@ def get_student_course_data(request):
                 second_semester_registered.append(item)
         
         # Get current academic session
-        current_session = AcademicSession.objects.filter(is_active=True).first()
+        current_session = AcademicSession.get_active()
         session_name = current_session.name if current_session else student_profile.current_session.name if student_profile.current_session else "2023/2024"
 
         data = {
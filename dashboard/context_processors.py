@@ -1,17 +1,20 @@
-from .models import Notification
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import NotificationSummary
+
 
 def notifications_processor(request):
     """
-    Context processor to make notifications and unread count available globally
+    Context processor to make notifications and unread count available globally.
+    Nothing is queried until a template uses one of the values.
     """
     if request.user.is_authenticated:
-        notifications = Notification.objects.filter(user=request.user, is_read=False)
-        unread_count = notifications.count()
+        summary = NotificationSummary(request.user)
         return {
-            'notifications': notifications,
-            'unread_count': unread_count
+            'notifications': summary,
+            'unread_count': SimpleLazyObject(lambda: summary.count),
         }
     return {
         'notifications': [],
         'unread_count': 0
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,119 @@
+"""
+Per-user notification summary (unread count + latest unread previews) and
+bulk notification fan-out.
+
+The summary is cached per user and dropped whenever one of the user's
+notifications is saved or deleted. Code that writes notifications without
+signals (bulk_create, queryset.update) must call invalidate_notification_summary()
+for the affected users itself; fan_out_notifications() already does.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification
+
+PREVIEW_LIMIT = 5
+SUMMARY_CACHE_SECONDS = 300
+SUMMARY_KEY = 'notifications:summary:{user_id}'
+
+
+def get_notification_summary(user):
+    """Return {'unread_count': int, 'previews': [Notification, ...]} for `user`"""
+    key = SUMMARY_KEY.format(user_id=user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        previews = list(
+            Notification.objects.filter(user=user, is_read=False)
+            .select_related('support_request')
+            .order_by('-created_at')[:PREVIEW_LIMIT]
+        )
+        if len(previews) < PREVIEW_LIMIT:
+            unread_count = len(previews)
+        else:
+            unread_count = Notification.objects.filter(user=user, is_read=False).count()
+        summary = {'unread_count': unread_count, 'previews': previews}
+        cache.set(key, summary, SUMMARY_CACHE_SECONDS)
+    return summary
+
+
+def invalidate_notification_summary(*user_ids):
+    cache.delete_many([SUMMARY_KEY.format(user_id=user_id) for user_id in user_ids])
+
+
+class NotificationSummary:
+    """
+    Lazy stand-in for the old unread-notifications queryset in templates:
+    supports iteration over the previews, `.count` and truth testing, and only
+    loads the summary when a template actually touches it.
+    """
+
+    def __init__(self, user):
+        self._user = user
+        self._summary = None
+
+    def _load(self):
+        if self._summary is None:
+            self._summary = get_notification_summary(self._user)
+        return self._summary
+
+    @property
+    def count(self):
+        return self._load()['unread_count']
+
+    unread_count = count
+
+    @property
+    def previews(self):
+        return self._load()['previews']
+
+    def __iter__(self):
+        return iter(self.previews)
+
+    def __len__(self):
+        return len(self.previews)
+
+    def __bool__(self):
+        return self.count > 0
+
+
+NOTIFICATION_BATCH_SIZE = 1000
+
+
+def personalise(template, fields):
+    """Replace {name}-style placeholders; unknown braces are left alone"""
+    for key, value in fields.items():
+        template = template.replace('{' + key + '}', value)
+    return template
+
+
+def fan_out_notifications(recipients, message, batch_size=NOTIFICATION_BATCH_SIZE, progress=None):
+    """
+    Create one Notification per recipient with chunked bulk_create.
+
+    `recipients` yields (user_id, fields) where `fields` fills the message
+    placeholders, e.g. {'name': 'Ada Obi'}. `progress(sent)` is called after
+    each chunk. Returns the number of notifications created.
+    """
+    sent = 0
+    batch = []
+    for user_id, fields in recipients:
+        batch.append(Notification(user_id=user_id, message=personalise(message, fields)))
+        if len(batch) >= batch_size:
+            sent += _write_batch(batch)
+            batch = []
+            if progress:
+                progress(sent)
+    if batch:
+        sent += _write_batch(batch)
+        if progress:
+            progress(sent)
+    return sent
+
+
+def _write_batch(batch):
+    Notification.objects.bulk_create(batch)
+    user_ids = {n.user_id for n in batch}
+    # After commit when called inside a transaction, so no reader re-caches the old summary
+    transaction.on_commit(lambda: invalidate_notification_summary(*user_ids))
+    return len(batch)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Notification
+from .notifications import invalidate_notification_summary
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_user_notification_summary(sender, instance, **kwargs):
+    invalidate_notification_summary(instance.user_id)
@@ -4,6 +4,7 @@ from .decorators import student_required, staff_required
 from datetime import datetime
 from django.contrib import messages
 from .models import SupportRequest, Notification
+from .notifications import get_notification_summary
 from .forms import SupportForm
 from django.contrib.auth.decorators import login_required
 
@@ -34,8 +35,7 @@ def student_dashboard(request):
     completed_courses = registered_courses.filter(status='completed').count()
     current_semester = profile.current_semester.title()
 
-    # Get recent notifications
-    notifications = Notification.objects.filter(user=request.user, is_read=False)[:5]
+    # Recent notifications come from the notifications context processor (cached summary)
 
     # Get upcoming deadlines (if any)
     # This could be enhanced with actual deadline data
@@ -47,7 +47,6 @@ def student_dashboard(request):
         'total_credits': total_credits,
         'completed_courses': completed_courses,
         'current_semester': current_semester,
-        'notifications': notifications,
         'registered_courses': registered_courses[:3],  # Show recent 3 courses
         'current_year': datetime.now().year,
     }
@@ -57,7 +56,6 @@ def student_dashboard(request):
 def courses(request):
     profile = StudentProfile.objects.get(user=request.user)
     record = AcademicRecord.objects.filter(student=profile)
-    notifications = Notification.objects.filter(user=request.user, is_read=False)
     courses = [record.course for record in record if record.course]
     count = len(courses)
     context = {
@@ -65,7 +63,6 @@ def courses(request):
         'profile': profile,
         'current_year' : current_year,
         'count': count,
-        'notifications': notifications,
     }
     return render(request, 'dashboard/courses.html', context)
 
@@ -73,10 +70,8 @@ def courses(request):
 def timetable(request):
     profile = StudentProfile.objects.get(user=request.user)
     record = AcademicRecord.objects.filter(student=profile)
-    notifications = Notification.objects.filter(user=request.user, is_read=False)
     context = {
         'record': record,
-        'notifications': notifications,
     }
     return render(request, 'dashboard/timetable.html', context)
 
@@ -110,11 +105,8 @@ def staff_dashboard(request):
         created_by=request.user
     ).distinct().order_by('-created_at')[:3]
 
-    # Get notifications
-    notifications = Notification.objects.filter(user=request.user, is_read=False)[:5]
-
     # Get current academic session
-    current_session = AcademicSession.objects.filter(is_active=True).first()
+    current_session = AcademicSession.get_active()
     session_name = f"{current_session.start_year}/{current_session.end_year}" if current_session else "2023/2024"
 
     context = {
@@ -130,7 +122,6 @@ def staff_dashboard(request):
         'level_300_count': level_300_count,
         'level_400_count': level_400_count,
         'recent_courses': recent_courses,
-        'notifications': notifications,
     }
     return render(request, 'dashboard/staff-dashboard.html', context)
 
@@ -153,14 +144,13 @@ def support(request):
             messages.error(request, 'There was an error submitting your support request. Please try again.')
     else:
         form = SupportForm()
-    notifications = Notification.objects.filter(user=request.user, is_read=False)
-    return render(request, 'dashboard/support.html', {'form': form, 'notifications': notifications})
+    return render(request, 'dashboard/support.html', {'form': form})
 
 @login_required
 def notifications(request):
     # Get all notifications (both read and unread), sorted by unread first, then by date
     all_notifications = Notification.objects.filter(user=request.user).order_by('is_read', '-created_at')
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_count = get_notification_summary(request.user)['unread_count']
 
     context = {
         'notifications': all_notifications,
@@ -80,6 +80,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.admission.AdmissionControlMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -192,6 +193,13 @@ AUTHENTICATION_BACKENDS = [
 # Paystack settings
 PAYSTACK_SECRET_KEY = os.getenv('PAYSTACK_SECRET_KEY', 'sk_test_28880cfe8f38d298104855fd9480c57c7178dfe4')
 PAYSTACK_PUBLIC_KEY = os.getenv('PAYSTACK_PUBLIC_KEY', 'pk_test_2719ee41e68aa00e44f7e8b6a7b8521c5001fa33')
+# accounts.paystack.PaystackClient (point PAYSTACK_BASE_URL at `manage.py paystack_stub` locally)
+PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv('PAYSTACK_CONNECT_TIMEOUT', '3.05'))
+PAYSTACK_READ_TIMEOUT = float(os.getenv('PAYSTACK_READ_TIMEOUT', '10'))
+PAYSTACK_MAX_RETRIES = int(os.getenv('PAYSTACK_MAX_RETRIES', '2'))
+PAYSTACK_RETRY_BACKOFF = float(os.getenv('PAYSTACK_RETRY_BACKOFF', '0.5'))
+PAYSTACK_POOL_SIZE = int(os.getenv('PAYSTACK_POOL_SIZE', '10'))
 
 # Image optimization settings
 THUMBNAIL_ALIASES = {
@@ -231,6 +239,46 @@ EMAIL_USE_SSL = os.getenv('EMAIL_USE_SSL', 'False').lower() == 'true'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 
+# Cache. Results, reference data, the active session and notification
+# summaries are invalidated by bumping keys in this cache, so every web and
+# worker process must share it: use the database cache (run
+# `manage.py createcachetable`) or Redis/Memcached in production. The
+# per-process default is only suitable for a single development server.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Background jobs (accounts.background / manage.py run_workers)
+JOBS_RUN_IN_THREAD = os.getenv('JOBS_RUN_IN_THREAD', 'True').lower() == 'true'
+JOBS_WORKER_THREADS = int(os.getenv('JOBS_WORKER_THREADS', '2'))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '2'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', '30'))
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', '3600'))
+
+# Admission control for registration-window routes (accounts.admission)
+ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'True').lower() == 'true'
+# URL name -> requests allowed to run at the same time
+ADMISSION_CONTROL_ROUTES = {
+    'accounts:register_courses': int(os.getenv('ADMISSION_LIMIT_REGISTER_COURSES', '8')),
+    'accounts:school_fees': int(os.getenv('ADMISSION_LIMIT_SCHOOL_FEES', '8')),
+    'accounts:initiate_payment': int(os.getenv('ADMISSION_LIMIT_INITIATE_PAYMENT', '4')),
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '2'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '20'))
+ADMISSION_USER_RATE = float(os.getenv('ADMISSION_USER_RATE', '0.5'))
+ADMISSION_USER_BURST = int(os.getenv('ADMISSION_USER_BURST', '10'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '5'))
+
+# Seconds the app manager dashboard may show cached admissions statistics (core.stats)
+ADMISSIONS_STATS_MAX_AGE = int(os.getenv('ADMISSIONS_STATS_MAX_AGE', '300'))
+
+# Seconds a list's total row count is reused while paging through it (accounts.pagination)
+PAGINATION_COUNT_CACHE_TIMEOUT = int(os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', '60'))
+
 # CORS settings for Next.js frontend
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # Next.js dev server
@@ -252,6 +300,6 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'accounts.pagination.KeysetPagination',
     'PAGE_SIZE': 20
 }